@@ -0,0 +1,111 @@
+"""
+AI 回答缓存：同一个 (模型, 系统提示, 归一化后的用户提示) 直接复用上次的回答
+
+内存里是带 TTL 的 LRU；配置了 db_path 时再写一份到 SQLite，多个进程共用
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+def normalize_prompt(text):
+    """全半角统一、去首尾空白、连续空白压成一个，大小写不敏感"""
+    text = unicodedata.normalize("NFKC", text or "")
+    return " ".join(text.split()).lower()
+
+class ResponseCache:
+    def __init__(self, max_items=256, ttl=24 * 3600, db_path=None):
+        self.max_items = max_items
+        self.ttl = ttl
+        self.db_path = db_path
+        self._items = OrderedDict()  # key -> (写入时间, 回答, 省下的 token 数)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+        if db_path: self._init_db()
+
+    # ---------- SQLite ----------
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _init_db(self):
+        if os.path.dirname(self.db_path): os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS ai_cache (key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                         "tokens INTEGER NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ai_cache_last_used ON ai_cache (last_used)")
+
+    def _db_get(self, key, now):
+        with self._connect() as conn:
+            row = conn.execute("SELECT response, tokens, created FROM ai_cache WHERE key = ? AND created >= ?",
+                               (key, now - self.ttl)).fetchone()
+            if row: conn.execute("UPDATE ai_cache SET last_used = ? WHERE key = ?", (now, key))
+        return row
+
+    def _db_put(self, key, response, tokens, now):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO ai_cache VALUES (?, ?, ?, ?, ?)", (key, response, tokens, now, now))
+            conn.execute("DELETE FROM ai_cache WHERE created < ?", (now - self.ttl,))
+            # 超出容量时按最近使用时间淘汰
+            conn.execute("DELETE FROM ai_cache WHERE key IN (SELECT key FROM ai_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                         (self.max_items,))
+
+    # ---------- 对外接口 ----------
+
+    @staticmethod
+    def key(model, system_prompt, user_prompt):
+        raw = "\x1f".join([model or "", system_prompt or "", normalize_prompt(user_prompt)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._items.get(key)
+            if entry and now - entry[0] > self.ttl:
+                del self._items[key]
+                entry = None
+            if entry:
+                self._items.move_to_end(key)
+        if entry is None and self.db_path:
+            try:
+                row = self._db_get(key, now)
+            except sqlite3.Error:
+                row = None
+            if row:
+                entry = (row[2], row[0], row[1])
+                self._remember(key, entry)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.tokens_saved += entry[2]
+            return entry[1]
+
+    def put(self, key, response, tokens=0):
+        now = time.time()
+        self._remember(key, (now, response, tokens))
+        if self.db_path:
+            try:
+                self._db_put(key, response, tokens, now)
+            except sqlite3.Error:
+                pass  # 持久化失败不影响这次回答
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._items[key] = entry
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_ratio": self.hits / total if total else 0.0,
+                "tokens_saved": self.tokens_saved, "size": len(self._items)}
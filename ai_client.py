@@ -0,0 +1,268 @@
+"""
+AI 调用：按 (base_url, api_key) 复用 OpenAI 客户端（自带 keep-alive 连接池），
+加上连接/读取超时、带抖动的有限重试和熔断器；支持流式返回并统计首字耗时，
+可选挂一个 ResponseCache（见 ai_cache.py）跳过重复提问
+"""
+import math
+import random
+import threading
+import time
+from collections import deque
+
+DEFAULT_BASE_URL = "https://api.deepseek.com"
+DEFAULT_MODEL = "deepseek-chat"
+OFFLINE_MESSAGE = "AI 暂时掉线了"
+
+_clients = {}
+_breakers = {}
+_pool_lock = threading.Lock()
+_ttft_samples = deque(maxlen=200)  # 最近的首字耗时（秒）
+
+class CircuitBreaker:
+    """
+    连续失败 failure_threshold 次后熔断 reset_timeout 秒，期间直接拒绝；
+    到点后放一个探测请求过去，成功就恢复，失败就再熔断一轮。
+    探测请求没报成功/失败就结束了（线程被打断、BaseException）时由调用方 ``release_probe``；
+    连这个也没走到的，probe_timeout 秒后算作作废，再放下一个探测过去，不会一直熔断下去
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=30.0, probe_timeout=120.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probe_timeout = probe_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probe = None  # (线程 id, 开始时间)：正在探测时才有
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None: return True
+            now = time.monotonic()
+            if now - self.opened_at < self.reset_timeout: return False
+            if self._probe and now - self._probe[1] < self.probe_timeout: return False
+            self._probe = (threading.get_ident(), now)
+            return True
+
+    def release_probe(self):
+        """当前线程拿着的探测名额还没结算就放掉（没拿着什么都不做），下一个请求可以接着探测"""
+        with self._lock:
+            if self._probe and self._probe[0] == threading.get_ident(): self._probe = None
+
+    def retry_after(self):
+        """熔断中还要等几秒，没熔断返回 0"""
+        with self._lock:
+            if self.opened_at is None: return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probe = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probe or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._probe = None
+
+class CircuitOpenError(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"circuit open, retry after {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+def get_client(api_key, base_url, connect_timeout=5.0, read_timeout=60.0):
+    """同一组参数只建一次客户端；SDK 自己的重试关掉，统一走 AIAdvisor 的重试预算"""
+    key = (base_url, api_key, connect_timeout, read_timeout)
+    with _pool_lock:
+        client = _clients.get(key)
+        if client is None:
+            from openai import OpenAI, Timeout
+
+            client = _clients[key] = OpenAI(api_key=api_key, base_url=base_url, max_retries=0,
+                                            timeout=Timeout(read_timeout, connect=connect_timeout))
+        return client
+
+def get_breaker(base_url, failure_threshold=3, reset_timeout=30.0):
+    """熔断按服务地址算：同一个上游挂了，换哪个 key 都一样"""
+    with _pool_lock:
+        breaker = _breakers.get(base_url)
+        if breaker is None:
+            breaker = _breakers[base_url] = CircuitBreaker(failure_threshold, reset_timeout)
+        return breaker
+
+def estimate_tokens(text):
+    """粗估 token 数：中日韩字符约 0.6 个/字，其余约 0.3 个/字符，够用来算账和控预算"""
+    text = text or ""
+    cjk = sum(1 for ch in text if "\u2e80" <= ch <= "\u9fff" or "\uf900" <= ch <= "\ufaff" or "\uff00" <= ch <= "\uffef")
+    return math.ceil(cjk * 0.6 + (len(text) - cjk) * 0.3)
+
+def ttft_stats():
+    """最近流式请求的首字耗时：次数、p50、p90、最近一次（秒）"""
+    samples = sorted(_ttft_samples)
+    if not samples: return {"count": 0, "p50": None, "p90": None, "last": None}
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))]
+    return {"count": len(samples), "p50": pick(0.5), "p90": pick(0.9), "last": _ttft_samples[-1]}
+
+class AIStream:
+    """
+    流式回答：迭代时逐段产出文本；``text`` 是目前为止拼好的全文，
+    ``ttft`` 是从开始请求到第一段文字的秒数，``elapsed`` 是整段耗时；
+    ``failed`` 为真时吐出来的是掉线提示，``cached`` 为真时是缓存里的旧回答，这两种都不计入首字统计
+    """
+
+    def __init__(self, chunks=()):
+        self._chunks = chunks
+        self._parts = []
+        self._on_done = []
+        self.ttft = None
+        self.elapsed = None
+        self.failed = False
+        self.cached = False
+
+    @classmethod
+    def from_text(cls, text, cached=False):
+        """不走网络的固定回答（缓存命中、没配 key 的提示），接口和真流一样"""
+        stream = cls(iter([text]))
+        stream.cached = cached
+        stream.failed = not cached
+        return stream
+
+    def on_done(self, callback):
+        """整段吐完后调用 callback(stream)"""
+        self._on_done.append(callback)
+
+    @property
+    def text(self):
+        return "".join(self._parts)
+
+    def __iter__(self):
+        started = time.monotonic()
+        for piece in self._chunks:
+            if not piece: continue
+            if self.ttft is None:
+                self.ttft = time.monotonic() - started
+                if not (self.failed or self.cached): _ttft_samples.append(self.ttft)
+            self._parts.append(piece)
+            yield piece
+        self.elapsed = time.monotonic() - started
+        for callback in self._on_done:
+            callback(self)
+
+def _is_transient(exc):
+    """连接失败、超时、限流、5xx 才值得重试，也才算上游挂了；key 错、参数错重试也没用"""
+    import openai
+
+    if isinstance(exc, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True
+    return isinstance(exc, openai.APIStatusError) and exc.status_code >= 500
+
+class AIAdvisor:
+    """一组 AI 配置（key / 地址 / 模型 / 超时 / 重试），实际连接和熔断状态在模块级池子里共享"""
+
+    def __init__(self, api_key, base_url=DEFAULT_BASE_URL, model=DEFAULT_MODEL, connect_timeout=5.0, read_timeout=60.0,
+                 max_retries=2, backoff=0.5, failure_threshold=3, reset_timeout=30.0, cache=None):
+        self.api_key = api_key
+        self.base_url = base_url or DEFAULT_BASE_URL
+        self.model = model or DEFAULT_MODEL
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = get_breaker(self.base_url, failure_threshold, reset_timeout)
+        self.cache = cache
+
+    @property
+    def client(self):
+        return get_client(self.api_key, self.base_url, self.connect_timeout, self.read_timeout)
+
+    def _offline(self, detail):
+        if self.api_key and self.api_key in detail:
+            detail = detail.replace(self.api_key, "***")
+        return f"{OFFLINE_MESSAGE} ({detail})"
+
+    def _call(self, request):
+        """在重试预算和熔断器的保护下执行 request(client)；失败时抛出最后一次的异常"""
+        if not self.breaker.allow():
+            raise CircuitOpenError(self.breaker.retry_after())
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    result = request(self.client)
+                except Exception as e:
+                    if not _is_transient(e):
+                        self.breaker.record_success()  # 上游是通的，只是这次请求本身有问题
+                        raise
+                    if attempt >= self.max_retries:
+                        self.breaker.record_failure()
+                        raise
+                    # 指数退避 + 随机抖动，避免一堆会话同时重试
+                    time.sleep(self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+                else:
+                    self.breaker.record_success()
+                    return result
+        finally:
+            self.breaker.release_probe()  # 上面没结算就退出了（BaseException 等），别把探测名额一直占着
+
+    def _cache_key(self, system_prompt, user_prompt):
+        return self.cache.key(self.model, system_prompt, user_prompt) if self.cache else None
+
+    def _remember(self, key, system_prompt, user_prompt, answer, tokens=None):
+        """只缓存正常回答；tokens 没有上游用量时按字数估"""
+        if key is None or not answer: return
+        if not tokens: tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt) + estimate_tokens(answer)
+        self.cache.put(key, answer, tokens)
+
+    def ask(self, system_prompt, user_prompt, fresh=False):
+        """返回回答文本；出错时返回“AI 暂时掉线了 (...)”；fresh=True 跳过缓存重新生成"""
+        key = self._cache_key(system_prompt, user_prompt)
+        if key and not fresh:
+            hit = self.cache.get(key)
+            if hit is not None: return hit
+        messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}]
+        try:
+            response = self._call(lambda client: client.chat.completions.create(model=self.model, messages=messages, temperature=0.7))
+            answer = response.choices[0].message.content
+            usage = getattr(response, "usage", None)
+            self._remember(key, system_prompt, user_prompt, answer, getattr(usage, "total_tokens", None))
+            return answer
+        except CircuitOpenError as e:
+            return self._offline(f"连续失败太多次，{e.retry_after:.0f} 秒后再试")
+        except Exception as e:
+            return self._offline(str(e))
+
+    def stream(self, system_prompt, user_prompt, fresh=False):
+        """流式版 ask：返回 AIStream，出错时把“AI 暂时掉线了 (...)”当作最后一段吐出来"""
+        key = self._cache_key(system_prompt, user_prompt)
+        if key and not fresh:
+            hit = self.cache.get(key)
+            if hit is not None: return AIStream.from_text(hit, cached=True)
+        messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}]
+        stream = AIStream()
+        stream._chunks = self._stream_chunks(messages, stream)
+        if key:
+            stream.on_done(lambda s: None if s.failed else self._remember(key, system_prompt, user_prompt, s.text))
+        return stream
+
+    def _stream_chunks(self, messages, stream):
+        # 只在拿到响应头之前重试；已经吐出字之后再重试会让用户看到重复内容
+        try:
+            response = self._call(lambda client: client.chat.completions.create(model=self.model, messages=messages, temperature=0.7, stream=True))
+        except CircuitOpenError as e:
+            stream.failed = True
+            yield self._offline(f"连续失败太多次，{e.retry_after:.0f} 秒后再试")
+            return
+        except Exception as e:
+            stream.failed = True
+            yield self._offline(str(e))
+            return
+        try:
+            for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            if _is_transient(e): self.breaker.record_failure()
+            stream.failed = True
+            yield "\n\n" + self._offline(str(e))
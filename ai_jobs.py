@@ -0,0 +1,88 @@
+"""
+后台 AI 任务：请求丢进全进程共享的线程池里跑，脚本线程拿到任务句柄就返回，不再干等
+
+- 同一个提示词（按缓存 key 算）正在跑时，后来的人直接拿同一个任务，不重复请求
+- 每个用户同时在跑的任务数有上限
+"""
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+class JobLimitError(Exception):
+    """这个用户在跑的任务已经到上限了"""
+
+class AIJob:
+    """一个后台任务：消费一个 AIStream，``text`` 随时可读到目前为止的内容"""
+
+    def __init__(self, job_id, key, owner, stream):
+        self.id = job_id
+        self.key = key
+        self.owner = owner
+        self.stream = stream
+        self.error = None
+        self.submitted = time.monotonic()
+        self.finished = None
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def text(self):
+        return self.stream.text
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def _run(self):
+        try:
+            for _ in self.stream:
+                pass
+        except Exception as e:  # AIStream 自己会把网络错误变成提示文字，这里只兜底真正的 bug
+            self.error = e
+        finally:
+            self.finished = time.monotonic()
+            self._done.set()
+
+class JobRunner:
+    def __init__(self, max_workers=8, per_user_limit=2):
+        self.per_user_limit = per_user_limit
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ai-job")
+        self._inflight = {}  # key -> AIJob
+        self._running = {}   # owner -> 在跑的任务数
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.deduplicated = 0
+
+    def submit(self, owner, key, stream):
+        """
+        提交一个流式回答；同 key 的任务还在跑就直接返回那个任务（stream 不会被消费）
+        key 为 None 不去重（要新回答时就这么传）；owner 超出并发上限时抛 JobLimitError
+        """
+        with self._lock:
+            job = self._inflight.get(key) if key else None
+            if job is not None:
+                self.deduplicated += 1
+                return job
+            if self._running.get(owner, 0) >= self.per_user_limit:
+                raise JobLimitError(owner)
+            job = AIJob(next(self._ids), key, owner, stream)
+            if key: self._inflight[key] = job
+            self._running[owner] = self._running.get(owner, 0) + 1
+        self._executor.submit(self._run, job)
+        return job
+
+    def _run(self, job):
+        try:
+            job._run()
+        finally:
+            with self._lock:
+                if self._inflight.get(job.key) is job: del self._inflight[job.key]
+                self._running[job.owner] -= 1
+                if not self._running[job.owner]: del self._running[job.owner]
+
+    def stats(self):
+        with self._lock:
+            return {"inflight": len(self._inflight), "running": sum(self._running.values()), "deduplicated": self.deduplicated}
@@ -0,0 +1,281 @@
+"""
+HTTP 接口：和网页并行跑的独立进程，给手机快捷指令、定时任务直接读写记录、拿周报用
+
+    python api.py --port 8502                    # 标准库多线程服务器
+    python api.py --port 8502 --server tornado   # tornado 的异步 IO 循环 + 线程池（tornado 随 streamlit 装好了）
+
+和网页共用同一套存储（STORAGE_BACKEND / STORAGE_PATH / FITNESS_USER），写入走 StoreCache 的乐观并发，
+网页那边靠数据签名自动看到新数据。配置了 API_TOKEN 时每个请求都要带 ``Authorization: Bearer <token>``
+
+    GET    /records?start=&end=&offset=&limit=   按日期倒序列出，返回 {"total", "records"}
+    GET    /records/<日期>                        一条记录，带 ETag
+    PUT    /records/<日期>                        新建或覆盖；If-Match: <etag> 对不上返回 412，If-None-Match: * 只新建
+    DELETE /records/<日期>                        删除，同样支持 If-Match
+    POST   /records                              批量写：{"records": [...]}，坏行跳过并列出
+    GET    /weeks/<日期>                          那一周的汇总（训练天数、部位计数、心情分、总结句）
+    GET    /weeks/<日期>/image.png                那一周的分享图
+
+周报两个接口带 ETag：客户端带上 If-None-Match 且内容没变时直接 304，不重算、不重画。
+用户用 ?user=xxx 指定，默认 FITNESS_USER。``make_app`` 返回的是普通 WSGI 应用，可以不起服务器直接在进程里调
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import logging
+import os
+import re
+from datetime import datetime
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs
+from wsgiref.simple_server import WSGIServer, make_server
+
+from batch_reports import week_report
+from record_io import validate_row
+from records import StoreCache, parse_date
+from share_image import FONTS, PngCache, render_summary_png, summary_cache_key
+from storage import DEFAULT_USER, NO_RECORD, ConflictError, get_backend, record_etag, safe_user
+
+_LOG = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 10 * 1024 * 1024
+MAX_PAGE = 500
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+STATUS_TEXT = {200: "OK", 201: "Created", 204: "No Content", 304: "Not Modified", 400: "Bad Request", 401: "Unauthorized",
+               404: "Not Found", 405: "Method Not Allowed", 412: "Precondition Failed", 413: "Payload Too Large",
+               500: "Internal Server Error"}
+
+def _quote(etag):
+    return f'"{etag}"'
+
+def _etag_matches(header, etag):
+    """If-None-Match / If-Match 里有没有这个 etag（允许逗号分隔多个、弱校验前缀 W/、通配 *）"""
+    if not header: return False
+    tags = {t.strip().removeprefix("W/").strip('"') for t in header.split(",")}
+    return "*" in tags or etag in tags
+
+def _content_etag(payload):
+    return hashlib.sha1(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+class Api:
+    """WSGI 应用；路由就是下面 ROUTES 里的几条正则"""
+
+    ROUTES = [
+        ("GET", re.compile(r"^/records/?$"), "list_records"),
+        ("POST", re.compile(r"^/records/?$"), "upsert_many"),
+        ("GET", re.compile(r"^/records/(?P<day>[^/]+)$"), "get_record"),
+        ("PUT", re.compile(r"^/records/(?P<day>[^/]+)$"), "put_record"),
+        ("DELETE", re.compile(r"^/records/(?P<day>[^/]+)$"), "delete_record"),
+        ("GET", re.compile(r"^/weeks/(?P<day>[^/]+)/?$"), "week_summary"),
+        ("GET", re.compile(r"^/weeks/(?P<day>[^/]+)/image\.png$"), "week_image"),
+    ]
+
+    def __init__(self, store_cache, token=None, image_cache=None, renderer="pil", default_user=DEFAULT_USER):
+        self.store_cache = store_cache
+        self.token = token
+        self.image_cache = image_cache
+        self.renderer = renderer
+        self.default_user = default_user
+
+    def __call__(self, environ, start_response):
+        try:
+            status, headers, body = self._dispatch(environ)
+        except HttpError as e:
+            status, headers, body = e.status, [], {"error": str(e)}
+        except Exception:  # 兜底：别让一个坏请求把线程带走；细节只记在服务端日志里，不回给调用方
+            _LOG.exception("%s %s failed", environ.get("REQUEST_METHOD"), environ.get("PATH_INFO"))
+            status, headers, body = 500, [], {"error": "internal server error"}
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            headers.append(("Content-Type", "application/json; charset=utf-8"))
+        body = body or b""
+        headers.append(("Content-Length", str(len(body))))
+        start_response(f"{status} {STATUS_TEXT.get(status, '')}", headers)
+        return [body]
+
+    def _dispatch(self, environ):
+        if self.token and not hmac.compare_digest(environ.get("HTTP_AUTHORIZATION", "").encode("utf-8"), f"Bearer {self.token}".encode("utf-8")):
+            raise HttpError(401, "missing or wrong API token")
+        path, method = environ.get("PATH_INFO") or "/", environ["REQUEST_METHOD"].upper()
+        allowed = False
+        for route_method, pattern, handler in self.ROUTES:
+            m = pattern.match(path)
+            if not m: continue
+            allowed = True
+            if route_method == method or (method == "HEAD" and route_method == "GET"):
+                query = {k: v[-1] for k, v in parse_qs(environ.get("QUERY_STRING", "")).items()}
+                user = safe_user(query.pop("user", None) or self.default_user)
+                status, headers, body = getattr(self, handler)(environ, user, query, **m.groupdict())
+                return status, headers, b"" if method == "HEAD" else body
+        if allowed: raise HttpError(405, f"{method} not allowed on {path}")
+        raise HttpError(404, f"no route for {path}")
+
+    # ---------- 小工具 ----------
+
+    @staticmethod
+    def _day(value):
+        day = parse_date(value)
+        if day is None: raise HttpError(400, f"bad date {value!r}, expected YYYY-MM-DD")
+        return day
+
+    @staticmethod
+    def _int(query, key, default):
+        try:
+            return int(query.get(key, default))
+        except ValueError:
+            raise HttpError(400, f"{key} must be an integer") from None
+
+    @staticmethod
+    def _json_body(environ):
+        try:
+            length = int(environ.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            length = 0
+        if length > MAX_BODY_BYTES: raise HttpError(413, f"body larger than {MAX_BODY_BYTES} bytes")
+        raw = environ["wsgi.input"].read(length) if length else b""
+        try:
+            return json.loads(raw or b"null")
+        except ValueError as e:
+            raise HttpError(400, f"invalid JSON body: {e}") from None
+
+    # ---------- 记录 ----------
+
+    def list_records(self, environ, user, query):
+        store = self.store_cache.view(user)
+        start = self._day(query["start"]) if query.get("start") else None
+        end = self._day(query["end"]) if query.get("end") else None
+        offset, limit = max(self._int(query, "offset", 0), 0), min(max(self._int(query, "limit", 100), 1), MAX_PAGE)
+        return 200, [], {"total": store.count(start, end), "records": store.newest_first(start, end, offset=offset, limit=limit)}
+
+    def get_record(self, environ, user, query, day):
+        rec = self.store_cache.view(user).get(self._day(day))
+        if rec is None: raise HttpError(404, f"no record on {day}")
+        etag = record_etag(rec)
+        if _etag_matches(environ.get("HTTP_IF_NONE_MATCH"), etag): return 304, [("ETag", _quote(etag))], b""
+        return 200, [("ETag", _quote(etag))], rec
+
+    def put_record(self, environ, user, query, day):
+        day = self._day(day)
+        body = self._json_body(environ)
+        if not isinstance(body, dict): raise HttpError(400, "body must be a JSON object")
+        expected = None
+        if environ.get("HTTP_IF_MATCH"): expected = environ["HTTP_IF_MATCH"].strip().removeprefix("W/").strip('"')
+        elif environ.get("HTTP_IF_NONE_MATCH", "").strip() == "*": expected = NO_RECORD
+        store = self.store_cache.view(user)
+        current = store.get(day)
+        owner = store.get_by_id(body["id"]) if body.get("id") else None
+        # id 是别的日期那条记录的：照写的话后端会把那条挪过来（等于删掉它），而那条的前置条件根本没检查
+        if owner and owner["date"] != day.isoformat(): raise HttpError(400, f"id {body['id']!r} belongs to the record on {owner['date']}")
+        rec, error = validate_row({**body, "date": day.isoformat(),
+                                   "id": current["id"] if current else body.get("id") or str(datetime.now().timestamp())})
+        if error: raise HttpError(400, error)
+        try:
+            rec = self.store_cache.upsert(rec, user, expected=expected)
+        except ConflictError as e:
+            raise HttpError(412, f"record changed, current etag {record_etag(e.current)}") from None
+        return (200 if current else 201), [("ETag", _quote(record_etag(rec)))], rec
+
+    def delete_record(self, environ, user, query, day):
+        rec = self.store_cache.view(user).get(self._day(day))
+        if rec is None: raise HttpError(404, f"no record on {day}")
+        expected = environ.get("HTTP_IF_MATCH", "").strip().removeprefix("W/").strip('"') or None
+        try:
+            self.store_cache.delete(rec["id"], user, expected=expected)
+        except ConflictError as e:
+            raise HttpError(412, f"record changed, current etag {record_etag(e.current)}") from None
+        return 204, [], b""
+
+    def upsert_many(self, environ, user, query):
+        body = self._json_body(environ)
+        rows = body.get("records") if isinstance(body, dict) else body
+        if not isinstance(rows, list): raise HttpError(400, 'body must be {"records": [...]} or a JSON array')
+        store = self.store_cache.view(user)
+        valid, errors, claimed = {}, [], {}  # claimed：这一批里用过的 id -> 日期
+        for i, raw in enumerate(rows):
+            rec, error = validate_row(raw)
+            owner = (claimed.get(rec["id"]) or (store.get_by_id(rec["id"]) or {}).get("date")) if rec else None
+            if not error and owner and owner != rec["date"]: error = f"id {rec['id']!r} belongs to the record on {owner}"
+            if error: errors.append({"index": i, "error": error})
+            else:
+                valid[rec["date"]] = rec  # 同一天以靠后的为准
+                claimed[rec["id"]] = rec["date"]
+        count = self.store_cache.upsert_many(valid.values(), user)
+        return 200, [], {"upserted": count, "errors": errors}
+
+    # ---------- 周报 ----------
+
+    def _week(self, user, day):
+        """(那一周的 week_stats, week_report)；一条记录都没有就 404"""
+        store, day = self.store_cache.view(user), self._day(day)
+        stats = store.week_stats(day)
+        if not stats["records"]: raise HttpError(404, f"no records in the week of {day}")
+        return stats, week_report(store, day)
+
+    def week_summary(self, environ, user, query, day):
+        stats, (_, week_str, trained_days, part_counts, summary) = self._week(user, day)
+        payload = {"start": stats["start"].isoformat(), "end": stats["end"].isoformat(), "week": week_str, "records": stats["records"],
+                   "trained_days": trained_days, "part_counts": dict(part_counts), "mood_score": stats["mood_score"], "summary": summary}
+        etag = _content_etag(payload)
+        headers = [("ETag", _quote(etag)), ("Cache-Control", "no-cache")]
+        if _etag_matches(environ.get("HTTP_IF_NONE_MATCH"), etag): return 304, headers, b""
+        return 200, headers, payload
+
+    def week_image(self, environ, user, query, day):
+        _, (_, week_str, trained_days, part_counts, summary) = self._week(user, day)
+        # 先算缓存键当 ETag：客户端手里那张没变就不用画
+        etag = summary_cache_key(week_str, trained_days, part_counts, summary, self.renderer)[:16]
+        headers = [("ETag", _quote(etag)), ("Cache-Control", "no-cache")]
+        if _etag_matches(environ.get("HTTP_IF_NONE_MATCH"), etag): return 304, headers, b""
+        png = render_summary_png(week_str, trained_days, part_counts, summary, cache=self.image_cache, renderer=self.renderer)
+        return 200, headers + [("Content-Type", "image/png")], png
+
+def make_app(store_cache=None, token=None, image_cache=None, renderer=None):
+    """按环境变量（和网页、命令行同一套）配好的 WSGI 应用；参数给了就用参数"""
+    FONTS.configure(os.environ.get("FONT_PATH", ""))
+    if store_cache is None:
+        store_cache = StoreCache(get_backend(os.environ.get("STORAGE_BACKEND", "json").lower(), os.environ.get("STORAGE_PATH") or None))
+    if image_cache is None:
+        image_cache = PngCache(max_items=64, cache_dir=os.environ.get("IMAGE_CACHE_DIR") or None,
+                               max_disk_bytes=int(float(os.environ.get("IMAGE_CACHE_MAX_MB") or 256) * 1024 * 1024))
+    return Api(store_cache, token=token if token is not None else os.environ.get("API_TOKEN") or None, image_cache=image_cache,
+               renderer=renderer or os.environ.get("DONUT_RENDERER", "pil"), default_user=os.environ.get("FITNESS_USER", DEFAULT_USER))
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+def serve_tornado(app, host, port, workers):
+    """tornado 的 IO 循环收发请求，WSGI 应用在线程池里跑（读写存储会阻塞，不能放在 IO 循环里）"""
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    import tornado.httpserver
+    import tornado.wsgi
+
+    async def run():
+        container = tornado.wsgi.WSGIContainer(app, executor=ThreadPoolExecutor(max_workers=workers))
+        tornado.httpserver.HTTPServer(container).listen(port, host)
+        await asyncio.Event().wait()
+
+    asyncio.run(run())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="健身记录 HTTP 接口")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--server", default="threaded", choices=["threaded", "tornado"])
+    parser.add_argument("--workers", type=int, default=8, help="tornado 模式下处理请求的线程数")
+    args = parser.parse_args(argv)
+    app = make_app()
+    print(f"HTTP 接口：http://{args.host}:{args.port}/records（{args.server}）")
+    if args.server == "tornado":
+        serve_tornado(app, args.host, args.port, args.workers)
+    else:
+        make_server(args.host, args.port, app, server_class=ThreadingWSGIServer).serve_forever()
+
+if __name__ == "__main__":
+    main()
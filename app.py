@@ -1,17 +1,22 @@
+import time
+_run_started = time.perf_counter()  # 性能剖析打开时，从这里开始算这次重跑
+
 import streamlit as st
-import streamlit.components.v1 as components
-import json
-import os
-from datetime import datetime, timedelta
 import io
-import textwrap
-
-# 引入美化菜单库
-try:
-    from streamlit_option_menu import option_menu
-except ImportError:
-    st.error("请先安装 streamlit-option-menu 库: `pip install streamlit-option-menu`")
-    st.stop()
+import os
+import uuid
+from datetime import datetime
+
+from ai_cache import ResponseCache
+from ai_client import DEFAULT_BASE_URL, DEFAULT_MODEL, AIAdvisor, AIStream, ttft_stats
+from ai_jobs import JobLimitError, JobRunner
+from profiling import current_profile, start_profile, timed_imports
+from prompts import DEFAULT_TOKEN_BUDGET, build_copy_prompt
+from records import TRAINING_OPTIONS, StoreCache, generate_week_summary_sentence, month_range
+from share_image import FONTS, PngCache, render_summary_png
+from storage import DEFAULT_USER, ConflictError, get_backend, record_etag, safe_user
+from trends import chart_tables, store_trends
+from ui_assets import focus_badges, inject_theme, render_copy_button, week_header
 
 # ==================== 1. 配置与 CSS 样式 ====================
 
@@ -21,53 +26,10 @@ st.set_page_config(
     layout="centered"
 )
 
-# 深度美化 CSS
-st.markdown("""
-    <style>
-    .stApp { background-color: #FFF5F7; }
-    
-    /* 按钮样式 */
-    .stButton>button {
-        background-color: #E6C9C9; color: white; border-radius: 20px; border: none; font-weight: bold; transition: all 0.3s;
-    }
-    .stButton>button:hover {
-        background-color: #D1B3B3; transform: scale(1.02);
-    }
-    
-    /* 侧边栏背景 */
-    [data-testid="stSidebar"] { background-color: #FFF0F5; border-right: 1px solid #FFE4E1; }
-    
-    /* 标题颜色 */
-    h1, h2, h3, h4, h5 { color: #8B5F65 !important; font-family: "Helvetica Neue", sans-serif; }
-    
-    /* 卡片式表单容器 */
-    div[data-testid="stForm"] {
-        background-color: rgba(255, 255, 255, 0.7); padding: 30px; border-radius: 25px;
-        box-shadow: 0 4px 15px rgba(230, 201, 201, 0.3); border: 1px solid #FFE4E1;
-    }
-    
-    /* 聊天气泡 */
-    .chat-bubble {
-        background-color: #FFFFFF; border-radius: 15px; padding: 20px; margin: 10px 0 20px 0;
-        border: 1px solid #FFE4E1; color: #555; line-height: 1.6; box-shadow: 2px 2px 10px rgba(0,0,0,0.05);
-    }
-    
-    /* Bento Grid 卡片样式 */
-    .bento-card {
-        background-color: #FFFDF9; border-radius: 20px; padding: 20px;
-        box-shadow: 0 4px 10px rgba(0,0,0,0.03); border: 2px solid #FFF5EE; margin-bottom: 15px;
-    }
-    .stat-badge {
-        background-color: #FFF5EE; padding: 5px 10px; border-radius: 8px;
-        font-weight: bold; color: #8B5F65; margin-right: 8px; font-size: 14px;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+# 样式在 frontend/theme/theme.css，每次重跑由 main() 里的 inject_theme() 注入（见 ui_assets.py）
 
 # ==================== 2. 基础配置与数据处理 ====================
 
-DATA_FILE = "fitness_data.json"
-
 def _clean_setting_value(value) -> str:
     if value is None:
         return ""
@@ -106,213 +68,28 @@ def load_env_file(path=".env"):
                     os.environ[k.strip()] = v.strip().strip('"').strip("'")
     except: pass
 
-# 初始化时直接加载环境配置
-load_env_file(".env")
-
-def normalize_record(record):
-    if not isinstance(record, dict): return None
-    training = record.get("training", [])
-    if isinstance(training, str): training = [training]
-    return {
-        "id": str(record.get("id") or datetime.now().timestamp()),
-        "date": str(record.get("date") or ""),
-        "training": training or [],
-        "diet": str(record.get("diet") or ""),
-        "mood": str(record.get("mood") or ""),
-    }
-
-def load_data():
-    if not os.path.exists(DATA_FILE): return []
-    try:
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            raw = json.load(f)
-        return [normalize_record(r) for r in raw if normalize_record(r) and r.get("date")]
-    except: return []
-
-def save_data(data):
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
-
-def get_week_range(date_obj):
-    if isinstance(date_obj, datetime): date_obj = date_obj.date()
-    start = date_obj - timedelta(days=date_obj.weekday())
-    return start, start + timedelta(days=6)
-
-def render_copy_button(text, label="📋 一键复制"):
-    components.html(
-        f"""
-        <div style="margin-top: 6px;">
-          <button style="background:#E6C9C9;color:white;border:none;padding:8px 14px;border-radius:999px;cursor:pointer;font-weight:600;"
-            onclick="navigator.clipboard.writeText({json.dumps(text)}).then(() => {{document.getElementById('copied').innerText='已复制！'; setTimeout(()=>document.getElementById('copied').innerText='', 1500);}})">
-            {label}
-          </button>
-          <span id="copied" style="margin-left:10px;color:#8B5F65;font-weight:600;"></span>
-        </div>
-        """, height=54,
-    )
-
-# ==================== 3. 静态图片生成 (已修改：数据居中) ====================
-
-def create_donut_chart_image_static(parts_summary, bg_color_rgb, size_px=280):
-    """辅助函数：生成静态圆环图用于合成"""
-    import matplotlib
-
-    matplotlib.use("Agg")
-    import matplotlib.pyplot as plt
-    from PIL import Image
-
-    if not parts_summary: parts_summary = {"休息": 1}
-    values = list(parts_summary.values())
-    if sum(values) <= 0: values = [1]
-    palette = ["#FF9EB1", "#FFD1A9", "#E5C890", "#F4B8E4", "#A6D189", "#8CAAEE"]
-    colors = [palette[i % len(palette)] for i in range(len(values))]
-    bg_rgba = tuple(c / 255 for c in bg_color_rgb) + (1.0,)
-
-    fig, ax = plt.subplots(figsize=(4, 4), dpi=200)
-    fig.patch.set_facecolor(bg_rgba)
-    ax.set_facecolor(bg_rgba)
-    ax.pie(values, colors=colors, startangle=90, counterclock=False, wedgeprops=dict(width=0.25, edgecolor=bg_rgba, linewidth=5))
-    ax.set(aspect="equal")
-
-    buf = io.BytesIO()
-    fig.savefig(buf, format="PNG", bbox_inches="tight", pad_inches=0.0)
-    plt.close(fig)
-    buf.seek(0)
-    
-    chart = Image.open(buf).convert("RGBA")
-    side = max(chart.size)
-    square = Image.new("RGBA", (side, side), color=bg_color_rgb + (255,))
-    square.paste(chart, ((side - chart.width) // 2, (side - chart.height) // 2), chart)
-    return square.resize((size_px, size_px), Image.LANCZOS)
+@st.cache_resource
+def load_env_once(path=".env"):
+    """每个进程只读一次 .env（改了 .env 需要重启）；以前每次重跑都要重新读一遍文件"""
+    load_env_file(path)
 
-def create_summary_image(week_str, total_days, parts_summary, summary_sentence):
-    """
-    生成静态图片 - [修改点]：圆环居中，数据列表移动到圆环下方
-    """
-    from PIL import Image, ImageDraw, ImageFont
-
-    width, height = 750, 1100 # 稍微加高一点以容纳垂直布局
-    app_bg_color = (255, 245, 247)
-    card_bg_color = (255, 251, 240)
-    title_color = (106, 57, 62)
-    text_color = (80, 80, 80)
-    accent_color = (255, 158, 177)
-    
-    img = Image.new('RGB', (width, height), color=app_bg_color)
-    draw = ImageDraw.Draw(img)
-
-    # 字体加载
-    try:
-        font_path = "msyh.ttc" if os.name == 'nt' else "/System/Library/Fonts/PingFang.ttc"
-        font_title = ImageFont.truetype(font_path, 70)
-        font_subtitle = ImageFont.truetype(font_path, 32)
-        font_body = ImageFont.truetype(font_path, 28)
-        font_chart_label = ImageFont.truetype(font_path, 36)
-        font_chart_val = ImageFont.truetype(font_path, 50)
-        font_quote = ImageFont.truetype(font_path, 30)
-        font_quotes_mark = ImageFont.truetype(font_path, 80)
-    except:
-        font_title = font_subtitle = font_body = font_chart_label = font_chart_val = font_quote = font_quotes_mark = ImageFont.load_default()
-
-    margin = 50
-    # 绘制主卡片背景
-    draw.rounded_rectangle([margin, margin, width - margin, height - margin], radius=40, fill=card_bg_color, outline=(230, 201, 201), width=3)
-    
-    # 1. 标题区域 (顶部)
-    cursor_x = margin + 50
-    cursor_y = margin + 60
-    draw.text((cursor_x, cursor_y), "WEEKLY", fill=title_color, font=font_title)
-    draw.text((cursor_x, cursor_y + 80), "FITNESS LOG", fill=title_color, font=font_title)
-    # 装饰线
-    draw.line((cursor_x, cursor_y + 170, cursor_x + 300, cursor_y + 170), fill=title_color, width=4)
-
-    # 时间和天数
-    cursor_y += 200
-    draw.text((cursor_x, cursor_y), f"Time: {week_str}", fill=text_color, font=font_subtitle)
-    draw.text((cursor_x, cursor_y + 45), f"本周训练: {total_days} 天", fill=text_color, font=font_subtitle)
-
-    # 2. 图表区域 (居中)
-    chart_size = 360 # 稍微变大一点
-    chart_img = create_donut_chart_image_static(parts_summary, card_bg_color, size_px=chart_size)
-    
-    # 计算水平居中位置
-    chart_x = (width - chart_size) // 2 
-    chart_y = cursor_y + 100
-    img.paste(chart_img, (chart_x, chart_y), chart_img)
-
-    # 图表中心文字
-    total_sessions = sum(parts_summary.values()) if parts_summary else 0
-    if total_sessions > 0:
-        top_part, top_count = parts_summary.most_common(1)[0]
-        top_pct = (top_count / total_sessions) * 100
-        center_text_1, center_text_2 = str(top_part), f"{top_pct:.1f}%"
-    else:
-        center_text_1, center_text_2 = "休息", "100%"
-
-    cx, cy = chart_x + chart_size // 2, chart_y + chart_size // 2
-    bbox1 = draw.textbbox((0, 0), center_text_1, font=font_chart_label)
-    bbox2 = draw.textbbox((0, 0), center_text_2, font=font_chart_val)
-    total_h = (bbox1[3]-bbox1[1]) + (bbox2[3]-bbox2[1]) + 10
-    draw.text((cx - (bbox1[2]-bbox1[0])/2, cy - total_h/2), center_text_1, fill=title_color, font=font_chart_label)
-    draw.text((cx - (bbox2[2]-bbox2[0])/2, cy - total_h/2 + (bbox1[3]-bbox1[1]) + 10), center_text_2, fill=title_color, font=font_chart_val)
-
-    # 3. 数据列表区域 (居中，位于图表下方)
-    # 不再放在旁边，而是放在图表下方
-    list_y_start = chart_y + chart_size + 30
-    
-    # 标题 "训练重点"
-    title_w = draw.textlength("训练重点", font=font_subtitle)
-    draw.text(((width - title_w) // 2, list_y_start), "训练重点", fill=(60, 60, 60), font=font_subtitle)
-    
-    item_y = list_y_start + 50
-    items = parts_summary.most_common(4) if parts_summary else []
-    
-    if not items: 
-        text = "• 彻底放松"
-        w = draw.textlength(text, font=font_body)
-        draw.text(((width - w)//2, item_y), text, fill=text_color, font=font_body)
-    
-    # 绘制居中的列表项 (垂直排列，更稳重)
-    for part, count in items:
-        item_text = f"{part}: {count}次"
-        # 简单计算一下宽度以居中
-        # 这里画一个小圆点 + 文字
-        full_text_w = 20 + draw.textlength(item_text, font=font_body) # 20是圆点宽度和间距
-        start_x = (width - full_text_w) // 2
-        
-        draw.ellipse((start_x, item_y + 10, start_x + 10, item_y + 20), fill=accent_color)
-        draw.text((start_x + 20, item_y), item_text, fill=text_color, font=font_body)
-        item_y += 40
-
-    # 4. 底部总结框
-    box_height = 200
-    box_y = height - margin - box_height - 30 # 底部留白
-    box_x = margin + 40
-    box_w = width - 2*margin - 80
-    
-    draw.rounded_rectangle((box_x, box_y, box_x + box_w, box_y + box_height), radius=20, fill=(255, 255, 255), outline=(230, 201, 201), width=2)
-    draw.text((box_x + 20, box_y + 10), "“", fill=accent_color, font=font_quotes_mark)
-    draw.text((box_x + 30, box_y + 25), "一句话总结:", fill=title_color, font=font_subtitle)
-    
-    text_start_y = box_y + 80
-    for line in textwrap.wrap(summary_sentence, width=24)[:3]:
-        draw.text((box_x + 30, text_start_y), line, fill=text_color, font=font_quote)
-        text_start_y += 40
-        
-    # 右上角装饰
-    icon_x, icon_y = width - 150, 100
-    draw.line((icon_x, icon_y + 15, icon_x + 60, icon_y + 15), fill=(220, 180, 180), width=8)
-    draw.rounded_rectangle((icon_x - 10, icon_y, icon_x, icon_y + 30), radius=4, fill=accent_color)
-    draw.rounded_rectangle((icon_x + 60, icon_y, icon_x + 70, icon_y + 30), radius=4, fill=accent_color)
-
-    return img
+# 初始化时直接加载环境配置
+load_env_once(".env")
 
-# ==================== 4. 动态交互图表 (保持悬停卡片效果) ====================
+# ==================== 3. 动态交互图表 (保持悬停卡片效果) ====================
 
 def get_interactive_donut_chart(parts_summary):
     """
     Plotly 动态圆环图 - 悬停显示白底卡片
+    同样的部位计数（含顺序）只建一次 Figure，进程内所有会话共用；拿到的图别再改它
     """
+    return _cached_donut_chart(tuple(parts_summary.items()) if parts_summary else ())
+
+@st.cache_resource(max_entries=256, show_spinner=False)
+def _cached_donut_chart(items):
+    return build_donut_chart(dict(items))
+
+def build_donut_chart(parts_summary):
     import plotly.graph_objects as go
 
     if not parts_summary:
@@ -360,50 +137,306 @@ def get_interactive_donut_chart(parts_summary):
     )
     return fig
 
-# ==================== 5. AI & 辅助逻辑 ====================
+TREND_PALETTE = ["#FFB7B2", "#A6D189", "#FFE4B5", "#8CAAEE", "#D4A5A5", "#E0BBE4"]
 
-def generate_week_summary_sentence(training_days, part_counts, mood_text):
-    top_parts = [p for p, _ in part_counts.most_common(2)] if part_counts else []
-    mood_text = mood_text or ""
-    score = sum(w in mood_text for w in ["不错", "开心", "爽", "轻松"]) - sum(w in mood_text for w in ["累", "酸", "困", "emo"])
-    mood_phrase = "状态还挺在线" if score >= 2 else "有点累但也没摆烂" if score <= -2 else "整体还算稳"
-    parts = []
-    if training_days <= 0: parts.append("这周主打休息恢复")
-    else:
-        parts.append(f"这周练了{training_days}天")
-        if top_parts: parts.append(f"{'、'.join(top_parts)}是主场")
-        parts.append(mood_phrase)
-    return "，".join(parts) + "～"
-
-def consult_ai_advisor(system_prompt, user_prompt):
-    api_key = get_setting("OPENAI_API_KEY", "DEEPSEEK_API_KEY", "AI_API_KEY", default="").strip()
-    base_url = get_setting("OPENAI_BASE_URL", "DEEPSEEK_BASE_URL", default="https://api.deepseek.com").strip() or "https://api.deepseek.com"
-    model = get_setting("OPENAI_MODEL", "DEEPSEEK_MODEL", default="deepseek-chat").strip() or "deepseek-chat"
-    
-    if not api_key: 
-        return "⚠️ 未检测到 API Key：本地请在 `.env` 配置；线上 Streamlit Cloud 请在 Settings → Secrets 配置。"
-        
-    from openai import OpenAI
+def _trend_layout(fig, height=280):
+    fig.update_layout(margin=dict(t=10, b=0, l=0, r=0), height=height, paper_bgcolor='rgba(0,0,0,0)',
+                      plot_bgcolor='rgba(0,0,0,0)', hovermode="x unified",
+                      legend=dict(orientation="h", yanchor="bottom", y=1.02, x=0))
+    return fig
+
+def get_trend_charts(frequency, parts, grain):
+    """
+    趋势页的两张图：每周/月训练天数（柱）+ 休息日占比（线），部位占比（堆叠面积，按百分比）
+    frequency / parts 来自 trends.chart_tables，点数已经按历史长度降过采样
+    """
+    import plotly.graph_objects as go
 
-    client = OpenAI(api_key=api_key, base_url=base_url)
+    freq_fig = go.Figure()
+    freq_fig.add_bar(x=frequency.index, y=frequency["trained_days"], name=f"每{grain}训练天数", marker_color="#FFB7B2",
+                     hovertemplate="%{y} 天<extra></extra>")
+    freq_fig.add_scatter(x=frequency.index, y=frequency["rest_ratio"], name="休息日占比", yaxis="y2", mode="lines",
+                         line=dict(color="#8B5F65", width=2), hovertemplate="%{y:.0%}<extra></extra>")
+    freq_fig.update_layout(yaxis=dict(title=None), yaxis2=dict(overlaying="y", side="right", tickformat=".0%", range=[0, 1],
+                                                               showgrid=False))
+
+    mix_fig = go.Figure()
+    columns = [p for p in TRAINING_OPTIONS if p in parts.columns] + [p for p in parts.columns if p not in TRAINING_OPTIONS]
+    for i, part in enumerate(columns):
+        mix_fig.add_scatter(x=parts.index, y=parts[part], name=part, mode="lines", stackgroup="parts", groupnorm="percent",
+                            line=dict(width=0.5, color=TREND_PALETTE[i % len(TREND_PALETTE)]),
+                            hovertemplate="%{y:.0f}%<extra>" + part + "</extra>")
+    mix_fig.update_layout(yaxis=dict(ticksuffix="%", range=[0, 100]))
+    return _trend_layout(freq_fig), _trend_layout(mix_fig)
+
+# ==================== 4. AI & 辅助逻辑 ====================
+
+def _float_setting(key, default):
     try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}],
-            temperature=0.7
-        )
-        return response.choices[0].message.content
-    except Exception as e:
-        msg = str(e)
-        if api_key and api_key in msg:
-            msg = msg.replace(api_key, "***")
-        return f"AI 暂时掉线了 ({msg})"
+        return float(get_setting(key, default=str(default)))
+    except ValueError:
+        return default
+
+@st.cache_resource
+def get_response_cache():
+    """AI 回答缓存：进程内 LRU，配置了 AI_CACHE_DB 时多个进程共用一个 SQLite"""
+    return ResponseCache(
+        max_items=int(_float_setting("AI_CACHE_SIZE", 256)),
+        ttl=_float_setting("AI_CACHE_TTL_HOURS", 24.0) * 3600,
+        db_path=get_setting("AI_CACHE_DB", default="") or None,
+    )
 
-# ==================== 6. 主程序逻辑 ====================
+@st.cache_resource(ttl=300)
+def get_ai_advisor():
+    """AI 配置按进程缓存 5 分钟，不用每次调用都翻 secrets/环境变量；连接池和熔断状态在 ai_client 里跨缓存保留"""
+    return AIAdvisor(
+        api_key=get_setting("OPENAI_API_KEY", "DEEPSEEK_API_KEY", "AI_API_KEY", default="").strip(),
+        base_url=get_setting("OPENAI_BASE_URL", "DEEPSEEK_BASE_URL", default=DEFAULT_BASE_URL).strip(),
+        model=get_setting("OPENAI_MODEL", "DEEPSEEK_MODEL", default=DEFAULT_MODEL).strip(),
+        connect_timeout=_float_setting("AI_CONNECT_TIMEOUT", 5.0),
+        read_timeout=_float_setting("AI_READ_TIMEOUT", 60.0),
+        max_retries=int(_float_setting("AI_MAX_RETRIES", 2)),
+        cache=get_response_cache(),
+    )
+
+def consult_ai_advisor(system_prompt, user_prompt, stream=False, fresh=False):
+    """stream=True 时返回 AIStream，边生成边迭代；fresh=True 不用缓存、重新生成"""
+    advisor = get_ai_advisor()
+    if not advisor.api_key: 
+        msg = "⚠️ 未检测到 API Key：本地请在 `.env` 配置；线上 Streamlit Cloud 请在 Settings → Secrets 配置。"
+        return AIStream.from_text(msg) if stream else msg
+    if stream:
+        return advisor.stream(system_prompt, user_prompt, fresh=fresh)
+    return advisor.ask(system_prompt, user_prompt, fresh=fresh)
+
+@st.cache_resource
+def get_job_runner():
+    """全进程共享的 AI 任务线程池"""
+    return JobRunner(max_workers=int(_float_setting("AI_MAX_WORKERS", 8)), per_user_limit=int(_float_setting("AI_JOBS_PER_USER", 2)))
+
+def _session_owner():
+    if "owner_id" not in st.session_state:
+        st.session_state.owner_id = uuid.uuid4().hex
+    return st.session_state.owner_id
+
+def start_ai_job(job_key, system_prompt, user_prompt, fresh=False):
+    """把 AI 请求丢到后台线程池，任务句柄存进 st.session_state[job_key]；别人正在问同样的问题就直接搭车"""
+    with current_profile().stage("ai_submit"):
+        _submit_ai_job(job_key, system_prompt, user_prompt, fresh)
+
+def _submit_ai_job(job_key, system_prompt, user_prompt, fresh):
+    stream = consult_ai_advisor(system_prompt, user_prompt, stream=True, fresh=fresh)
+    # 要新回答（fresh）的不搭别人的车：在跑的那个同题任务给的正是用户想换掉的答案
+    dedupe_key = None if (fresh or stream.cached or stream.failed) else ResponseCache.key(get_ai_advisor().model, system_prompt, user_prompt)
+    try:
+        st.session_state[job_key] = get_job_runner().submit(_session_owner(), dedupe_key, stream)
+    except JobLimitError:
+        st.warning("手速太快啦，等前面的回答写完再问～")
+
+def _ai_bubble(body, title=""):
+    return f"<div class='chat-bubble'>{title}{body.replace(chr(10), '<br>')}</div>"
+
+@st.fragment(run_every=0.3)
+def _poll_ai_job(job_key, waiting, title):
+    """只重跑这一小块：把后台任务已经写出来的部分刷到气泡里，写完了再整页刷新一次收尾"""
+    job = st.session_state.get(job_key)
+    if job is None or job.done:
+        st.rerun()
+    body = job.text + " ▌" if job.text else f"<span style='color:#aaa'>{waiting}</span>"
+    st.markdown(_ai_bubble(body, title), unsafe_allow_html=True)
+
+def show_ai_job(job_key, waiting, title="", keep=True):
+    """
+    展示 st.session_state[job_key] 里的任务：没跑完就轮询，跑完了返回全文；
+    keep=False 时跑完不画气泡，交给调用方自己展示
+    """
+    job = st.session_state.get(job_key)
+    if job is None: return None
+    if not job.done:
+        _poll_ai_job(job_key, waiting, title)
+        return None
+    stream = job.stream
+    prof = current_profile()
+    if prof.enabled and st.session_state.get(f"{job_key}_profiled") != job.id:
+        # 后台任务的耗时记在第一次看到它跑完的那次重跑上
+        st.session_state[f"{job_key}_profiled"] = job.id
+        prof.record("ai_call", job.finished - job.submitted)
+    if keep:
+        st.markdown(_ai_bubble(job.text, title), unsafe_allow_html=True)
+        if stream.cached:
+            st.caption("⚡ 之前问过一模一样的，直接用了上次的回答（想要新的就勾上“换个新回答”）")
+        elif stream.ttft is not None and not stream.failed:
+            st.caption(f"⚡ 首字 {stream.ttft:.1f}s · 全文 {stream.elapsed:.1f}s")
+    return job.text
+
+# ==================== 5. 主程序逻辑 ====================
+
+HISTORY_PAGE_SIZE = 10
+
+@st.cache_resource
+def get_store_cache():
+    """所有会话共享一份记录缓存，新会话打开不用再读盘解析；STORAGE_BACKEND=sqlite 时换成 SQLite"""
+    return StoreCache(get_backend(get_setting("STORAGE_BACKEND", default="json").lower(),
+                                  get_setting("STORAGE_PATH", default="") or None),
+                      persist_index=get_setting("SEARCH_INDEX_PERSIST", default="").lower() in ("1", "true", "yes", "on"))
+
+def current_user():
+    """网址里带 ?user=xxx 就看 xxx 的数据，否则用 FITNESS_USER 配置（默认 default）。没有登录校验，谁知道名字都能看"""
+    return safe_user(st.query_params.get("user") or get_setting("FITNESS_USER", default=DEFAULT_USER))
+
+@st.cache_resource
+def get_image_cache():
+    """分享图缓存：内存 LRU，配置了 IMAGE_CACHE_DIR 时再落一份到磁盘；顺带定下出图字体"""
+    FONTS.configure(get_setting("FONT_PATH", default=""))
+    return PngCache(max_items=64, cache_dir=get_setting("IMAGE_CACHE_DIR", default="") or None,
+                    max_disk_bytes=int(_float_setting("IMAGE_CACHE_MAX_MB", 256) * 1024 * 1024))
+
+def save_record_form(store_cache, user_id):
+    """
+    表单提交回调（在页面重跑之前执行，拿到的是用户刚填的值）。
+    只在用户看到的还是最新版本时才写入，否则把两边内容放进 record_conflict 让用户选
+    """
+    ss = st.session_state
+    date_str = ss.record_date.strftime("%Y-%m-%d")
+    seen_date, seen_etag = ss.get("record_seen", (None, None))
+    current = store_cache.view(user_id).get(date_str)
+    mine = {"id": current["id"] if current else str(datetime.now().timestamp()),
+            "date": date_str, "training": ss.record_training, "diet": ss.record_diet, "mood": ss.record_mood}
+    try:
+        store_cache.upsert(mine, user_id, expected=seen_etag if seen_date == date_str else None)
+        ss.record_flash = "记录已保存！今天也要美美哒~ 🎉"
+    except ConflictError as e:
+        ss.record_conflict = {"mine": mine, "theirs": e.current}
+
+def show_record_conflict(store_cache, user_id):
+    conflict = st.session_state.record_conflict
+    mine, theirs = conflict["mine"], conflict["theirs"]
+    st.warning(f"⚠️ {mine['date']} 的记录刚刚在别的地方被改过了，你这次的内容还没保存，选一个保留吧")
+    if theirs:
+        st.markdown(f"**对方的版本**：{' '.join(theirs['training'])}<br>🥗 {theirs['diet'] or '-'}<br>💭 {theirs['mood'] or '-'}",
+                    unsafe_allow_html=True)
+    else:
+        st.markdown("**对方的版本**：已删除")
+    c_mine, c_theirs = st.columns(2)
+    with c_mine:
+        if st.button("用我的覆盖", use_container_width=True):
+            if theirs: mine["id"] = theirs["id"]
+            store_cache.upsert(mine, user_id)
+            del st.session_state.record_conflict
+            st.session_state.record_flash = "已用你的版本覆盖 ✅"
+            st.rerun()
+    with c_theirs:
+        if st.button("保留对方的", use_container_width=True):
+            del st.session_state.record_conflict
+            st.rerun()
+
+EXPORT_MIME = {"csv": "text/csv", "jsonl": "application/x-ndjson", "parquet": "application/octet-stream"}
+
+def show_import_export(store_cache, user_id, store):
+    """历史记录页底部：从 CSV / JSONL / Parquet 批量导入（流式、坏行报告），或把全部记录导出成文件"""
+    from record_io import FORMATS, export_records, import_records, parquet_available
+
+    formats = [f for f in FORMATS if f != "parquet" or parquet_available()]
+    with st.expander("📦 批量导入 / 导出"):
+        report = st.session_state.pop("import_report", None)
+        if report:
+            st.success(f"导入了 {report['imported']} 天（共读 {report['rows']} 行，同一天重复 {report['duplicates']} 行，以靠后的为准）")
+            if report["errors"]:
+                st.warning(f"有 {report['errors']} 行没导入：\n" + "\n".join(f"- 第 {n} 行：{msg}" for n, msg in report["error_samples"][:10])
+                           + ("\n- ……" if report["errors"] > 10 else ""))
+        c_in, c_out = st.columns(2)
+        with c_in:
+            upload = st.file_uploader("从文件导入（同一天以文件里的为准）", type=formats, key="import_file")
+            if upload is not None and st.button("开始导入", key="import_go"):
+                bar = st.progress(0.0)
+                size = upload.size or 1
+                try:
+                    with current_profile().stage("import"):
+                        report = import_records(upload, store_cache.backend, user_id,
+                                                progress=lambda rows: bar.progress(min(upload.tell() / size, 1.0), text=f"已读 {rows} 行"))
+                except ValueError as e:
+                    st.error(f"导入失败：{e}")
+                else:
+                    st.session_state.import_report = report
+                    st.rerun()
+        with c_out:
+            fmt = st.selectbox("导出格式", formats, key="export_format")
+            if st.button("生成导出文件", key="export_go", disabled=not store):
+                buf = io.BytesIO()
+                with current_profile().stage("export"):
+                    count = export_records(store_cache.get(user_id), buf, fmt)
+                st.download_button(f"📥 下载（{count} 条）", buf.getvalue(), f"fitness_records.{fmt}", EXPORT_MIME[fmt], key="export_download")
+
+@st.fragment
+def show_week_chart(part_counts):
+    """周报圆环图；图本身按部位计数缓存，换了周才会重新建"""
+    with current_profile().stage("chart_build"):
+        fig = get_interactive_donut_chart(part_counts)
+    st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+
+@st.fragment
+def show_share_image(week_str, training_days, part_counts, summary):
+    """出图按钮放在片段里：点“生成图片”/下载只重跑这一块，上面的卡片和圆环图不用重画重发"""
+    st.markdown("##### 🖼️ 朋友圈打卡图")
+    if st.button("生成图片", key="gen_img"):
+        # 同一周内容没变时直接拿缓存里的 PNG 字节，预览和下载共用一份
+        with current_profile().stage("image_render"):
+            png = render_summary_png(week_str, training_days, part_counts, summary, cache=get_image_cache(),
+                                     renderer=get_setting("DONUT_RENDERER", default="pil"))
+        st.image(png, caption="长按/右键保存", use_container_width=True)
+        st.download_button("📥 下载原图", png, "weekly.png", "image/png")
+
+def show_profile_panel(prof):
+    """PROFILE=1 时侧边栏底部的调试面板：这次重跑各阶段耗时、和上一次比、各缓存的命中情况、重型库首次导入耗时"""
+    snap = prof.snapshot()
+    last = st.session_state.get("last_profile")
+    with st.sidebar.expander("🛠️ 性能调试"):
+        rows = [f"| {name} | {ms:.1f} |" for name, ms in snap["laps"].items()]
+        rows += [f"| └ {name} ×{s['count']} | {s['ms']:.1f} |" for name, s in snap["stages"].items()]
+        st.markdown("| 阶段 | ms |\n|---|---:|\n" + "\n".join(rows))
+        st.caption(f"本次重跑 {snap['total_ms']:.0f} ms" + (f" · 上次 {last['total_ms']:.0f} ms（{last.get('page', '')}）" if last else ""))
+        if snap["payload"]:
+            st.caption(f"发给浏览器 {snap['payload']['messages']} 条消息，{snap['payload']['bytes'] / 1024:.1f} KB（不含这个面板）")
+        else:
+            st.caption("发给浏览器的数据量没统计（这个 Streamlit 版本没验证过）")
+        stats = snap["stats"]
+        if "ai_cache" in stats:
+            c = stats["ai_cache"]
+            st.caption(f"AI 回答缓存：命中 {c['hits']}/{c['hits'] + c['misses']}（{c['hit_ratio']:.0%}），"
+                       f"省下约 {c['tokens_saved']} tokens，存着 {c['size']} 条")
+        if "store_cache" in stats:
+            c = stats["store_cache"]
+            st.caption(f"记录缓存：复用 {c['hits']} 次、读盘 {c['misses']} 次（命中 {c['hit_ratio']:.0%}），"
+                       f"直接查索引 {c['views']} 次，写冲突 {c['conflicts']} 次")
+        if stats.get("ttft", {}).get("count"):
+            c = stats["ttft"]
+            st.caption(f"AI 首字耗时（最近 {c['count']} 次）：p50 {c['p50']:.2f}s，p90 {c['p90']:.2f}s，上一次 {c['last']:.2f}s")
+        if "ai_jobs" in stats:
+            c = stats["ai_jobs"]
+            st.caption(f"AI 后台任务：在跑 {c['running']} 个（其中可搭车的 {c['inflight']} 个），同题搭车累计 {c['deduplicated']} 次")
+        if snap["imports_ms"]:
+            st.caption("首次导入：" + "，".join(f"{name} {ms:.0f} ms" for name, ms in sorted(snap["imports_ms"].items(), key=lambda kv: -kv[1])))
+        if prof.log_path: st.caption(f"日志：{prof.log_path}")
+
+def profiling_enabled():
+    return get_setting("PROFILE", default="").lower() in ("1", "true", "yes", "on")
 
 def main():
-    if 'data' not in st.session_state:
-        st.session_state.data = load_data()
+    prof = start_profile(profiling_enabled(), get_setting("PROFILE_LOG", default=".cache/profile.jsonl"), started=_run_started)
+    inject_theme()
+    prof.lap("setup")
+    store_cache = get_store_cache()
+    user_id = current_user()
+    # 按日期查的页面用 view：SQLite 后端且内存里还没有最新数据时直接查索引，不整份载入；搜索/趋势/导出再 get
+    store = store_cache.view(user_id)
+    prof.lap("data_load")
+
+    # 引入美化菜单库（放到这里才导入，剖析时能算进首次导入耗时）
+    try:
+        from streamlit_option_menu import option_menu
+    except ImportError:
+        st.error("请先安装 streamlit-option-menu 库: `pip install streamlit-option-menu`")
+        st.stop()
 
     # --- 侧边栏 (已去除 AI 设置) ---
     with st.sidebar:
@@ -417,8 +450,8 @@ def main():
 
         selected_page = option_menu(
             menu_title=None,
-            options=["今日记录", "历史记录", "生成周报", "今天吃什么", "急救指南"],
-            icons=["pencil-square", "calendar-check", "image", "egg-fried", "heart-pulse"],
+            options=["今日记录", "历史记录", "生成周报", "趋势分析", "今天吃什么", "急救指南"],
+            icons=["pencil-square", "calendar-check", "image", "graph-up", "egg-fried", "heart-pulse"],
             menu_icon="cast",
             default_index=0,
             styles={
@@ -433,19 +466,18 @@ def main():
 
         # 迷你仪表盘
         today = datetime.today().date()
-        start_week, end_week = get_week_range(today)
-        weekly_records = [d for d in st.session_state.data if start_week <= datetime.strptime(d['date'], "%Y-%m-%d").date() <= end_week]
-        weekly_trained_days = len({d['date'] for d in weekly_records if any(t != "休息日" for t in d.get('training', []))})
+        weekly_trained_days = store.week_stats(today)["trained_days"]
         
         st.markdown("##### 📊 本周战绩")
         col_m1, col_m2 = st.columns(2)
         with col_m1:
             st.metric(label="本周训练", value=f"{weekly_trained_days} 天", delta="Keep Going")
         with col_m2:
-            st.metric(label="总记录", value=f"{len(st.session_state.data)} 条")
+            st.metric(label="总记录", value=f"{len(store)} 条")
 
         st.write("")
         st.info("💡 **Daily Tips:**\n肌肉是在休息时生长的，不要忘了睡个好觉💤")
+    prof.lap("sidebar")
 
     # --- 页面逻辑 ---
     
@@ -460,107 +492,119 @@ def main():
         with st.form("record_form"):
             col1, col2 = st.columns([1.5, 1])
             with col1:
-                date = st.date_input("日期", datetime.today())
+                date = st.date_input("日期", datetime.today(), key="record_date")
                 date_str = date.strftime("%Y-%m-%d")
             with col2:
                 st.write("") 
-                existing = next((r for r in st.session_state.data if r.get("date") == date_str), None)
+                existing = store.get(date)
                 if existing:
                     st.markdown("<span style='color:#8B5F65;font-size:12px'>⚠️ 今日已记，保存将覆盖</span>", unsafe_allow_html=True)
             
             default_train = existing["training"] if existing else ["臀腿"]
-            options = ["臀腿", "肩背", "有氧/滚泡沫轴", "休息日", "生理期调整"]
-            safe_default = [t for t in default_train if t in options]
+            safe_default = [t for t in default_train if t in TRAINING_OPTIONS]
 
-            training = st.multiselect("今天练了什么？", options, default=safe_default)
+            st.multiselect("今天练了什么？", TRAINING_OPTIONS, default=safe_default, key="record_training")
             
             c_diet, c_mood = st.columns(2)
             with c_diet:
-                diet = st.text_area("饮食记录", height=100, placeholder="早餐:...\n午餐:...", value=existing.get("diet", "") if existing else "")
+                st.text_area("饮食记录", height=100, placeholder="早餐:...\n午餐:...", value=existing.get("diet", "") if existing else "", key="record_diet")
             with c_mood:
-                mood = st.text_area("今日感受", height=100, placeholder="状态不错，重量涨了...", value=existing.get("mood", "") if existing else "")
-            
-            submit_btn = st.form_submit_button("💾 保存记录", use_container_width=True)
+                st.text_area("今日感受", height=100, placeholder="状态不错，重量涨了...", value=existing.get("mood", "") if existing else "", key="record_mood")
             
-            if submit_btn:
-                new_record = {
-                    "id": existing["id"] if existing else str(datetime.now().timestamp()),
-                    "date": date_str, "training": training, "diet": diet, "mood": mood
-                }
-                st.session_state.data = [r for r in st.session_state.data if r.get("date") != date_str]
-                st.session_state.data.append(new_record)
-                save_data(st.session_state.data)
-                st.success("记录已保存！今天也要美美哒~ 🎉")
-                st.rerun()
+            st.form_submit_button("💾 保存记录", use_container_width=True, on_click=save_record_form, args=(store_cache, user_id))
+            # 记下这一轮用户看到的版本，提交时拿它和最新的比对
+            st.session_state.record_seen = (date_str, record_etag(existing))
+
+        if "record_conflict" in st.session_state: show_record_conflict(store_cache, user_id)
+        if "record_flash" in st.session_state: st.success(st.session_state.pop("record_flash"))
 
     # 2. 历史记录
     elif selected_page == "历史记录":
         st.subheader("📅 你的坚持足迹")
-        if not st.session_state.data: st.info("还没有记录哦，快去记录第一天吧！")
+        if not store: st.info("还没有记录哦，快去记录第一天吧！")
         else:
-            import pandas as pd
-
-            df = pd.DataFrame(st.session_state.data)
-            df['date_obj'] = pd.to_datetime(df['date'])
-            for _, row in df.sort_values(by='date_obj', ascending=False).iterrows():
+            query = st.text_input("🔍 搜饮食/心情", placeholder="比如：重量涨了、牛肉饭（空格分开多个词）").strip()
+            c_month, c_type, c_jump = st.columns([1, 1.4, 1])
+            with c_month:
+                month = st.selectbox("月份", ["全部"] + store.months())
+            with c_type:
+                types = st.multiselect("训练类型", TRAINING_OPTIONS)
+            with c_jump:
+                jump_to = st.date_input("跳到日期", value=None)
+
+            # 筛选只换算成日期区间，分页直接在有序日期索引上切片，不再整表排序
+            start, end = month_range(month) if month != "全部" else (None, None)
+            if jump_to: end = min(end, jump_to) if end else jump_to
+            filter_key = (query, month, tuple(types), jump_to)
+            if st.session_state.get("history_filter") != filter_key:
+                st.session_state.history_filter = filter_key
+                st.session_state.history_page = 0
+            if query:
+                # 有搜索词时按相关度排（全文索引），否则按日期倒序
+                searched = time.perf_counter()
+                total, rows = store_cache.get(user_id).search(query, start, end, types, limit=HISTORY_PAGE_SIZE,
+                                                              offset=st.session_state.history_page * HISTORY_PAGE_SIZE)
+                st.caption(f"找到 {total} 条，用时 {(time.perf_counter() - searched) * 1000:.0f} ms")
+            else:
+                total = store.count(start, end, types)
+            pages = max((total - 1) // HISTORY_PAGE_SIZE + 1, 1)
+            page = min(st.session_state.history_page, pages - 1)
+
+            if not query: rows = store.newest_first(start, end, types, offset=page * HISTORY_PAGE_SIZE, limit=HISTORY_PAGE_SIZE)
+            if not rows: st.info("这个条件下没有记录哦～")
+            # 删除时和上一轮显示给用户的版本比对，别把别处刚改过的内容删掉
+            seen_before = st.session_state.get("history_seen", {})
+            st.session_state.history_seen = {row['id']: record_etag(row) for row in rows}
+            for row in rows:
                 with st.expander(f"{row['date']} | {' '.join(row['training'])}"):
                     st.markdown(f"**🥗 饮食**: {row['diet']}")
                     st.markdown(f"**💭 感受**: {row['mood']}")
                     if st.button("🗑️ 删除", key=row['id']):
-                        st.session_state.data = [d for d in st.session_state.data if d['id'] != row['id']]
-                        save_data(st.session_state.data)
-                        st.rerun()
+                        try:
+                            store_cache.delete(row['id'], user_id, expected=seen_before.get(row['id']))
+                            st.rerun()
+                        except ConflictError:
+                            st.warning("这条记录刚在别处被改过，上面已是最新内容，确认要删再点一次")
+
+            c_prev, c_page, c_next = st.columns([1, 2, 1])
+            with c_prev:
+                if st.button("⬅️ 上一页", disabled=page <= 0):
+                    st.session_state.history_page = page - 1
+                    st.rerun()
+            with c_page:
+                st.caption(f"第 {page + 1} / {pages} 页 · 共 {total} 条")
+            with c_next:
+                if st.button("下一页 ➡️", disabled=page >= pages - 1):
+                    st.session_state.history_page = page + 1
+                    st.rerun()
+        show_import_export(store_cache, user_id, store)
 
     # 3. 生成周报 (重点修改)
     elif selected_page == "生成周报":
         st.subheader("✨ 生成你的周报")
         ref_date = st.date_input("选择本周任意一天", datetime.today())
-        start, end = get_week_range(ref_date)
-        current_data = [d for d in st.session_state.data if start <= datetime.strptime(d['date'], "%Y-%m-%d").date() <= end]
-        week_str = f"{start:%m.%d} - {end:%m.%d}"
+        week = store.week_stats(ref_date)
+        week_str = f"{week['start']:%m.%d} - {week['end']:%m.%d}"
 
-        if not current_data:
+        if not week["records"]:
             st.warning("这一周还没有数据哦！")
         else:
-            from collections import Counter
-            all_parts = [p for d in current_data for p in d.get("training", []) if p != "休息日"]
-            training_days = len([d for d in current_data if any(t != "休息日" for t in d.get("training", []))])
-            part_counts = Counter(all_parts)
-            mood_text = " ".join([d.get("mood", "") for d in current_data])
-            summary = generate_week_summary_sentence(training_days, part_counts, mood_text)
+            training_days, part_counts = week["trained_days"], week["part_counts"]
+            summary = generate_week_summary_sentence(training_days, part_counts, score=week["mood_score"])
             
             # --- 动态预览区域 (Bento Style) ---
             st.markdown("##### 📱 动态预览")
             # 标题卡片
-            st.markdown(f"""
-            <div class="bento-card">
-                <div style="display:flex;justify-content:space-between;align-items:center;">
-                    <div>
-                        <p style="color:#8B5F65;font-family:'Times New Roman';font-size:28px;font-weight:bold;margin:0;">WEEKLY LOG</p>
-                        <div style="color:#666;font-size:14px;">📅 {week_str}</div>
-                    </div>
-                    <div style="text-align:right;">
-                         <div style="background:#FFB7B2;color:white;padding:5px 10px;border-radius:10px;font-size:14px;font-weight:bold;">
-                            练了 {training_days} 天
-                         </div>
-                    </div>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+            st.markdown(week_header(week_str, training_days), unsafe_allow_html=True)
             
             # 图表和数据并排 (网页预览保持左右布局比较好看，静态图再居中)
             c_chart, c_list = st.columns([1.2, 1])
             with c_chart:
-                fig = get_interactive_donut_chart(part_counts)
-                st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+                show_week_chart(part_counts)
             with c_list:
                 st.markdown("**🎯 训练重点**")
                 if part_counts:
-                    for part, count in part_counts.most_common(4):
-                         st.markdown(f"""
-                         <div style="margin-bottom:8px;font-size:14px;color:#555;">
-                            <span class="stat-badge">🥑</span> {part}: <b>{count}次</b>
-                         </div>""", unsafe_allow_html=True)
+                    st.markdown(focus_badges(tuple(part_counts.most_common(4))), unsafe_allow_html=True)
                 else:
                     st.markdown("✨ 主打一个休息")
 
@@ -569,29 +613,76 @@ def main():
             # --- 功能区 ---
             col1, col2 = st.columns(2)
             with col1:
-                st.markdown("##### 🖼️ 朋友圈打卡图")
-                if st.button("生成图片", key="gen_img"):
-                    # 调用修改后的 create_summary_image，生成居中布局的图片
-                    img = create_summary_image(week_str, training_days, part_counts, summary)
-                    st.image(img, caption="长按/右键保存", use_container_width=True)
-                    buf = io.BytesIO()
-                    img.save(buf, format="PNG")
-                    st.download_button("📥 下载原图", buf.getvalue(), "weekly.png", "image/png")
+                show_share_image(week_str, training_days, part_counts, summary)
             
             with col2:
                 st.markdown("##### ✍️ 小红书文案")
-                if st.button("AI 写文案", key="gen_copy"):
-                    with st.spinner("AI 正在头脑风暴..."):
-                        prompt = f"请为我写一篇健身周报小红书文案。\n数据：练了{training_days}天，部位{', '.join(part_counts.keys())}。\n记录：\n" + "\n".join([f"{d['date']}:{d['mood']}" for d in current_data])
-                        sys_prompt = "你是一个健身博主。写小红书文案，第一人称，真实接地气，不要AI味。结尾加互动和Hashtag。"
-                        res = consult_ai_advisor(sys_prompt, prompt)
-                        st.session_state.weekly_copy = res
-                
+                gen_copy = st.button("AI 写文案", key="gen_copy")
+                regen_copy = bool(st.session_state.get("weekly_copy")) and st.button("🔄 不满意？换一版", key="regen_copy")
+                if gen_copy or regen_copy:
+                    # 本周逐日 + 前几周/几个月的摘要，按 token 预算拼；摘要按周/月缓存，不随历史变长
+                    sys_prompt = "你是一个健身博主。写小红书文案，第一人称，真实接地气，不要AI味。可以和之前几周/上个月比一比进步。结尾加互动和Hashtag。"
+                    prompt = build_copy_prompt(store, ref_date, sys_prompt, budget=int(_float_setting("AI_PROMPT_TOKENS", DEFAULT_TOKEN_BUDGET)))
+                    st.session_state.copy_prompt = prompt
+                    start_ai_job("copy_job", sys_prompt, prompt["text"], fresh=regen_copy)
+                if st.session_state.get("copy_prompt"):
+                    info = st.session_state.copy_prompt
+                    st.caption(f"📏 提示词约 {info['tokens']} tokens（预算 {info['budget']}"
+                               + (f"，放不下省掉了 {info['dropped']} 行较早的摘要" if info["dropped"] else "") + "）")
+                # 后台边写边显示，写完再整体放进下面的文本框
+                copy = show_ai_job("copy_job", "AI 正在头脑风暴...", keep=False)
+                if copy is not None:
+                    st.session_state.weekly_copy = copy
+                    del st.session_state["copy_job"]
+
                 if st.session_state.get("weekly_copy"):
                     render_copy_button(st.session_state.weekly_copy)
                     st.text_area("文案结果", st.session_state.weekly_copy, height=350)
 
-    # 4. 今天吃什么
+        if store:
+            with st.expander(f"📦 一键导出所有周的打卡图（共 {len(store.week_starts())} 周）"):
+                st.caption("画过的周直接用缓存，其余多进程并行画，打包成一个 ZIP")
+                if st.button("开始打包", key="export_weeks"):
+                    from batch_reports import export_week_reports
+
+                    bar = st.progress(0.0)
+                    buf = io.BytesIO()
+                    with prof.stage("batch_export"):
+                        stats = export_week_reports(store_cache.get(user_id), buf, cache=get_image_cache(), renderer=get_setting("DONUT_RENDERER", default="pil"),
+                                                    workers=int(get_setting("EXPORT_WORKERS", default="0") or 0) or None,
+                                                    progress=lambda done, total: bar.progress(done / total, text=f"{done}/{total}"))
+                    st.caption(f"{stats['weeks']} 周：缓存命中 {stats['cached']}，新画 {stats['rendered']}")
+                    st.download_button("📥 下载 ZIP", buf.getvalue(), "weekly_reports.zip", "application/zip")
+
+    # 4. 趋势分析
+    elif selected_page == "趋势分析":
+        st.subheader("📈 长期趋势")
+        with prof.stage("trends_compute"):
+            trends = store_trends(store_cache.get(user_id), today)
+        if trends is None: st.info("还没有记录哦，记几天再来看趋势吧～")
+        else:
+            c1, c2, c3, c4 = st.columns(4)
+            c1.metric("当前连续训练", f"{trends['current_streak']} 天")
+            c2.metric("最长连续训练", f"{trends['longest_streak']} 天")
+            c3.metric("平均每周训练", f"{trends['avg_week_days']:.1f} 天")
+            c4.metric("休息日占比", f"{trends['rest_ratio']:.0%}")
+
+            with prof.stage("chart_build"):
+                frequency, parts, grain = chart_tables(trends)
+                freq_fig, mix_fig = get_trend_charts(frequency, parts, grain)
+            st.markdown(f"##### 🏋️‍♀️ 每{grain}训练频率")
+            st.plotly_chart(freq_fig, use_container_width=True, config={'displayModeBar': False})
+            st.markdown("##### 🍑 部位占比变化")
+            if parts.empty: st.caption("还没有训练部位的记录")
+            else: st.plotly_chart(mix_fig, use_container_width=True, config={'displayModeBar': False})
+
+            with st.expander("📅 按月明细"):
+                monthly = trends["monthly"].iloc[::-1]
+                st.dataframe(monthly.rename(columns={"trained_days": "训练天数", "recorded_days": "记录天数", "days": "天数",
+                                                     "rest_ratio": "休息日占比"}).set_axis(monthly.index.strftime("%Y-%m")),
+                             use_container_width=True, column_config={"休息日占比": st.column_config.NumberColumn(format="percent")})
+
+    # 5. 今天吃什么
     elif selected_page == "今天吃什么":
         st.subheader("🍽️ 营养师帮你选")
         with st.container():
@@ -599,28 +690,38 @@ def main():
             with col1: goal = st.selectbox("当前目标", ["减脂", "维持体重", "增肌"])
             with col2: scenario = st.selectbox("场景", ["点外卖", "自己做", "外出聚餐", "便利店"])
             preference = st.text_input("想吃什么类型？", placeholder="例：想吃辣的、想嗦粉...")
+            fresh = st.checkbox("🔄 换个新回答", key="food_fresh")
             
             if st.button("💡 给我推荐", use_container_width=True):
-                with st.spinner("正在扫描菜单库..."):
-                    sys = "你是一个懂营养学的健身搭子。推荐1-2个具体搭配，说明理由，如果是外卖给出一个避雷技巧。语气轻松。"
-                    user = f"目标{goal}，场景{scenario}，偏好{preference}。请推荐。"
-                    advice = consult_ai_advisor(sys, user)
-                    st.markdown(f"<div class='chat-bubble'><b>🥑 推荐方案：</b><br>{advice.replace(chr(10), '<br>')}</div>", unsafe_allow_html=True)
+                sys = "你是一个懂营养学的健身搭子。推荐1-2个具体搭配，说明理由，如果是外卖给出一个避雷技巧。语气轻松。"
+                user = f"目标{goal}，场景{scenario}，偏好{preference}。请推荐。"
+                start_ai_job("food_job", sys, user, fresh=fresh)
+            show_ai_job("food_job", "正在扫描菜单库...", title="<b>🥑 推荐方案：</b><br>")
 
-    # 5. 急救指南
+    # 6. 急救指南
     elif selected_page == "急救指南":
         st.subheader("🆘 吃多了别慌")
         food = st.text_input("吃了什么？", placeholder="火锅、蛋糕...")
         feeling = st.select_slider("现在的感觉", options=["有点撑", "好撑啊", "撑到怀疑人生"])
+        fresh = st.checkbox("🔄 换个新回答", key="sos_fresh")
         
         if st.button("🧘‍♀️ 帮我分析 & 补救", use_container_width=True):
             if not food: st.warning("先告诉我是啥呀~")
             else:
-                with st.spinner("正在安抚你的胃..."):
-                    sys = "温暖治愈的健身博主。1.安抚情绪拒绝焦虑。2.给出未来24h饮食运动建议。语气温柔像闺蜜。"
-                    user = f"吃了{food}，感觉{feeling}。很焦虑。"
-                    res = consult_ai_advisor(sys, user)
-                    st.markdown(f"<div class='chat-bubble'>{res.replace(chr(10), '<br>')}</div>", unsafe_allow_html=True)
+                sys = "温暖治愈的健身博主。1.安抚情绪拒绝焦虑。2.给出未来24h饮食运动建议。语气温柔像闺蜜。"
+                user = f"吃了{food}，感觉{feeling}。很焦虑。"
+                start_ai_job("sos_job", sys, user, fresh=fresh)
+        show_ai_job("sos_job", "正在安抚你的胃...")
+
+    prof.lap("page")
+    if prof.enabled:
+        prof.note("ai_cache", get_response_cache().stats())
+        prof.note("store_cache", get_store_cache().stats())
+        prof.note("ttft", ttft_stats())
+        prof.note("ai_jobs", get_job_runner().stats())
+        show_profile_panel(prof)
+        st.session_state.last_profile = prof.finish(page=selected_page, user=user_id, records=len(store))
 
 if __name__ == "__main__":
-    main()
+    with timed_imports(profiling_enabled()):
+        main()
@@ -0,0 +1,72 @@
+"""
+批量导出周报分享图：遍历所有有记录的周，缓存里已有的直接拿，其余丢进进程池并行画，
+画好一张就往 ZIP 里写一张（PNG 本身已压缩，ZIP 里只存不压）
+
+网页（生成周报页底部）和命令行（``python cli.py export-weeks``）共用这里的 ``export_week_reports``
+"""
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from records import generate_week_summary_sentence
+from share_image import FONTS, render_summary_png, summary_cache_key
+
+def week_report(store, ref_date):
+    """ref_date 所在周的 (文件名, week_str, 训练天数, 部位计数, 总结句)，和生成周报页的算法一致"""
+    week = store.week_stats(ref_date)
+    week_str = f"{week['start']:%m.%d} - {week['end']:%m.%d}"
+    summary = generate_week_summary_sentence(week["trained_days"], week["part_counts"], score=week["mood_score"])
+    return f"weekly_{week['start']:%Y-%m-%d}.png", week_str, week["trained_days"], week["part_counts"], summary
+
+def week_reports(store):
+    """每个有记录的周一份 week_report"""
+    return [week_report(store, start) for start in store.week_starts()]
+
+def _init_worker(font_path):
+    FONTS.configure(font_path)
+
+def _render(report, renderer):
+    _, week_str, total_days, parts, summary = report
+    return render_summary_png(week_str, total_days, parts, summary, renderer=renderer)
+
+def export_week_reports(store, fileobj, cache=None, renderer="pil", workers=None, progress=None):
+    """
+    把所有周的分享图写进 fileobj（路径或可写的文件对象）里的 ZIP，返回 {"weeks", "cached", "rendered"}。
+    progress(已完成, 总数) 每写一张调用一次。
+    进程池用 spawn 启动，不从 Streamlit 的多线程进程里 fork；只剩一两张要画时就在本进程里画，省掉起进程的开销
+    """
+    reports = week_reports(store)
+    keys = [summary_cache_key(*r[1:], renderer) for r in reports]
+    todo = []
+    done = 0
+    stats = {"weeks": len(reports), "cached": 0, "rendered": 0}
+    with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_STORED) as zf:
+        def _write(i, png, rendered=False):
+            nonlocal done
+            zf.writestr(reports[i][0], png)
+            if rendered and cache: cache.put(keys[i], png)
+            done += 1
+            if progress: progress(done, len(reports))
+
+        for i, key in enumerate(keys):
+            png = cache.get(key) if cache else None
+            if png is None:
+                todo.append(i)
+                continue
+            stats["cached"] += 1
+            _write(i, png)
+
+        workers = min(workers or os.cpu_count() or 1, len(todo))
+        if workers <= 1 or len(todo) <= 2:
+            for i in todo:
+                _write(i, _render(reports[i], renderer), rendered=True)
+        else:
+            import multiprocessing
+
+            with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_init_worker, initargs=(FONTS.path,)) as pool:
+                futures = {pool.submit(_render, reports[i], renderer): i for i in todo}
+                for future in as_completed(futures):
+                    _write(futures[future], future.result(), rendered=True)
+        stats["rendered"] = len(todo)
+    return stats
@@ -0,0 +1,66 @@
+"""
+分享图圆环渲染对比：Pillow vs matplotlib
+
+每种渲染器在独立子进程里跑，分别记录首张图耗时（含 import）、之后每张的平均耗时和进程峰值内存。
+
+    python benchmarks/bench_donut.py [--runs 20]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PARTS = Counter({"臀腿": 3, "肩背": 2, "有氧/滚泡沫轴": 2, "生理期调整": 1})
+
+def run_one(renderer, runs):
+    sys.path.insert(0, ROOT)
+    from share_image import create_summary_image
+
+    t0 = time.perf_counter()
+    create_summary_image("10.12 - 10.18", 4, PARTS, "这周练了4天，臀腿是主场，状态还挺在线～", renderer=renderer)
+    first = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for _ in range(runs):
+        create_summary_image("10.12 - 10.18", 4, PARTS, "这周练了4天，臀腿是主场，状态还挺在线～", renderer=renderer)
+    warm = (time.perf_counter() - t0) / runs
+
+    # Linux 上 ru_maxrss 单位是 KB，macOS 上是字节
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+    print(json.dumps({"renderer": renderer, "first_ms": first * 1000, "warm_ms": warm * 1000, "peak_rss_mb": peak_mb}))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_one(args.child, args.runs)
+        return
+
+    results = {}
+    for renderer in ["pil", "matplotlib"]:
+        out = subprocess.run([sys.executable, __file__, "--child", renderer, "--runs", str(args.runs)],
+                             capture_output=True, text=True)
+        if out.returncode != 0:
+            print(f"{renderer}: 跑不起来\n{out.stderr.strip()}")
+            continue
+        results[renderer] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    print(f"{'renderer':<12}{'首张(ms)':>12}{'每张(ms)':>12}{'峰值RSS(MB)':>14}")
+    for r in results.values():
+        print(f"{r['renderer']:<12}{r['first_ms']:>12.1f}{r['warm_ms']:>12.1f}{r['peak_rss_mb']:>14.1f}")
+    if len(results) == 2:
+        pil, mpl = results["pil"], results["matplotlib"]
+        print(f"\nPillow 相比 matplotlib：每张快 {mpl['warm_ms'] / pil['warm_ms']:.1f} 倍，"
+              f"峰值内存少 {mpl['peak_rss_mb'] - pil['peak_rss_mb']:.1f} MB")
+
+if __name__ == "__main__":
+    main()
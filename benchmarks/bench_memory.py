@@ -0,0 +1,57 @@
+"""
+记录在内存里占多少：用 tracemalloc 量 RecordStore 常驻内存，和“每条一个 dict”的旧存法对比
+
+    python benchmarks/bench_memory.py --sizes 10000,100000 --sessions 20
+
+- dict 列表：以前 st.session_state.data 的存法，每个会话各一份
+- RecordStore：所有会话共享一份（StoreCache），会话数再多也只有这一份
+数据从 JSON 文本解析出来再建索引，和 load_data 的真实路径一样；解析出来的临时 dict 建完即丢。
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, HERE)
+
+from make_data import generate_records  # noqa: E402
+
+def _measure(build):
+    """build() 返回的对象常驻占用多少字节（建的过程中产生的临时对象不算）"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    peak = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return obj, size, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--sessions", type=int, default=20, help="按多少个同时在线的会话折算")
+    args = parser.parse_args()
+
+    from records import RecordStore
+    from storage import normalize_record
+
+    mb = lambda n: f"{n / 1024 / 1024:.1f} MB"
+    print(f"{'条数':>7} {'dict 列表':>10} {'RecordStore':>12} {'建索引峰值':>10} {'每条':>8}   {args.sessions} 个会话：旧(每会话一份) / 现在(共享)")
+    for n in (int(s) for s in args.sizes.split(",")):
+        payload = json.dumps(generate_records(n, skip=0), ensure_ascii=False)
+        dicts, dict_size, _ = _measure(lambda: [normalize_record(r) for r in json.loads(payload)])
+        del dicts
+        store, store_size, store_peak = _measure(lambda: RecordStore([normalize_record(r) for r in json.loads(payload)], normalized=True))
+        assert len(store) == n
+        print(f"{n:>7} {mb(dict_size):>10} {mb(store_size):>12} {mb(store_peak):>10} {store_size / n:>6.0f} B"
+              f"   {mb(dict_size * args.sessions + store_size)} / {mb(store_size)}")
+        del store
+
+if __name__ == "__main__":
+    main()
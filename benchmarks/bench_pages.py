@@ -0,0 +1,81 @@
+"""
+无界面的整页基准：用 streamlit.testing.v1.AppTest 把每个页面各跑一遍冷启动 + 若干次重跑，
+数据是 make_data.py 生成的 100 / 1万 / 10万 条每日记录；每次重跑的分阶段耗时、发给浏览器的字节数来自 PROFILE 日志
+
+    python benchmarks/bench_pages.py                       # 默认 100,10000,100000 条，每页重跑 5 次
+    python benchmarks/bench_pages.py --sizes 100,10000 --reruns 10 --json bench_pages.json
+
+AI 相关页面只渲染、不点按钮，不会发请求。
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from make_data import generate_records  # noqa: E402
+
+PAGES = ["今日记录", "历史记录", "生成周报", "趋势分析", "今天吃什么", "急救指南"]
+
+def _last_profile(log_path):
+    with open(log_path, encoding="utf-8") as f:
+        return json.loads(f.readlines()[-1])
+
+def bench_size(n, reruns):
+    import streamlit as st
+    import streamlit_option_menu
+    from streamlit.testing.v1 import AppTest
+
+    workdir = tempfile.mkdtemp(prefix=f"bench-pages-{n}-")
+    with open(os.path.join(workdir, "fitness_data.json"), "w", encoding="utf-8") as f:
+        json.dump(generate_records(n, skip=0), f, ensure_ascii=False)
+    os.chdir(workdir)
+    log_path = os.environ["PROFILE_LOG"] = os.path.join(workdir, "profile.jsonl")
+    st.cache_resource.clear()
+    st.cache_data.clear()
+
+    results = []
+    for page in PAGES:
+        streamlit_option_menu.option_menu = lambda *a, _page=page, **k: _page
+        at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=300)
+        timings = []
+        for i in range(reruns + 1):
+            started = time.perf_counter()
+            at.run()
+            timings.append((time.perf_counter() - started) * 1000)
+            if at.exception: raise RuntimeError(f"{page}: {at.exception[0].value}")
+        profile = _last_profile(log_path)
+        warm = timings[1:] or timings
+        results.append({"records": n, "page": page, "cold_ms": round(timings[0], 1),
+                        "warm_p50_ms": round(statistics.median(warm), 1), "warm_max_ms": round(max(warm), 1),
+                        "payload_kb": round(profile["payload"]["bytes"] / 1024, 1) if profile["payload"] else float("nan"),
+                        "laps": profile["laps"], "stages": {k: v["ms"] for k, v in profile["stages"].items()}})
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,10000,100000", help="逗号分隔的记录条数")
+    parser.add_argument("--reruns", type=int, default=5, help="冷启动之后每页再重跑几次")
+    parser.add_argument("--json", default=None, help="把结果另存成 JSON")
+    args = parser.parse_args()
+
+    os.environ["PROFILE"] = "1"
+    rows = []
+    print(f"{'条数':>7} {'页面':<6} {'冷启动ms':>9} {'重跑p50':>8} {'重跑max':>8} {'KB/次':>6}  分阶段（最后一次重跑，ms）")
+    for n in (int(s) for s in args.sizes.split(",")):
+        for row in bench_size(n, args.reruns):
+            rows.append(row)
+            parts = " ".join(f"{k}={v:.0f}" for k, v in {**row["laps"], **row["stages"]}.items())
+            print(f"{n:>7} {row['page']:<6} {row['cold_ms']:>9.0f} {row['warm_p50_ms']:>8.0f} {row['warm_max_ms']:>8.0f} {row['payload_kb']:>6.1f}  {parts}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
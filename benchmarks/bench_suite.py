@@ -0,0 +1,109 @@
+"""
+数据路径 + 出图路径的回归基准（pytest-benchmark），对比 benchmarks/baseline.json 里存的基线
+
+    pip install pytest-benchmark
+    python -m pytest benchmarks/bench_suite.py                       # 跑一遍；有项目比基线慢超过 50% 就失败
+    python -m pytest benchmarks/bench_suite.py --bench-threshold 1   # 放宽到慢 100% 才算回归
+    python -m pytest benchmarks/bench_suite.py --bench-save          # 把这次结果存成新基线（换机器/确认变快后再存）
+    python -m pytest benchmarks/bench_suite.py -k "donut or load"    # 只跑名字里带这些字的项目
+
+数据用 make_data.py 生成（默认 3 年，--bench-years 改，带 3% 坏行/重复行），造数据、写文件、预热都在 session 级 fixture 里
+做完，不计入耗时。循环次数和轮数由 pytest-benchmark 定，和基线比的是最快一轮的单次耗时；pytest-benchmark 自己的
+--benchmark-* 参数（--benchmark-autosave / --benchmark-compare 等）照常能用。基线和机器相关，CI 上请在同一台机器上存基线。
+文件名不以 test_ 开头，``python -m pytest tests`` 和在根目录直接跑 pytest 都不会带上它；没装 pytest-benchmark 时整个文件跳过
+"""
+import json
+import os
+import shutil
+from collections import Counter
+from datetime import date, datetime
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from make_data import generate_records  # noqa: E402  benchmarks/conftest.py 把 benchmarks/ 和仓库根目录放进了 sys.path
+
+PARTS = Counter({"臀腿": 3, "肩背": 2, "有氧/滚泡沫轴": 1})  # 和 week_stats 给的一样是 Counter
+CASES = ["load_data", "load_data_journal", "save_data", "upsert_record", "record_store_build", "week_filter_all_weeks",
+         "week_filter_scan_52", "week_summary_sentence_all", "donut_static_pil", "summary_image_pil",
+         "interactive_donut_plotly", "interactive_donut_cached"]
+
+def build_cases(years, workdir):
+    """返回 {名字: 无参函数}；准备工作（造数据、写文件、预热字体）都在这里做完，不计入耗时"""
+    import storage
+    from records import RecordStore, generate_week_summary_sentence, get_week_range
+    from share_image import create_donut_chart_image_static, create_summary_image
+
+    rows = generate_records(int(years * 365), seed=1, dirty=0.03, end=date(2026, 1, 4))
+    snapshot = os.path.join(workdir, "snapshot.json")
+    with open(snapshot, "w", encoding="utf-8") as f:
+        json.dump(rows, f, ensure_ascii=False, indent=4)
+    # 快照 + 一段还没压缩的日志（关掉自动压缩，保持文件不变）
+    storage.COMPACT_MIN_BYTES = 1 << 40
+    journaled = os.path.join(workdir, "journaled.json")
+    shutil.copy(snapshot, journaled)
+    records = storage.load_data(snapshot)
+    storage.upsert_records([dict(r, mood=r["mood"] + "!") for r in records[-300:]], journaled)
+    save_target = os.path.join(workdir, "save.json")
+    append_target = os.path.join(workdir, "append.json")
+
+    store = RecordStore(records)
+    week_starts = store.week_starts()
+    stats = [store.week_stats(w) for w in week_starts]
+    sentence = generate_week_summary_sentence(4, stats[-1]["part_counts"], score=1)
+
+    def week_filter():
+        for w in week_starts:
+            store.week(w)
+
+    valid = store.records()
+
+    def week_filter_scan():
+        """旧写法：每周全表扫一遍再 strptime，留着对照"""
+        for w in week_starts[-52:]:
+            start, end = get_week_range(w)
+            [r for r in valid if start <= datetime.strptime(r["date"], "%Y-%m-%d").date() <= end]
+
+    def summary_sentences():
+        for s in stats:
+            generate_week_summary_sentence(s["trained_days"], s["part_counts"], score=s["mood_score"])
+
+    cases = [
+        ("load_data", lambda: storage.load_data(snapshot)),
+        ("load_data_journal", lambda: storage.load_data(journaled)),
+        ("save_data", lambda: storage.save_data(records, save_target)),
+        ("upsert_record", lambda: storage.upsert_record(records[-1], append_target)),
+        ("record_store_build", lambda: RecordStore(records, normalized=True)),
+        ("week_filter_all_weeks", week_filter),
+        ("week_filter_scan_52", week_filter_scan),
+        ("week_summary_sentence_all", summary_sentences),
+        ("donut_static_pil", lambda: create_donut_chart_image_static(PARTS, (255, 253, 249))),
+        ("summary_image_pil", lambda: create_summary_image("01.05 - 01.11", 4, PARTS, sentence)),
+    ]
+    try:
+        import app  # 只为了拿 Plotly 圆环图；不在 Streamlit 里跑时 st.* 调用都是空操作
+
+        cases.append(("interactive_donut_plotly", lambda: app.build_donut_chart(PARTS)))
+        cases.append(("interactive_donut_cached", lambda: app.get_interactive_donut_chart(PARTS)))
+    except ImportError:
+        pass  # 缺 plotly 之类的依赖时这两项跳过
+    for _, fn in cases:
+        fn()  # 预热：字体、惰性导入、文件缓存
+    return dict(cases)
+
+@pytest.fixture(scope="session")
+def bench_cases(request, tmp_path_factory):
+    import storage
+
+    compact_min = storage.COMPACT_MIN_BYTES
+    yield build_cases(request.config.getoption("bench_years"), str(tmp_path_factory.mktemp("bench-suite")))
+    storage.COMPACT_MIN_BYTES = compact_min
+
+@pytest.mark.parametrize("name", CASES)
+def test_bench(name, bench_cases, benchmark, bench_baseline):
+    fn = bench_cases.get(name)
+    if fn is None: pytest.skip(f"{name} 需要的依赖没装")
+    benchmark.group = "data" if name.startswith(("load", "save", "upsert", "record", "week")) else "image"
+    benchmark(fn)
+    bench_baseline.check(name, benchmark)
@@ -0,0 +1,62 @@
+"""
+bench_suite.py 的命令行参数和基线对比：``--bench-years``、``--bench-threshold``、``--bench-save``；
+基线是 benchmarks/baseline.json 里每项的单次耗时（秒）
+"""
+import json
+import os
+import platform
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, HERE)
+
+BASELINE_FILE = os.path.join(HERE, "baseline.json")
+
+def pytest_addoption(parser):
+    group = parser.getgroup("bench_suite", "bench_suite.py 的基线")
+    group.addoption("--bench-years", type=float, default=3, help="造多少年的数据（默认 3，和基线一致才有可比性）")
+    group.addoption("--bench-threshold", type=float, default=0.50, help="比基线慢多少算回归（0.50 = 50%%）")
+    group.addoption("--bench-save", action="store_true", help="把这次结果存成新基线，不做对比")
+
+def _fmt(seconds):
+    return f"{seconds * 1e6:.1f}µs" if seconds < 1e-3 else f"{seconds * 1e3:.2f}ms"
+
+class Baseline:
+    def __init__(self, config):
+        self.years = config.getoption("bench_years")
+        self.threshold = config.getoption("bench_threshold")
+        self.save = config.getoption("bench_save")
+        self.results = {}
+        self.stored = {}
+        if os.path.exists(BASELINE_FILE):
+            with open(BASELINE_FILE, encoding="utf-8") as f:
+                self.stored = json.load(f)
+
+    def check(self, name, benchmark):
+        """记下这一项最快一轮的单次耗时，比基线慢超过阈值就判失败；--benchmark-disable 时没有统计，不比"""
+        if benchmark.stats is None: return
+        best = benchmark.stats.stats.min
+        self.results[name] = best
+        base = self.stored.get("results", {}).get(name)
+        if self.save or not base: return
+        if self.stored.get("years", self.years) != self.years:
+            pytest.skip(f"基线是用 --bench-years {self.stored['years']} 存的，这次是 {self.years}，对比没有意义")
+        if best > base * (1 + self.threshold):
+            pytest.fail(f"{name}：{_fmt(best)}，基线 {_fmt(base)}（{best / base - 1:+.0%}，阈值 {self.threshold:.0%}）")
+
+    def write(self):
+        """只跑了一部分（-k）时和原来的基线合并"""
+        merged = {**self.stored.get("results", {}), **self.results} if self.stored.get("years") == self.years else self.results
+        with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+            json.dump({"years": self.years, "python": platform.python_version(), "machine": platform.machine(),
+                       "results": {k: round(v, 9) for k, v in sorted(merged.items())}}, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+
+@pytest.fixture(scope="session")
+def bench_baseline(pytestconfig):
+    baseline = Baseline(pytestconfig)
+    yield baseline
+    if baseline.save and baseline.results: baseline.write()
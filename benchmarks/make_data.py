@@ -0,0 +1,84 @@
+"""
+造数据：生成若干年“像真的一样”的每日记录（normalize_record 的格式），可以混进重复行和坏行
+
+    python benchmarks/make_data.py --years 5 --out fitness_data.json
+    python benchmarks/make_data.py --years 10 --dirty 0.05 --seed 7 --out /tmp/big.json
+
+- 训练内容：一周 3~5 练，部位组合随机，偶尔“休息日”/“生理期调整”，有的天干脆没记
+- 饮食、心情是拼出来的中文短句，心情里会带上周报打分用到的那些词
+- --dirty 按比例混进：同一天重复的记录、同 id 重复、日期格式不对、字段缺失、training 写成字符串、不是 dict 的行
+"""
+import argparse
+import json
+import random
+from datetime import date, timedelta
+
+PARTS = ["臀腿", "肩背", "有氧/滚泡沫轴"]
+MEALS = {
+    "早餐": ["燕麦+鸡蛋", "全麦面包", "豆浆油条", "酸奶碗", "玉米+牛奶", "包子"],
+    "午餐": ["鸡胸肉沙拉", "牛肉饭", "轻食便当", "麻辣烫（少油）", "黄焖鸡", "番茄炒蛋盖饭"],
+    "晚餐": ["清蒸鱼+西兰花", "虾仁炒饭", "火锅", "烤串", "蔬菜汤", "没吃"],
+    "加餐": ["香蕉", "蛋白棒", "奶茶", "坚果一小把", "蛋糕"],
+}
+MOOD_PARTS = [
+    "状态不错", "今天好累", "重量涨了开心", "腿酸到下不了楼", "练完很轻松", "有点困", "出汗好爽",
+    "有点emo", "泡沫轴滚得嗷嗷叫", "没什么感觉", "教练夸我了", "明天继续",
+]
+
+def _training(rng):
+    roll = rng.random()
+    if roll < 0.12: return ["休息日"]
+    if roll < 0.16: return ["生理期调整"]
+    if roll < 0.20: return []
+    return rng.sample(PARTS, rng.choice([1, 1, 2, 2, 3]))
+
+def _diet(rng):
+    meals = [f"{name}:{rng.choice(options)}" for name, options in MEALS.items() if name != "加餐" or rng.random() < 0.4]
+    return "\n".join(meals) if rng.random() > 0.05 else ""
+
+def _mood(rng):
+    return "，".join(rng.sample(MOOD_PARTS, rng.randint(1, 3))) if rng.random() > 0.08 else ""
+
+def _dirty_row(rng, clean, day):
+    kind = rng.randrange(6)
+    if kind == 0: return dict(rng.choice(clean), id=f"dup-{rng.random():.8f}")       # 同一天两条
+    if kind == 1: return dict(rng.choice(clean), mood="重复 id 的另一版")               # 同 id 再来一条
+    if kind == 2: return {"id": "bad-date", "date": day.strftime("%Y/%m/%d"), "training": ["臀腿"]}
+    if kind == 3: return {"date": day.isoformat()}                                      # 只剩日期
+    if kind == 4: return {"id": f"str-{day}", "date": day.isoformat(), "training": rng.choice(PARTS), "diet": None}
+    return rng.choice([None, "坏掉的一行", 42, ["臀腿"]])
+
+def generate_records(days=365 * 3, seed=0, dirty=0.0, end=None, skip=0.1):
+    """
+    从 end（默认今天）往前 days 天的记录列表；skip 是没记录的天的比例，dirty 是坏行占比。
+    返回的列表可以直接 json.dump 成数据文件
+    """
+    rng = random.Random(seed)
+    end = end or date.today()
+    start = end - timedelta(days=days - 1)
+    clean = []
+    for i in range(days):
+        if rng.random() < skip: continue
+        day = start + timedelta(days=i)
+        clean.append({"id": f"{seed}-{i}", "date": day.isoformat(), "training": _training(rng), "diet": _diet(rng), "mood": _mood(rng)})
+    rows = list(clean)
+    for _ in range(int(len(clean) * dirty)):
+        rows.insert(rng.randrange(len(rows) + 1), _dirty_row(rng, clean, start + timedelta(days=rng.randrange(days))))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=float, default=3)
+    parser.add_argument("--days", type=int, default=None, help="直接指定天数，优先于 --years")
+    parser.add_argument("--dirty", type=float, default=0.0, help="坏行/重复行占比，例如 0.03")
+    parser.add_argument("--skip", type=float, default=0.1, help="没记录的天的比例")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="fitness_data.json")
+    args = parser.parse_args()
+    rows = generate_records(args.days or int(args.years * 365), args.seed, args.dirty, skip=args.skip)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(rows, f, ensure_ascii=False, indent=4)
+    print(f"{len(rows)} 行 -> {args.out}")
+
+if __name__ == "__main__":
+    main()
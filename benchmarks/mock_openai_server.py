@@ -0,0 +1,103 @@
+"""
+本地假的 OpenAI 兼容服务，用来在不花钱、不联网的情况下验证超时/重试/熔断
+
+    python benchmarks/mock_openai_server.py --port 8765 --latency 0.5 --fail-rate 0.3
+
+然后把 OPENAI_BASE_URL 指到 http://127.0.0.1:8765/v1 、随便填一个 OPENAI_API_KEY 即可。
+也可以在脚本里 ``serve(port=0)`` 起一个后台实例。
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class MockState:
+    def __init__(self, latency=0.0, fail_rate=0.0, reply="这是一条来自本地假服务的回复～", token_delay=0.02):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.token_delay = token_delay
+        self.reply = reply
+        self.requests = 0
+        self.lock = threading.Lock()
+
+def _make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_stream(self, request):
+            """按 SSE 一个字一个字往外吐，模拟流式输出"""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for ch in state.reply:
+                chunk = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()),
+                         "model": request.get("model", "mock"),
+                         "choices": [{"index": 0, "delta": {"content": ch}, "finish_reason": None}]}
+                self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                time.sleep(state.token_delay)
+            self.wfile.write(b"data: [DONE]\n\n")
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+            with state.lock:
+                state.requests += 1
+            if not self.path.endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": "not found"}})
+                return
+            time.sleep(state.latency)
+            if random.random() < state.fail_rate:
+                self._send_json(500, {"error": {"message": "mock upstream error", "type": "server_error"}})
+                return
+            if request.get("stream"):
+                self._send_stream(request)
+                return
+            self._send_json(200, {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "mock"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": state.reply}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+
+    return Handler
+
+def serve(port=0, latency=0.0, fail_rate=0.0, reply=None):
+    """后台线程起一个服务，返回 (server, state)；base_url 是 f"http://127.0.0.1:{server.server_port}/v1\""""
+    state = MockState(latency, fail_rate, *([reply] if reply else []))
+    server = ThreadingHTTPServer(("127.0.0.1", port), _make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求先睡这么多秒")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="按这个概率返回 500")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="流式输出时每个字之间隔多少秒")
+    args = parser.parse_args()
+    server, state = serve(args.port, args.latency, args.fail_rate)
+    state.token_delay = args.token_delay
+    print(f"mock OpenAI server: http://127.0.0.1:{server.server_port}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
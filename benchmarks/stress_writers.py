@@ -0,0 +1,90 @@
+"""
+多进程并发写入压测：验证文件锁 + 乐观版本下不会丢记录、不会丢更新
+
+    python benchmarks/stress_writers.py --procs 8 --writes 200 --backend json
+    python benchmarks/stress_writers.py --procs 8 --writes 200 --backend sqlite
+
+每个进程：
+- 往自己独占的日期写 ``--writes`` 条记录（检查有没有被别的进程覆盖掉）
+- 对几天“公共”日期做读-改-写：往 mood 里追加自己的标记，冲突了就重读再来（检查有没有丢更新）
+压缩阈值调得很小，压缩会和写入交错发生。最后全部重新读盘核对，任何一项对不上就以非 0 退出。
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import storage  # noqa: E402
+from records import StoreCache  # noqa: E402
+from storage import ConflictError, get_backend, record_etag  # noqa: E402
+
+OWN_START = date(2020, 1, 1)
+SHARED_START = date(2030, 1, 1)
+
+def _worker(args):
+    kind, location, proc, writes, shared_days = args
+    storage.COMPACT_MIN_BYTES = 4 * 1024
+    cache = StoreCache(get_backend(kind, location))
+    conflicts = 0
+    started = time.perf_counter()
+    for j in range(writes):
+        day = (OWN_START + timedelta(days=proc * writes + j)).isoformat()
+        cache.upsert({"id": f"p{proc}-{j}", "date": day, "training": ["臀腿"], "diet": "", "mood": f"p{proc}"},
+                     expected=storage.NO_RECORD)
+        # 每写几条就抢一次公共日期
+        if j % 10: continue
+        shared = (SHARED_START + timedelta(days=j // 10 % shared_days)).isoformat()
+        while True:
+            current = cache.get().get(shared)
+            mood = (current["mood"] + " " if current else "") + f"p{proc}.{j}"
+            record = {"id": current["id"] if current else f"shared-{shared}", "date": shared, "training": [], "diet": "", "mood": mood}
+            try:
+                cache.upsert(record, expected=record_etag(current))
+                break
+            except ConflictError:
+                conflicts += 1
+    return conflicts, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--procs", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=200, help="每个进程写多少条自己的记录")
+    parser.add_argument("--shared-days", type=int, default=3, help="大家一起抢着改的日期有几天")
+    parser.add_argument("--backend", default="json", choices=["json", "sqlite"])
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="stress-")
+    location = os.path.join(workdir, "data.sqlite" if args.backend == "sqlite" else "data.json")
+    get_backend(args.backend, location)  # 先把 SQLite 表建好，别让一群进程同时建
+
+    started = time.perf_counter()
+    with Pool(args.procs) as pool:
+        results = pool.map(_worker, [(args.backend, location, p, args.writes, args.shared_days) for p in range(args.procs)])
+    elapsed = time.perf_counter() - started
+
+    records, version = get_backend(args.backend, location).load_versioned()
+    by_date = {r["date"]: r for r in records}
+    own = [r for r in records if r["date"] < SHARED_START.isoformat()]
+    expected_own = args.procs * args.writes
+    marks = [f"p{p}.{j}" for p in range(args.procs) for j in range(0, args.writes, 10)]
+    moods = " ".join(by_date.get((SHARED_START + timedelta(days=d)).isoformat(), {}).get("mood", "")
+                     for d in range(args.shared_days)).split()
+    lost = sorted(set(marks) - set(moods))
+    writes = expected_own + len(marks)
+    conflicts = sum(c for c, _ in results)
+
+    print(f"backend={args.backend} procs={args.procs} 写入 {writes} 次，用时 {elapsed:.2f}s（{writes / elapsed:.0f} 次/秒）")
+    print(f"自有记录 {len(own)}/{expected_own}，公共日期更新丢失 {len(lost)}，冲突重试 {conflicts} 次，数据版本 {version}")
+    print(f"数据目录：{workdir}")
+    if len(own) != expected_own or lost or len(moods) != len(marks):
+        print("FAILED：有写入丢失")
+        sys.exit(1)
+    print("OK")
+
+if __name__ == "__main__":
+    main()
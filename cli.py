@@ -0,0 +1,101 @@
+"""
+命令行工具（不用开网页）
+
+    python cli.py import-json fitness_data.json --to sqlite --location fitness_data.sqlite --user default
+    python cli.py export-weeks --out weekly_reports.zip --workers 4
+    python cli.py import history.csv --backend sqlite      # CSV / JSONL / Parquet，按扩展名识别
+    python cli.py export backup.parquet
+"""
+import argparse
+import os
+import time
+
+from storage import DEFAULT_USER, get_backend, import_json
+
+def cmd_import_json(args):
+    backend = get_backend(args.to, args.location)
+    count = import_json(args.source, backend, args.user)
+    print(f"导入 {count} 条记录 -> {backend.name} ({args.user})")
+
+def cmd_import(args):
+    from record_io import import_records
+
+    started = time.perf_counter()
+    report = import_records(args.source, get_backend(args.backend, args.location), args.user, fmt=args.format,
+                            batch_size=args.batch_size, progress=lambda rows: print(f"\r已读 {rows} 行", end="", flush=True))
+    print(f"\n导入 {report['imported']} 天（共 {report['rows']} 行，同一天重复 {report['duplicates']} 行，"
+          f"坏行 {report['errors']}，用时 {time.perf_counter() - started:.1f}s）-> {args.backend} ({args.user})")
+    for line_no, error in report["error_samples"]:
+        print(f"  第 {line_no} 行：{error}")
+    if report["errors"] > len(report["error_samples"]): print(f"  …… 还有 {report['errors'] - len(report['error_samples'])} 个坏行没列出")
+
+def cmd_export(args):
+    from record_io import export_records
+    from records import StoreCache
+
+    store = StoreCache(get_backend(args.backend, args.location)).get(args.user)
+    count = export_records(store, args.out, fmt=args.format)
+    print(f"导出 {count} 条记录 -> {args.out}")
+
+def cmd_export_weeks(args):
+    from batch_reports import export_week_reports
+    from records import StoreCache
+    from share_image import FONTS, PngCache
+
+    FONTS.configure(args.font or "")
+    store = StoreCache(get_backend(args.backend, args.location)).get(args.user)
+    cache = PngCache(cache_dir=args.cache_dir) if args.cache_dir else None
+    started = time.perf_counter()
+    stats = export_week_reports(store, args.out, cache=cache, renderer=args.renderer, workers=args.workers,
+                                progress=lambda done, total: print(f"\r{done}/{total}", end="", flush=True))
+    print(f"\n{stats['weeks']} 周 -> {args.out}（缓存命中 {stats['cached']}，新画 {stats['rendered']}，"
+          f"用时 {time.perf_counter() - started:.1f}s）")
+
+def _add_store_args(p):
+    p.add_argument("--backend", default=os.environ.get("STORAGE_BACKEND", "json"), choices=["json", "sqlite"])
+    p.add_argument("--location", default=os.environ.get("STORAGE_PATH") or None, help="数据文件，默认 fitness_data.json / fitness_data.sqlite")
+    p.add_argument("--user", default=os.environ.get("FITNESS_USER", DEFAULT_USER))
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="健身记录命令行工具")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("import-json", help="把 JSON 数据文件导入到某个存储后端")
+    p.add_argument("source", help="JSON 数据文件路径（同目录下的 .journal 会一起读）")
+    p.add_argument("--to", default="sqlite", choices=["json", "sqlite"], help="导入到哪个后端，默认 sqlite")
+    p.add_argument("--location", default=None, help="目标数据文件，默认 fitness_data.sqlite / fitness_data.json")
+    p.add_argument("--user", default=DEFAULT_USER, help="导入到哪个用户名下")
+    p.set_defaults(func=cmd_import_json)
+
+    p = sub.add_parser("import", help="从 CSV / JSONL / Parquet 批量导入记录（流式读，坏行跳过并报告）")
+    p.add_argument("source", help="要导入的文件")
+    _add_store_args(p)
+    p.add_argument("--format", default=None, choices=["csv", "jsonl", "parquet"], help="不给就按扩展名识别")
+    p.add_argument("--batch-size", type=int, default=1000, help="每多少行写一次盘")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("export", help="把记录导出成 CSV / JSONL / Parquet")
+    p.add_argument("out", help="输出文件")
+    _add_store_args(p)
+    p.add_argument("--format", default=None, choices=["csv", "jsonl", "parquet"], help="不给就按扩展名识别")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("export-weeks", help="把所有周的周报分享图打包成 ZIP")
+    _add_store_args(p)
+    p.add_argument("--out", default="weekly_reports.zip")
+    p.add_argument("--workers", type=int, default=None, help="并行进程数，默认 CPU 核数")
+    p.add_argument("--renderer", default=os.environ.get("DONUT_RENDERER", "pil"), choices=["pil", "matplotlib"])
+    p.add_argument("--cache-dir", default=os.environ.get("IMAGE_CACHE_DIR") or None, help="分享图磁盘缓存，画过的周直接跳过")
+    p.add_argument("--font", default=os.environ.get("FONT_PATH"), help="中文字体文件")
+    p.set_defaults(func=cmd_export_weeks)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        args.func(args)
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"出错了：{e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+性能剖析（默认关闭，配置 PROFILE=1 打开）
+
+- 每次页面重跑记录各阶段耗时：``lap`` 记顶层阶段（读数据 / 侧边栏 / 页面），``stage`` 记页面里的小块（画图、出图、AI）
+- 重型库（pandas / plotly / PIL / openai …）第一次被 import 时记下耗时，每个进程只有一次；
+  只在 ``timed_imports`` 里给 ``__import__`` 套计时，出来就换回原样
+- 这次重跑发给浏览器的消息（ForwardMsg）条数和字节数，看每次重跑 websocket 上传了多少。
+  Streamlit 没有公开的钩子，只能包一层 ScriptRunContext 的私有发送函数：只在验证过的版本（PAYLOAD_STREAMLIT_VERSIONS）上包，
+  别的版本或者结构对不上就不统计（面板上显示“没统计”），不会影响页面
+- 各个缓存/任务池的累计计数（``note``），比如 AI 回答缓存的命中率和省下的 token
+- 结果显示在侧边栏的调试面板里，并追加写一行到 JSONL 日志（PROFILE_LOG，默认 .cache/profile.jsonl）
+
+关闭时 ``current_profile()`` 返回一个什么都不做的占位对象，调用处不用判断开没开
+"""
+import builtins
+import dataclasses
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+HEAVY_MODULES = {"pandas", "numpy", "plotly", "matplotlib", "PIL", "openai", "streamlit_option_menu", "pyarrow"}
+IMPORT_COSTS = {}  # 顶层包名 -> 本进程首次导入耗时（秒）
+
+PAYLOAD_STREAMLIT_VERSIONS = {(1, 45)}  # 包发送函数前核对 (大版本, 小版本)，和 requirements.txt 钉的一致
+
+_local = threading.local()
+_log_lock = threading.Lock()
+_import_lock = threading.Lock()
+_import_users = 0  # 正在 timed_imports 里的脚本线程数
+_original_import = None
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    top = name.partition(".")[0]
+    if level or top not in HEAVY_MODULES or top in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    started = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        IMPORT_COSTS.setdefault(top, time.perf_counter() - started)
+
+@contextmanager
+def timed_imports(enabled=True):
+    """
+    这段代码里给 import 套一层计时（只看 HEAVY_MODULES 里还没导入过的包），出来换回原来的 ``__import__``。
+    ``__import__`` 是整个进程共用的，几个会话的脚本线程会交错进出：第一个进来的换上，最后一个出去的换回
+    """
+    global _import_users, _original_import
+    if not enabled:
+        yield
+        return
+    with _import_lock:
+        if not _import_users:
+            _original_import = builtins.__import__
+            builtins.__import__ = _timed_import
+        _import_users += 1
+    try:
+        yield
+    finally:
+        with _import_lock:
+            _import_users -= 1
+            # 期间别人又换过 __import__ 的话不去动它
+            if not _import_users and builtins.__import__ is _timed_import: builtins.__import__ = _original_import
+
+class Profiler:
+    enabled = True
+
+    def __init__(self, log_path=None, started=None, **meta):
+        self.log_path = log_path
+        self.meta = meta
+        self.laps = []    # [(阶段, 秒)]，按顺序首尾相接
+        self.stages = {}  # 阶段 -> [总秒数, 次数]，可以嵌套在 lap 里面
+        self.payload = [0, 0]  # 发给浏览器的 [消息数, 字节数]；这个 Streamlit 版本统计不了时是 None
+        self.notes = {}  # 名字 -> 进程级的累计计数（各缓存的 stats()），见 note
+        self.started = self._last = started or time.perf_counter()
+
+    def lap(self, name):
+        """记下从上一个 lap（或开始）到现在的耗时"""
+        now = time.perf_counter()
+        self.laps.append((name, now - self._last))
+        self._last = now
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name, seconds):
+        entry = self.stages.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+    def note(self, name, stats):
+        """记下一组计数（dict），跟着快照进面板和日志"""
+        self.notes[name] = stats
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def snapshot(self):
+        return {
+            "ts": time.time(),
+            **self.meta,
+            "total_ms": round(self.elapsed * 1000, 2),
+            "laps": {name: round(sec * 1000, 2) for name, sec in self.laps},
+            "stages": {name: {"ms": round(sec * 1000, 2), "count": n} for name, (sec, n) in self.stages.items()},
+            "imports_ms": {name: round(sec * 1000, 2) for name, sec in IMPORT_COSTS.items()},
+            "payload": {"messages": self.payload[0], "bytes": self.payload[1]} if self.payload else None,
+            "stats": self.notes,
+        }
+
+    def finish(self, **meta):
+        """结束这次重跑：写一行日志并返回快照"""
+        self.meta.update(meta)
+        result = self.snapshot()
+        if self.log_path:
+            try:
+                if os.path.dirname(self.log_path): os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+                with _log_lock, open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(result, ensure_ascii=False) + "\n")
+            except OSError:
+                pass  # 日志写不了不影响页面
+        if getattr(_local, "profiler", None) is self: _local.profiler = None
+        return result
+
+class _NullProfiler:
+    enabled = False
+    laps = ()
+    stages = {}
+
+    def lap(self, name): pass
+
+    def stage(self, name): return nullcontext()
+
+    def record(self, name, seconds): pass
+
+    def note(self, name, stats): pass
+
+    def finish(self, **meta): return None
+
+NULL_PROFILER = _NullProfiler()
+
+def _count_payload(enqueue):
+    """包一层 ScriptRunContext 的发送函数，把消息计到当前线程的 profiler 上（Streamlit 复用缓存消息时算的是引用的大小）"""
+    def counting(msg):
+        profiler = getattr(_local, "profiler", None)
+        if profiler is not None and profiler.payload:
+            try:
+                size = msg.ByteSize()
+            except Exception:  # 统计出错只影响面板上的数字，消息照发
+                profiler.payload = None
+            else:
+                profiler.payload[0] += 1
+                profiler.payload[1] += size
+        enqueue(msg)
+    counting.__wrapped__ = enqueue
+    return counting
+
+def _streamlit_version():
+    import streamlit
+
+    try:
+        return tuple(int(x) for x in streamlit.__version__.split(".")[:2])
+    except ValueError:
+        return None
+
+def track_payload():
+    """
+    给这个会话的消息发送套上计数，同一个会话只套一次；包上了（或者早就包过）返回 True。
+    不在 Streamlit 里跑、版本没验证过、ScriptRunContext 里没有 _enqueue 这个字段时不碰它，返回 False
+    """
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return False
+    if _streamlit_version() not in PAYLOAD_STREAMLIT_VERSIONS: return False
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is None or not dataclasses.is_dataclass(ctx) or "_enqueue" not in {f.name for f in dataclasses.fields(ctx)}: return False
+    enqueue = ctx._enqueue
+    if not callable(enqueue): return False
+    if not hasattr(enqueue, "__wrapped__"): ctx._enqueue = _count_payload(enqueue)
+    return True
+
+def start_profile(enabled, log_path=None, started=None, **meta):
+    """
+    开始这次重跑的计时（脚本线程内有效）；enabled 为假时返回占位对象。
+    started 是脚本开始执行的 perf_counter，不给就从现在算。import 计时要调用方另外用 timed_imports 包住整次重跑
+    """
+    if not enabled:
+        _local.profiler = None
+        return NULL_PROFILER
+    profiler = Profiler(log_path, started, **meta)
+    if not track_payload(): profiler.payload = None
+    _local.profiler = profiler
+    return profiler
+
+def current_profile():
+    return getattr(_local, "profiler", None) or NULL_PROFILER
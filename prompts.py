@@ -0,0 +1,88 @@
+"""
+AI 文案的提示词：本周逐日心情 + 之前几周/几个月的摘要，按 token 预算拼
+
+- 周摘要、月摘要挂在 ``RecordStore.cached_range`` 上，只有那一周/那个月里有写入才重算；
+  拼提示词只往回看固定几周、几个月，耗时和历史总长度无关
+- token 数用 ai_client.estimate_tokens 粗估，和调用时记账的是同一套算法，不依赖具体模型的分词器
+- 按优先级往里放：本周数据 > 本周逐日心情 > 前几周摘要（新到旧）> 前几个月摘要（新到旧）；
+  有一行放不下就停，后面的全丢掉，不会跳过新的摘要去塞一条更早的短摘要
+"""
+from collections import Counter
+from datetime import timedelta
+
+from ai_client import estimate_tokens
+from records import get_week_range, is_training_day, mood_score, parse_date, training_parts
+
+DEFAULT_TOKEN_BUDGET = 1200
+HISTORY_WEEKS = 4
+HISTORY_MONTHS = 3
+HIGHLIGHT_CHARS = 24
+DAILY_CHARS = 60
+
+def _trim(text, limit):
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+def _summarize(records):
+    """一段时间的摘要：记录天数、训练天数、前三部位、心情分、两句心情（打分最鲜明的，截短）"""
+    parts = Counter(p for r in records for p in training_parts(r))
+    moods = {r["mood"].strip() for r in records if r["mood"].strip()}
+    highlights = sorted(moods, key=lambda m: (abs(mood_score(m)), len(m)), reverse=True)[:2]
+    return {"records": len(records), "trained_days": sum(map(is_training_day, records)), "top_parts": parts.most_common(3),
+            "mood_score": mood_score("\n".join(r["mood"] for r in records)),
+            "highlights": [_trim(m, HIGHLIGHT_CHARS) for m in highlights]}
+
+def _digest_line(store, label, start, end):
+    """(摘要行, token 数)；这段时间没记录返回 (None, 0)。结果缓存在 store 上，这段日期被改了才重算"""
+    def build(records):
+        if not records: return None, 0
+        d = _summarize(records)
+        parts = " ".join(f"{p}×{n}" for p, n in d["top_parts"]) or "无"
+        line = f"- {label}：记了{d['records']}天，练了{d['trained_days']}天，部位 {parts}，心情分 {d['mood_score']:+d}"
+        if d["highlights"]: line += "，心情：" + " / ".join(d["highlights"])
+        return line, estimate_tokens(line) + 1
+    return store.cached_range("digest", start, end, build)
+
+def _recent_periods(ref_date):
+    """ref_date 之前的 HISTORY_WEEKS 周和 HISTORY_MONTHS 个月：[(分组, 标签, 起, 止)]，新的在前"""
+    start = get_week_range(ref_date)[0]
+    out = []
+    for i in range(1, HISTORY_WEEKS + 1):
+        ws = start - timedelta(days=7 * i)
+        out.append(("weeks", f"{ws:%m.%d} 那周", ws, ws + timedelta(days=6)))
+    month_end = ref_date.replace(day=1) - timedelta(days=1)
+    for _ in range(HISTORY_MONTHS):
+        month_start = month_end.replace(day=1)
+        out.append(("months", f"{month_start:%Y-%m}", month_start, month_end))
+        month_end = month_start - timedelta(days=1)
+    return out
+
+SECTION_TITLES = {"daily": "本周每天的心情：", "weeks": "之前几周的摘要（可以拿来对比）：", "months": "之前几个月的摘要："}
+
+def build_copy_prompt(store, ref_date, system_prompt="", budget=DEFAULT_TOKEN_BUDGET):
+    """
+    小红书周报文案的 user prompt。返回 dict：
+    text、tokens（system + user 的估算 token 数）、budget、dropped（因为超预算没放进去的行数）
+    """
+    ref_date = parse_date(ref_date)
+    start, end = get_week_range(ref_date)
+    week = store.week_stats(ref_date)
+    header = (f"请为我写一篇健身周报小红书文案。\n本周（{start:%m.%d} - {end:%m.%d}）数据：练了{week['trained_days']}天，"
+              f"部位{'、'.join(week['part_counts']) or '无'}。")
+    used = estimate_tokens(system_prompt) + estimate_tokens(header)
+    candidates = [("daily", f"- {r['date'][5:]}：{_trim(r['mood'], DAILY_CHARS)}") for r in store.week(ref_date) if r["mood"].strip()]
+    candidates = [(group, line, estimate_tokens(line) + 1) for group, line in candidates]
+    for group, label, p_start, p_end in _recent_periods(ref_date):
+        line, tokens = _digest_line(store, label, p_start, p_end)
+        if line: candidates.append((group, line, tokens))
+
+    sections, dropped = {}, 0
+    for i, (group, line, tokens) in enumerate(candidates):
+        title_cost = 0 if group in sections else estimate_tokens(SECTION_TITLES[group]) + 1
+        if used + title_cost + tokens > budget:
+            dropped = len(candidates) - i
+            break
+        used += title_cost + tokens
+        sections.setdefault(group, []).append(line)
+    text = "\n".join([header] + [f"{SECTION_TITLES[g]}\n" + "\n".join(lines) for g, lines in sections.items()])
+    return {"text": text, "tokens": estimate_tokens(system_prompt) + estimate_tokens(text), "budget": budget, "dropped": dropped}
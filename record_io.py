@@ -0,0 +1,211 @@
+"""
+记录的批量导入/导出：CSV、JSONL、Parquet
+
+- 导入是流式的：CSV/JSONL 逐行读，Parquet 按 row group 分批读，不会先把整个文件读进来；
+  常驻内存的只有一批记录和一张 id -> 日期 的表（已有记录加上导入过的行）
+- 每批规范化（normalize_record）后按日期去重（同一天以文件里靠后的为准），整批交给后端 upsert_many 写一次盘
+- id 已经属于另一天的行（库里别的日期那条，或者文件里前面另一天的行）算坏行、不写：
+  照写的话后端会把那条挪过来，等于悄悄删掉另一天的记录
+- 坏行不会让整个导入失败：记下行号和原因，汇总在报告里
+- 导出直接从 RecordStore 按日期一段一段取（iter_records），不先复制整张表
+
+CSV 的 training 列用 | 分隔多个训练内容（也认 JSON 数组）；Parquet 里是字符串列表。Parquet 需要 pyarrow
+"""
+import csv
+import importlib.util
+import io
+import json
+import os
+import re
+from datetime import date as date_cls
+
+from records import parse_date
+from storage import DEFAULT_USER, normalize_record
+
+FORMATS = ("csv", "jsonl", "parquet")
+FIELDS = ["id", "date", "training", "diet", "mood"]
+BATCH_SIZE = 1000
+MAX_ERROR_SAMPLES = 50
+# 文本按 surrogateescape 解码：不是 UTF-8 的字节变成 U+DC80..U+DCFF，正常文本里不会出现，据此把那一行记成坏行
+_UNDECODABLE = re.compile("[\udc80-\udcff]")
+_NOT_UTF8 = "含有不是 UTF-8 的字节（文件请存成 UTF-8）"
+
+def parquet_available():
+    return importlib.util.find_spec("pyarrow") is not None
+
+def detect_format(name, fmt=None):
+    """显式给了 fmt 就用它，否则看扩展名（.ndjson 算 jsonl）"""
+    fmt = (fmt or os.path.splitext(str(name))[1].lstrip(".")).lower()
+    fmt = {"ndjson": "jsonl", "pq": "parquet"}.get(fmt, fmt)
+    if fmt not in FORMATS: raise ValueError(f"不支持的格式：{fmt or name}（支持 {' / '.join(FORMATS)}）")
+    return fmt
+
+def _open_binary(source):
+    """路径或二进制文件对象（比如网页上传的文件）-> (二进制文件对象, 要不要由我们关)"""
+    if isinstance(source, (str, os.PathLike)): return open(source, "rb"), True
+    return source, False
+
+def _split_training(value):
+    value = (value or "").strip()
+    if value.startswith("["):
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+    return [t.strip() for t in value.split("|") if t.strip()]
+
+# ---------- 读：逐行产出 (行号, 原始行) ----------
+
+def _read_csv(f):
+    text = io.TextIOWrapper(f, encoding="utf-8-sig", errors="surrogateescape", newline="")
+    try:
+        reader = csv.DictReader(text)
+        for row in reader:
+            if None in row: row.pop(None)  # 多出来的列
+            if any(_UNDECODABLE.search(v) for v in row.values() if isinstance(v, str)):
+                yield reader.line_num, ValueError(_NOT_UTF8)
+                continue
+            if "training" in row: row["training"] = _split_training(row["training"])
+            yield reader.line_num, row
+    finally:
+        text.detach()  # 文件对象还给调用方，别跟着 wrapper 一起关掉
+
+def _read_jsonl(f):
+    text = io.TextIOWrapper(f, encoding="utf-8-sig", errors="surrogateescape")
+    try:
+        for n, line in enumerate(text, 1):
+            if not line.strip(): continue
+            if _UNDECODABLE.search(line):
+                yield n, ValueError(_NOT_UTF8)
+                continue
+            try:
+                yield n, json.loads(line)
+            except ValueError as e:
+                yield n, ValueError(f"不是合法的 JSON：{e}")
+    finally:
+        text.detach()
+
+def _read_parquet(f, batch_size):
+    import pyarrow.parquet as pq
+
+    n = 0
+    for batch in pq.ParquetFile(f).iter_batches(batch_size=batch_size):
+        for row in batch.to_pylist():
+            n += 1
+            yield n, row
+
+def validate_row(raw):
+    """原始行 -> (规范化的记录, None) 或 (None, 出错原因)；HTTP 接口的批量写入也用它"""
+    if isinstance(raw, Exception): return None, str(raw)
+    if not isinstance(raw, dict): return None, "不是一条记录（应为对象/一行表格）"
+    date_value = raw.get("date")
+    if not date_value: return None, "缺少 date"
+    day = parse_date(date_value)
+    if day is None: return None, f"date 格式不对：{date_value!r}（应为 YYYY-MM-DD）"
+    training = raw.get("training")
+    if training is not None and not isinstance(training, (list, str)): return None, f"training 应为列表或字符串：{training!r}"
+    if isinstance(training, list) and not all(isinstance(t, str) for t in training): return None, "training 里有不是字符串的项"
+    # 外部数据没有 id 时按日期给一个固定的，重复导入同一份文件结果不变
+    rec = normalize_record({**raw, "id": raw.get("id") or f"import-{day.isoformat()}", "date": day.isoformat()})
+    return rec, None
+
+def import_records(source, backend, user=DEFAULT_USER, fmt=None, batch_size=BATCH_SIZE, progress=None):
+    """
+    把 source（路径或二进制文件对象）里的记录导进 backend 的 user 名下，返回报告 dict：
+    rows（读到的行数）、imported（导入了多少天）、duplicates（同一天出现多次、被后面覆盖的行数）、
+    errors（坏行数，含 id 和另一天冲突的行）、error_samples（前 MAX_ERROR_SAMPLES 个坏行的 (行号, 原因)）。
+    progress(已读行数) 每批调一次
+    """
+    fmt = detect_format(getattr(source, "name", source), fmt)
+    if fmt == "parquet" and not parquet_available(): raise ValueError("读 Parquet 需要先安装 pyarrow：pip install pyarrow")
+    report = {"rows": 0, "imported": 0, "duplicates": 0, "errors": 0, "error_samples": []}
+    seen = bytearray(date_cls.max.toordinal() // 8 + 1)  # 见过哪些天的位图，固定 450KB，和文件大小无关
+    batch = {}
+    owners = {r["id"]: r["date"] for r in backend.load(user)}  # id -> 日期，导入过的行也记进来
+
+    def flush():
+        if not batch: return
+        backend.upsert_many(user, list(batch.values()))
+        batch.clear()
+        if progress: progress(report["rows"])
+
+    f, owned = _open_binary(source)
+    try:
+        rows = {"csv": _read_csv, "jsonl": _read_jsonl}[fmt](f) if fmt != "parquet" else _read_parquet(f, batch_size)
+        for line_no, raw in rows:
+            report["rows"] += 1
+            rec, error = validate_row(raw)
+            owner = owners.get(rec["id"]) if rec else None
+            if not error and owner and owner != rec["date"]: error = f"id {rec['id']!r} 已经是 {owner} 那条记录的"
+            if error:
+                report["errors"] += 1
+                if len(report["error_samples"]) < MAX_ERROR_SAMPLES: report["error_samples"].append((line_no, error))
+                continue
+            byte, bit = divmod(parse_date(rec["date"]).toordinal(), 8)
+            if seen[byte] >> bit & 1: report["duplicates"] += 1
+            else: report["imported"] += 1
+            seen[byte] |= 1 << bit
+            owners[rec["id"]] = rec["date"]
+            batch[rec["date"]] = rec  # 同一批里同一天直接覆盖
+            if len(batch) >= batch_size: flush()
+        flush()
+    finally:
+        if owned: f.close()
+    return report
+
+# ---------- 写 ----------
+
+def _row(rec):
+    training = rec["training"] if isinstance(rec["training"], list) else [rec["training"]]
+    return {**rec, "training": [str(t) for t in training]}
+
+def _write_csv(records, f):
+    out = io.TextIOWrapper(f, encoding="utf-8-sig", newline="", write_through=True)
+    writer = csv.DictWriter(out, FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    n = 0
+    for rec in records:
+        row = _row(rec)
+        writer.writerow({**row, "training": "|".join(row["training"])})
+        n += 1
+    out.detach()
+    return n
+
+def _write_jsonl(records, f):
+    n = 0
+    for rec in records:
+        f.write((json.dumps(_row(rec), ensure_ascii=False) + "\n").encode("utf-8"))
+        n += 1
+    return n
+
+def _write_parquet(records, f, batch_size):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([("id", pa.string()), ("date", pa.string()), ("training", pa.list_(pa.string())),
+                        ("diet", pa.string()), ("mood", pa.string())])
+    n, chunk = 0, []
+    with pq.ParquetWriter(f, schema) as writer:
+        for rec in records:
+            chunk.append(_row(rec))
+            if len(chunk) >= batch_size:
+                writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+                n += len(chunk)
+                chunk.clear()
+        if chunk or not n:
+            writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+            n += len(chunk)
+    return n
+
+def export_records(store, target, fmt=None, batch_size=BATCH_SIZE):
+    """把 RecordStore 按日期升序写到 target（路径或二进制文件对象），返回写出的条数"""
+    fmt = detect_format(getattr(target, "name", target), fmt)
+    if fmt == "parquet" and not parquet_available(): raise ValueError("写 Parquet 需要先安装 pyarrow：pip install pyarrow")
+    records = store.iter_records(chunk=batch_size)
+    f, owned = (open(target, "wb"), True) if isinstance(target, (str, os.PathLike)) else (target, False)
+    try:
+        if fmt == "csv": return _write_csv(records, f)
+        if fmt == "jsonl": return _write_jsonl(records, f)
+        return _write_parquet(records, f, batch_size)
+    finally:
+        if owned: f.close()
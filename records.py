@@ -0,0 +1,669 @@
+"""
+内存里的记录集合：紧凑存储（日期序号 + 训练位掩码 + 共享字符串池），按日期建索引，周/区间查询走二分，不再每次全表 strptime
+"""
+import sys
+import threading
+from array import array
+from collections import Counter
+from bisect import bisect_left, bisect_right
+from datetime import date as date_cls, datetime, timedelta
+from functools import lru_cache
+
+from storage import DEFAULT_USER, ConflictError, JsonBackend, normalize_record, record_etag, safe_user
+from text_index import TextIndex, fingerprint, query_terms
+
+DATE_FORMAT = "%Y-%m-%d"
+REST_DAY = "休息日"
+TRAINING_OPTIONS = ["臀腿", "肩背", "有氧/滚泡沫轴", REST_DAY, "生理期调整"]
+POSITIVE_MOOD_WORDS = ["不错", "开心", "爽", "轻松"]
+NEGATIVE_MOOD_WORDS = ["累", "酸", "困", "emo"]
+
+def get_week_range(date_obj):
+    if isinstance(date_obj, datetime): date_obj = date_obj.date()
+    start = date_obj - timedelta(days=date_obj.weekday())
+    return start, start + timedelta(days=6)
+
+def parse_date(value):
+    """把 'YYYY-MM-DD' / datetime / date 统一成 date，解析不了返回 None"""
+    if isinstance(value, datetime): return value.date()
+    if isinstance(value, date_cls): return value
+    value = str(value)
+    if len(value) == 10 and value[4] == value[7] == "-":
+        try:
+            return date_cls.fromisoformat(value)  # 标准写法走 C 实现，比 strptime 快一个数量级
+        except ValueError:
+            pass
+    try:
+        return datetime.strptime(value, DATE_FORMAT).date()
+    except ValueError:
+        return None
+
+def month_range(month):
+    """'YYYY-MM' -> (当月第一天, 当月最后一天)"""
+    start = datetime.strptime(month, "%Y-%m").date()
+    next_month = (start + timedelta(days=32)).replace(day=1)
+    return start, next_month - timedelta(days=1)
+
+def is_training_day(record):
+    return any(t != REST_DAY for t in record.get("training", []))
+
+def training_parts(record):
+    return [p for p in record.get("training", []) if p != REST_DAY]
+
+def mood_score(mood_text):
+    mood_text = mood_text or ""
+    return sum(w in mood_text for w in POSITIVE_MOOD_WORDS) - sum(w in mood_text for w in NEGATIVE_MOOD_WORDS)
+
+def generate_week_summary_sentence(training_days, part_counts, mood_text="", score=None):
+    """score 不传时从 mood_text 现算；周聚合表里已经有现成的分数"""
+    top_parts = [p for p, _ in part_counts.most_common(2)] if part_counts else []
+    if score is None: score = mood_score(mood_text)
+    mood_phrase = "状态还挺在线" if score >= 2 else "有点累但也没摆烂" if score <= -2 else "整体还算稳"
+    parts = []
+    if training_days <= 0: parts.append("这周主打休息恢复")
+    else:
+        parts.append(f"这周练了{training_days}天")
+        if top_parts: parts.append(f"{'、'.join(top_parts)}是主场")
+        parts.append(mood_phrase)
+    return "，".join(parts) + "～"
+
+# ==================== 紧凑记录 ====================
+# 训练内容按 TRAINING_OPTIONS 的下标压成位掩码；5 个选项只有 32 种组合，展开结果全部预先算好
+_BIT = {name: 1 << i for i, name in enumerate(TRAINING_OPTIONS)}
+_MASK_TRAINING = [tuple(name for name in TRAINING_OPTIONS if m & _BIT[name]) for m in range(1 << len(TRAINING_OPTIONS))]
+_MASK_PARTS = [tuple(p for p in names if p != REST_DAY) for names in _MASK_TRAINING]
+
+@lru_cache(maxsize=4096)
+def _iso(ordinal):
+    """日期序号 -> 'YYYY-MM-DD'；最近用过的几千天有缓存，翻周报/历史不用每次重新格式化"""
+    return date_cls.fromordinal(ordinal).isoformat()
+
+WEEK_ROWS_CACHE = 512  # RecordStore.week 缓存多少周的 dict（约 10 年，每周 7 条）
+
+def monday_ordinal(ordinal):
+    """日期序号（date.toordinal）所在周周一的序号；序号 1（0001-01-01）是周一"""
+    return ordinal - (ordinal - 1) % 7
+
+class Record:
+    """
+    RecordStore 里的一条记录：日期存成序号，训练内容存成位掩码，饮食/心情进 sys.intern 的字符串池（重复的文本只存一份）
+
+    日期不是标准写法、训练内容不在选项里/重复/顺序和选项不一致时，原样放进 extra，``as_dict`` 还原出来和原记录一字不差
+    """
+    __slots__ = ("id", "day", "mask", "diet", "mood", "extra")
+
+    def __init__(self, record_id, day, mask, diet, mood, extra=None):
+        self.id = record_id
+        self.day = day
+        self.mask = mask
+        self.diet = diet
+        self.mood = mood
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, rec):
+        """规范化之后的记录 -> Record；日期不合法返回 None"""
+        day = parse_date(rec["date"])
+        if day is None: return None
+        extra = None
+        if rec["date"] != day.isoformat(): extra = {"date": rec["date"]}
+        training = rec["training"]
+        mask = 0
+        if isinstance(training, list) and all(t in _BIT for t in training):
+            for t in training: mask |= _BIT[t]
+        if list(_MASK_TRAINING[mask]) != training:
+            mask = 0
+            extra = {**(extra or {}), "training": list(training) if isinstance(training, list) else training}
+        return cls(rec["id"], day.toordinal(), mask, sys.intern(rec["diet"]), sys.intern(rec["mood"]), extra)
+
+    @property
+    def date(self):
+        return date_cls.fromordinal(self.day)
+
+    @property
+    def training(self):
+        if self.extra and "training" in self.extra: return self.extra["training"]
+        return _MASK_TRAINING[self.mask]
+
+    @property
+    def parts(self):
+        """不含休息日的训练部位，同 training_parts"""
+        if self.extra and "training" in self.extra: return tuple(p for p in self.extra["training"] if p != REST_DAY)
+        return _MASK_PARTS[self.mask]
+
+    def has_any(self, mask, names):
+        """训练内容里有没有 names（对应位掩码 mask）中的任一项"""
+        if self.extra and "training" in self.extra: return not names.isdisjoint(self.extra["training"])
+        return bool(self.mask & mask)
+
+    def as_dict(self):
+        """还原成 normalize_record 格式的新 dict，调用方随便改都不影响共享的数据"""
+        rec = {"id": self.id, "date": _iso(self.day), "training": list(_MASK_TRAINING[self.mask]),
+               "diet": self.diet, "mood": self.mood}
+        if self.extra:
+            rec.update(self.extra)
+            if isinstance(rec["training"], list): rec["training"] = list(rec["training"])
+        return rec
+
+def _compact(record, normalized=False):
+    rec = record if normalized else normalize_record(record)
+    return Record.from_dict(rec) if rec else None
+
+_OPTION_ORDER = {name: i for i, name in enumerate(TRAINING_OPTIONS)}
+
+def ordered_parts(counts):
+    """
+    部位计数按固定顺序排（选项顺序，选项外的按名字）：次数一样时谁排前面（总结句、配色）只看这周的内容，
+    不看这周的记录是按什么顺序写进来、改过几次的
+    """
+    return Counter(dict(sorted(counts.items(), key=lambda kv: (_OPTION_ORDER.get(kv[0], len(_OPTION_ORDER)), kv[0]))))
+
+def _mask_of(names):
+    mask = 0
+    for name in names: mask |= _BIT.get(name, 0)
+    return mask
+
+class RecordStore:
+    """
+    有序日期列 + 对齐的紧凑记录列 + id 索引
+
+    - 日期列是 array('l') 存的日期序号，按日期读/写/删和 ``week`` / ``range`` 都是二分，O(log N + 命中条数)
+    - 记录存成 ``Record``（__slots__、训练位掩码、共享字符串池），比每条一个 dict 省一大半内存；
+      对外仍然返回 dict（每次新建），调用方改了也不会碰到共享的数据
+    - 日期只在写入时解析一次
+    - 每周（周一为 key）的训练天数/部位计数在增删时增量维护，周报不用再现算
+    - 饮食/心情的 bigram 全文索引（``search``）第一次用到时在锁外建，之后随增删增量维护；
+      给了 index_path 就落盘，下次载入数据没变直接读回
+    - 会被多个会话共享，写和区间查询都在锁里做
+    - ``version`` 是载入时的数据版本，经 StoreCache 写入时跟着 +1
+    - ``derived`` 缓存整表派生出来的东西（趋势分析等），任何写入都会清空；
+      ``cached_range`` 按时间段缓存（周/月摘要），只有写到这段日期里才失效
+    """
+
+    def __init__(self, records=(), normalized=False, version=0, index_path=None):
+        self.version = version
+        self._index_path = index_path
+        self._text = None  # TextIndex，懒加载
+        self._by_id = {}   # id -> Record
+        self._weeks = {}   # 周一的日期序号 -> 聚合
+        self._derived = {}     # key -> (tag, 结果)，见 derived
+        self._derived_gen = 0  # 每次写入 +1：在锁外建好的结果，建的期间被写过就不放进缓存
+        self._periods = {}  # (key, 起, 止的日期序号) -> 按时间段缓存的结果，见 cached_range
+        self._week_rows = {}  # 周一的日期序号 -> 这周记录的 dict 元组，见 week
+        self._lock = threading.RLock()
+        by_day = {}
+        for r in records:
+            rec = _compact(r, normalized)
+            if rec is None: continue
+            old = self._by_id.get(rec.id)
+            if old is not None and by_day.get(old.day) is old: del by_day[old.day]
+            prev = by_day.get(rec.day)
+            if prev is not None: self._by_id.pop(prev.id, None)
+            by_day[rec.day] = self._by_id[rec.id] = rec
+        self._dates = array("l", sorted(by_day))
+        self._records = [by_day[d] for d in self._dates]
+        for rec in self._records:
+            self._account(rec, 1)
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        """按日期从旧到新"""
+        return iter(self.records())
+
+    def __contains__(self, day):
+        return self._index(day) >= 0
+
+    def _index(self, day):
+        """某天在日期列里的下标，没有返回 -1"""
+        day = parse_date(day)
+        if day is None: return -1
+        o = day.toordinal()
+        i = bisect_left(self._dates, o)
+        return i if i < len(self._dates) and self._dates[i] == o else -1
+
+    def _remove(self, i):
+        rec = self._records.pop(i)
+        del self._dates[i]
+        self._by_id.pop(rec.id, None)
+        self._account(rec, -1)
+        if self._text is not None: self._text.remove(rec.day, rec.diet, rec.mood)
+        return rec
+
+    def _text_index(self):
+        """
+        全文索引；第一次用到时建（10 万条约 1 秒），配置了 index_path 时先试着读落盘的。
+        建索引在锁外做（只在锁里抄一份 (日期, 饮食, 心情)），别的读写不用干等；
+        建的期间有写入（和 derived 用同一个代数）就作废重来，装上之后随增删增量维护
+        """
+        while True:
+            with self._lock:
+                if self._text is not None: return self._text
+                gen = self._derived_gen
+                items = [(r.day, r.diet, r.mood) for r in self._records]
+            fp = fingerprint(items) if self._index_path else None
+            index = TextIndex.load(self._index_path, fp) if self._index_path else None
+            if index is None:
+                index = TextIndex()
+                for item in items:
+                    index.add(*item)
+                if self._index_path:
+                    try:
+                        index.save(self._index_path, fp)  # 还没装上、别的线程碰不到，落盘时不用锁
+                    except OSError:
+                        pass  # 落不了盘就下次再建
+            with self._lock:
+                if self._text is None and self._derived_gen == gen: self._text = index
+
+    def _account(self, rec, sign):
+        """把一条记录计入(+1)/移出(-1)所在周的聚合；顺带让覆盖这一天的时间段缓存失效"""
+        if self._periods:
+            for key in [k for k in self._periods if k[1] <= rec.day <= k[2]]: del self._periods[key]
+        start = monday_ordinal(rec.day)
+        self._week_rows.pop(start, None)
+        week = self._weeks.get(start)
+        if week is None:
+            week = self._weeks[start] = {"records": 0, "trained_days": 0, "part_counts": Counter(), "mood_words": Counter()}
+        parts = Counter(rec.parts)
+        words = Counter({w for w in POSITIVE_MOOD_WORDS + NEGATIVE_MOOD_WORDS if w in rec.mood})
+        week["records"] += sign
+        week["trained_days"] += sign * any(t != REST_DAY for t in rec.training)
+        if sign > 0:
+            week["part_counts"].update(parts)
+            week["mood_words"].update(words)
+        else:
+            week["part_counts"] -= parts
+            week["mood_words"] -= words
+        if week["records"] <= 0: del self._weeks[start]
+
+    def week_stats(self, ref_date):
+        """ref_date 所在周的聚合：记录数、训练天数、部位计数（副本，按 ordered_parts 排好）、心情分"""
+        start, end = get_week_range(parse_date(ref_date))
+        with self._lock:
+            week = self._weeks.get(start.toordinal())
+            records = week["records"] if week else 0
+            trained_days = week["trained_days"] if week else 0
+            part_counts = ordered_parts(week["part_counts"]) if week else Counter()
+            words = week["mood_words"] if week else {}
+            # 和把整周心情拼成一段再逐词判断等价：一个词在这周出现过就算一次
+            score = sum(1 for w in POSITIVE_MOOD_WORDS if words.get(w)) - sum(1 for w in NEGATIVE_MOOD_WORDS if words.get(w))
+        return {"start": start, "end": end, "records": records, "trained_days": trained_days, "part_counts": part_counts, "mood_score": score}
+
+    def get(self, day):
+        with self._lock:
+            i = self._index(day)
+            return self._records[i].as_dict() if i >= 0 else None
+
+    def get_by_id(self, record_id):
+        rec = self._by_id.get(str(record_id))
+        return rec.as_dict() if rec else None
+
+    def upsert(self, record):
+        """新增或覆盖（同一天只留一条），返回规范化后的记录；日期不合法返回 None"""
+        rec = _compact(record)
+        if rec is None: return None
+        with self._lock:
+            old = self._by_id.get(rec.id)
+            if old is not None and old.day != rec.day: self._remove(bisect_left(self._dates, old.day))
+            i = bisect_left(self._dates, rec.day)
+            prev = None
+            if i < len(self._dates) and self._dates[i] == rec.day:
+                prev = self._records[i]
+                self._by_id.pop(prev.id, None)
+                self._account(prev, -1)
+                self._records[i] = rec
+            else:
+                self._dates.insert(i, rec.day)
+                self._records.insert(i, rec)
+            self._by_id[rec.id] = rec
+            self._account(rec, 1)
+            if self._text is not None:
+                if prev is not None: self._text.remove(prev.day, prev.diet, prev.mood)
+                self._text.add(rec.day, rec.diet, rec.mood)
+            self._drop_derived()
+            return rec.as_dict()
+
+    def delete(self, day):
+        with self._lock:
+            self._drop_derived()
+            i = self._index(day)
+            return self._remove(i).as_dict() if i >= 0 else None
+
+    def delete_by_id(self, record_id):
+        with self._lock:
+            rec = self._by_id.get(str(record_id))
+            self._drop_derived()
+            return self._remove(bisect_left(self._dates, rec.day)).as_dict() if rec else None
+
+    def _drop_derived(self):
+        self._derived_gen += 1
+        self._derived.clear()
+
+    def derived(self, key, build, tag=None):
+        """
+        build(按日期排好的全部记录) 的结果按 key 缓存，直到下一次写入；tag 和缓存时的不一样（比如换了一天）也重算并替换。
+        build 在锁外跑（趋势分析这种 pandas 计算要几十毫秒，别让别的读写干等），建的期间有写入就只返回、不缓存
+        """
+        with self._lock:
+            hit = self._derived.get(key)
+            if hit is not None and hit[0] == tag: return hit[1]
+            gen = self._derived_gen
+        value = build(self.records())
+        with self._lock:
+            if self._derived_gen == gen: self._derived[key] = (tag, value)
+        return value
+
+    def cached_range(self, key, start, end, build):
+        """build([start, end] 内的记录) 的结果按 key 缓存，只有这段日期里有写入才重算（周/月摘要用）"""
+        k = (key, parse_date(start).toordinal(), parse_date(end).toordinal())
+        with self._lock:
+            if k not in self._periods: self._periods[k] = build(self.range(start, end))
+            return self._periods[k]
+
+    def _bounds(self, start=None, end=None):
+        """[start, end] 在日期列里的下标区间，None 表示不限"""
+        lo = 0 if start is None else bisect_left(self._dates, parse_date(start).toordinal())
+        hi = len(self._dates) if end is None else bisect_right(self._dates, parse_date(end).toordinal())
+        return lo, max(lo, hi)
+
+    def range(self, start, end):
+        """[start, end] 闭区间内的记录，按日期升序"""
+        with self._lock:
+            lo, hi = self._bounds(start, end)
+            return [r.as_dict() for r in self._records[lo:hi]]
+
+    def week(self, ref_date):
+        """
+        ref_date 所在周的记录。这周的 dict 建一次缓存起来（最多 WEEK_ROWS_CACHE 周，这周有写入就丢掉），
+        返回的是浅拷贝，training 列表也是新的，调用方改了不影响缓存
+        """
+        start = monday_ordinal(parse_date(ref_date).toordinal())
+        with self._lock:
+            rows = self._week_rows.get(start)
+            if rows is None:
+                lo, hi = bisect_left(self._dates, start), bisect_left(self._dates, start + 7)
+                rows = self._week_rows[start] = tuple(r.as_dict() for r in self._records[lo:hi])
+                if len(self._week_rows) > WEEK_ROWS_CACHE: del self._week_rows[next(iter(self._week_rows))]
+        return [{**r, "training": list(r["training"])} for r in rows]
+
+    def dates(self):
+        with self._lock:
+            return [date_cls.fromordinal(o) for o in self._dates]
+
+    def week_starts(self):
+        """有记录的每一周的周一，从旧到新"""
+        with self._lock:
+            return [date_cls.fromordinal(o) for o in sorted(self._weeks)]
+
+    def records(self):
+        with self._lock:
+            return [r.as_dict() for r in self._records]
+
+    def iter_records(self, chunk=1000):
+        """按日期升序逐条产出；每次只在锁里取一小段，导出大表时不用先复制整张表，也不会一直占着锁"""
+        cursor = None
+        while True:
+            with self._lock:
+                i = 0 if cursor is None else bisect_right(self._dates, cursor)
+                batch = self._records[i:i + chunk]
+                rows = [r.as_dict() for r in batch]
+            if not rows: return
+            cursor = batch[-1].day
+            yield from rows
+
+    def newest_first(self, start=None, end=None, training=None, offset=0, limit=None):
+        """
+        [start, end] 内按日期倒序取记录，offset/limit 用来分页
+        training 给了就只要包含其中任一项的；不筛训练类型时直接切片，O(log N + limit)
+        """
+        wanted = set(training or ())
+        mask = _mask_of(wanted)
+        with self._lock:
+            lo, hi = self._bounds(start, end)
+            if not wanted:
+                stop = max(hi - offset, lo)
+                begin = lo if limit is None else max(lo, stop - limit)
+                return [r.as_dict() for r in reversed(self._records[begin:stop])]
+            out = []
+            for i in range(hi - 1, lo - 1, -1):
+                rec = self._records[i]
+                if not rec.has_any(mask, wanted): continue
+                if offset:
+                    offset -= 1
+                    continue
+                out.append(rec.as_dict())
+                if limit is not None and len(out) >= limit: break
+            return out
+
+    def count(self, start=None, end=None, training=None):
+        wanted = set(training or ())
+        mask = _mask_of(wanted)
+        with self._lock:
+            lo, hi = self._bounds(start, end)
+            if not wanted: return hi - lo
+            return sum(1 for r in self._records[lo:hi] if r.has_any(mask, wanted))
+
+    def search(self, query, start=None, end=None, training=None, offset=0, limit=None):
+        """
+        在饮食/心情里搜 query（空白/标点分开的几个词都要出现，不分大小写），返回 (命中总数, 这一页的记录)。
+        按相关度排：各个词在两栏里出现的总次数多的在前，一样多的新的在前；start/end/training 同 newest_first
+        """
+        terms = query_terms(query or "")
+        if not terms: return 0, []
+        wanted = set(training or ())
+        mask = _mask_of(wanted)
+        index = self._text_index()  # 装上之后不会再换，之后的增删都在锁里改它
+        with self._lock:
+            lo = parse_date(start).toordinal() if start is not None else None
+            hi = parse_date(end).toordinal() if end is not None else None
+            days = None
+            for term in sorted(terms, key=len, reverse=True):  # 长词一般更少见，先查先缩小候选
+                found = index.candidates(term, lo, hi)
+                days = found if days is None else days & found
+                if not days: return 0, []
+            scored = []
+            for day in days:
+                rec = self._records[bisect_left(self._dates, day)]
+                if wanted and not rec.has_any(mask, wanted): continue
+                # 候选只保证 bigram 都在，回原文确认并顺便数出现次数当相关度
+                diet, mood = rec.diet.lower(), rec.mood.lower()
+                score = 0
+                for term in terms:
+                    n = diet.count(term) + mood.count(term)
+                    if not n: break
+                    score += n
+                else:
+                    scored.append((score, day, rec))
+            scored.sort(reverse=True)  # 日期不重复，不会比到 rec
+            page = scored[offset:None if limit is None else offset + limit]
+            return len(scored), [rec.as_dict() for _, _, rec in page]
+
+    def months(self):
+        """有记录的月份 'YYYY-MM'，新到旧；按月往前二分跳，O(月数 × log N)"""
+        out = []
+        with self._lock:
+            hi = len(self._dates)
+            while hi > 0:
+                day = date_cls.fromordinal(self._dates[hi - 1])
+                out.append(f"{day:%Y-%m}")
+                hi = bisect_left(self._dates, day.replace(day=1).toordinal(), 0, hi)
+        return out
+
+def _iso_or_none(value):
+    return None if value is None else parse_date(value).isoformat()
+
+class BackendView:
+    """
+    不载入整份历史、每次查询直接走后端日期索引的只读视图（SQLite 后端），按日期查的接口和 RecordStore 一样：
+    get / get_by_id / range / week / week_stats / newest_first / count / months / week_starts / cached_range。
+    全文搜索、趋势分析、导出这些整表操作没有，要用 StoreCache.get
+    """
+
+    def __init__(self, backend, user=DEFAULT_USER):
+        self.backend = backend
+        self.user = safe_user(user)
+
+    def __len__(self):
+        return self.backend.count(self.user)
+
+    def __bool__(self):
+        return bool(self.backend.newest_first(self.user, limit=1))
+
+    def __contains__(self, day):
+        return self.get(day) is not None
+
+    def get(self, day):
+        day = parse_date(day)
+        return self.backend.get(self.user, day.isoformat()) if day else None
+
+    def get_by_id(self, record_id):
+        return self.backend.get_by_id(self.user, record_id)
+
+    def range(self, start, end):
+        return self.backend.range(self.user, _iso_or_none(start), _iso_or_none(end))
+
+    def week(self, ref_date):
+        return self.range(*get_week_range(parse_date(ref_date)))
+
+    def week_stats(self, ref_date):
+        """同 RecordStore.week_stats，从这周的几条记录现算（最多 7 条）"""
+        start, end = get_week_range(parse_date(ref_date))
+        rows = self.range(start, end)
+        return {"start": start, "end": end, "records": len(rows), "trained_days": sum(map(is_training_day, rows)),
+                "part_counts": ordered_parts(Counter(p for r in rows for p in training_parts(r))),
+                "mood_score": mood_score("\n".join(r["mood"] for r in rows))}
+
+    def cached_range(self, key, start, end, build):
+        """区间查询本身就走索引，不另外缓存"""
+        return build(self.range(start, end))
+
+    def newest_first(self, start=None, end=None, training=None, offset=0, limit=None):
+        return self.backend.newest_first(self.user, _iso_or_none(start), _iso_or_none(end), training, offset, limit)
+
+    def count(self, start=None, end=None, training=None):
+        return self.backend.count(self.user, _iso_or_none(start), _iso_or_none(end), training)
+
+    def months(self):
+        return self.backend.months(self.user)
+
+    def week_starts(self):
+        return self.backend.week_starts(self.user)
+
+class StoreCache:
+    """
+    进程内共享的 RecordStore：所有会话复用同一份，不再每个新会话重新读盘解析
+
+    每个用户一份；``get`` 只比较后端的 ``signature``（JSON 是两次 stat + 写入代数，SQLite 是一行版本号），
+    没变就直接返回；经 ``upsert`` / ``delete`` 写入时同时更新内存里的 store，不会因为自己的写入失效
+
+    写入是乐观并发：调用方传入自己看到的那条记录的 ``record_etag`` 作为 ``expected``，
+    拿到后端写锁后先刷新、再比对，别人（别的会话或进程）已经改过就抛 ConflictError，不会悄悄覆盖
+    """
+
+    def __init__(self, backend=None, persist_index=False):
+        self.backend = backend or JsonBackend()
+        self.persist_index = persist_index  # 全文索引是否落盘到数据文件旁边
+        self._entries = {}  # user -> (signature, store)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.conflicts = 0
+        self.views = 0  # view 直接查后端、没用内存副本的次数
+
+    def get(self, user=DEFAULT_USER):
+        user = safe_user(user)
+        sig = self.backend.signature(user)
+        with self._lock:
+            entry = self._entries.get(user)
+            if entry and entry[0] == sig:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        # 读盘放在锁外：别的线程可能正拿着后端写锁等 self._lock，这里再去等文件锁就死锁了
+        records, version = self.backend.load_versioned(user)
+        index_path = self.backend.index_path(user) if self.persist_index else None
+        store = RecordStore(records, normalized=True, version=version, index_path=index_path)
+        with self._lock:
+            self._entries[user] = (sig, store)
+        return store
+
+    def view(self, user=DEFAULT_USER):
+        """
+        只按日期查的地方（侧边栏、记录表单、历史分页、周报、HTTP 接口）用这个：内存里已有最新的 RecordStore 就用它；
+        没有、而后端能按日期查（SQLite）时返回 BackendView，不为了看一周/一页把整份历史载入内存；JSON 后端同 get
+        """
+        user = safe_user(user)
+        if not hasattr(self.backend, "newest_first"): return self.get(user)
+        sig = self.backend.signature(user)
+        with self._lock:
+            entry = self._entries.get(user)
+            if entry and entry[0] == sig:
+                self.hits += 1
+                return entry[1]
+            self.views += 1
+        return BackendView(self.backend, user)
+
+    def _applied(self, user, store, change):
+        """
+        写盘之后：store 是内存里的 RecordStore 就把同样的改动做上去、记下新签名，不会因为自己的写入失效；
+        是 BackendView（内存里本来就没有最新的）就不用管，下次 get 会重新载入
+        """
+        if not isinstance(store, RecordStore): return
+        change(store)
+        store.version += 1
+        with self._lock:
+            self._entries[user] = (self.backend.signature(user), store)
+
+    def upsert(self, record, user=DEFAULT_USER, expected=None):
+        """
+        先落盘再改内存；日期不合法返回 None。
+        expected 是调用方看到的这一天那条记录的 record_etag（没记录是 NO_RECORD），None 表示不检查直接覆盖
+        """
+        rec = normalize_record(record)
+        if not rec or parse_date(rec["date"]) is None: return None
+        user = safe_user(user)
+        with self.backend.lock(user):
+            store = self.view(user)
+            current = store.get(rec["date"])
+            if expected is not None and record_etag(current) != expected:
+                self.conflicts += 1
+                raise ConflictError(current)
+            self.backend.upsert(user, rec)
+            self._applied(user, store, lambda s: s.upsert(rec))
+            return rec
+
+    def upsert_many(self, records, user=DEFAULT_USER):
+        """批量写（已规范化、日期合法的记录），整批一次落盘，不做冲突检查；返回条数"""
+        records = list(records)
+        if not records: return 0
+        user = safe_user(user)
+        with self.backend.lock(user):
+            store = self.view(user)
+            self.backend.upsert_many(user, records)
+            self._applied(user, store, lambda s: [s.upsert(rec) for rec in records])
+        return len(records)
+
+    def delete(self, record_id, user=DEFAULT_USER, expected=None):
+        """已经不在了返回 None；expected 同 upsert，对不上抛 ConflictError"""
+        user = safe_user(user)
+        with self.backend.lock(user):
+            store = self.view(user)
+            rec = store.get_by_id(record_id)
+            if rec is None: return None
+            if expected is not None and record_etag(rec) != expected:
+                self.conflicts += 1
+                raise ConflictError(rec)
+            self.backend.delete(user, rec["id"], rec["date"])
+            self._applied(user, store, lambda s: s.delete_by_id(record_id))
+            return rec
+
+    def invalidate(self, user=None):
+        with self._lock:
+            if user is None: self._entries.clear()
+            else: self._entries.pop(safe_user(user), None)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_ratio": self.hits / total if total else 0.0,
+                "conflicts": self.conflicts, "views": self.views}
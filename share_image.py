@@ -0,0 +1,451 @@
+"""
+周报分享图：静态圆环图 + 卡片合成，外加按周内容哈希的 PNG 缓存
+"""
+import hashlib
+import io
+import json
+import math
+import os
+import tempfile
+import textwrap
+import threading
+from collections import OrderedDict
+
+# ==================== 字体 ====================
+
+# 按顺序尝试：Windows 雅黑、macOS 苹方/黑体、常见 Linux 发行版的 CJK 包
+FONT_CANDIDATES = [
+    "msyh.ttc",
+    "C:/Windows/Fonts/msyh.ttc",
+    "/System/Library/Fonts/PingFang.ttc",
+    "/System/Library/Fonts/STHeiti Medium.ttc",
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/google-noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
+    "/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf",
+]
+FONT_DIRS = ["/usr/share/fonts", "/usr/local/share/fonts", "~/.local/share/fonts", "~/.fonts"]
+# 目录扫描时只认这些名字，免得挑到没有中文字形的字体
+CJK_FONT_HINTS = ("notosanscjk", "notoserifcjk", "sourcehansans", "sourcehanserif", "wqy", "droidsansfallback", "msyh", "pingfang", "simhei", "simsun")
+
+class FontRegistry:
+    """
+    进程级字体表：字体文件只找一次，每个字号的 FreeTypeFont 只加载一次，
+    固定标签的 textlength / textbbox 也记下来，之后出图不再碰磁盘
+    """
+
+    def __init__(self, font_path=None):
+        self._configured = font_path
+        self._path = None
+        self._resolved = False
+        self._fonts = {}
+        self._lengths = {}
+        self._bboxes = {}
+        self._lock = threading.Lock()
+
+    def configure(self, font_path):
+        """指定字体文件；和当前一样就什么都不做"""
+        font_path = font_path or None
+        with self._lock:
+            if font_path == self._configured: return
+            self._configured = font_path
+            self._resolved = False
+            self._fonts.clear()
+            self._lengths.clear()
+            self._bboxes.clear()
+
+    @property
+    def path(self):
+        """实际用到的字体文件，找不到 CJK 字体时为 None（退回 Pillow 自带字体）"""
+        with self._lock:
+            if not self._resolved:
+                self._path = self._find(self._configured or os.getenv("FONT_PATH"))
+                self._resolved = True
+            return self._path
+
+    @staticmethod
+    def _find(configured):
+        from PIL import ImageFont
+
+        for candidate in ([configured] if configured else []) + FONT_CANDIDATES + list(_scan_font_dirs()):
+            try:
+                ImageFont.truetype(candidate, 12)
+            except OSError:
+                continue
+            return candidate
+        return None
+
+    def font(self, size):
+        from PIL import ImageFont
+
+        font = self._fonts.get(size)
+        if font is None:
+            path = self.path
+            if path:
+                font = ImageFont.truetype(path, size)
+            else:
+                try:
+                    font = ImageFont.load_default(size=size)
+                except TypeError:
+                    font = ImageFont.load_default()  # Pillow < 10.1 没有 size 参数
+            self._fonts[size] = font
+        return font
+
+    def textlength(self, text, size):
+        key = (text, size)
+        if key not in self._lengths:
+            self._lengths[key] = self.font(size).getlength(text)
+        return self._lengths[key]
+
+    def textbbox(self, text, size):
+        """等价于 draw.textbbox((0, 0), text, font)"""
+        key = (text, size)
+        if key not in self._bboxes:
+            self._bboxes[key] = self.font(size).getbbox(text)
+        return self._bboxes[key]
+
+def _scan_font_dirs():
+    for root in FONT_DIRS:
+        root = os.path.expanduser(root)
+        if not os.path.isdir(root): continue
+        for dirpath, _, filenames in os.walk(root):
+            for name in sorted(filenames):
+                lower = name.lower()
+                if lower.endswith((".ttc", ".ttf", ".otf")) and any(h in lower for h in CJK_FONT_HINTS):
+                    yield os.path.join(dirpath, name)
+
+FONTS = FontRegistry()
+
+# ==================== 静态图片生成 (数据居中) ====================
+
+DONUT_PALETTE = ["#FF9EB1", "#FFD1A9", "#E5C890", "#F4B8E4", "#A6D189", "#8CAAEE"]
+
+# 圆环几何，按 matplotlib 版本出图量出来的比例（相对于边长）：外径、内径、扇区间隔
+DONUT_OUTER, DONUT_INNER, DONUT_GAP = 0.389, 0.314, 0.022
+
+def _donut_values(parts_summary):
+    if not parts_summary: parts_summary = {"休息": 1}
+    values = list(parts_summary.values())
+    if sum(values) <= 0: values = [1]
+    return values, [DONUT_PALETTE[i % len(DONUT_PALETTE)] for i in range(len(values))]
+
+def draw_donut(img, xy, size_px, parts_summary, bg_color_rgb, supersample=4):
+    """
+    纯 Pillow 画圆环，直接贴到 img 的 xy 处：在 supersample 倍大小的画布上画扇形，
+    再 reduce 回来抗锯齿，不用 matplotlib，也不经过 PNG 编解码
+    """
+    from PIL import Image, ImageDraw
+
+    values, colors = _donut_values(parts_summary)
+    big = size_px * supersample
+    layer = Image.new("RGB", (big, big), bg_color_rgb)
+    draw = ImageDraw.Draw(layer)
+    c = big / 2
+    r_out, r_in, gap = big * DONUT_OUTER, big * DONUT_INNER, big * DONUT_GAP
+
+    # 和 matplotlib 的 startangle=90, counterclock=False 一致：从 12 点钟方向顺时针
+    angle, edges, total = -90.0, [], sum(values)
+    for value, color in zip(values, colors):
+        sweep = 360.0 * value / total
+        if sweep > 0:
+            draw.pieslice((c - r_out, c - r_out, c + r_out, c + r_out), angle, angle + sweep, fill=color)
+            edges.append(angle)
+        angle += sweep
+    if len(edges) > 1:
+        for a in edges:
+            rad = math.radians(a)
+            draw.line((c, c, c + (r_out + gap) * math.cos(rad), c + (r_out + gap) * math.sin(rad)), fill=bg_color_rgb, width=round(gap))
+    draw.ellipse((c - r_in, c - r_in, c + r_in, c + r_in), fill=bg_color_rgb)
+    img.paste(layer.reduce(supersample), xy)
+
+def _donut_matplotlib(parts_summary, bg_color_rgb, size_px):
+    """旧的 matplotlib 渲染，只在 renderer="matplotlib" 且装了 matplotlib 时用"""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from PIL import Image
+
+    values, colors = _donut_values(parts_summary)
+    bg_rgba = tuple(c / 255 for c in bg_color_rgb) + (1.0,)
+
+    fig, ax = plt.subplots(figsize=(4, 4), dpi=200)
+    fig.patch.set_facecolor(bg_rgba)
+    ax.set_facecolor(bg_rgba)
+    ax.pie(values, colors=colors, startangle=90, counterclock=False, wedgeprops=dict(width=0.25, edgecolor=bg_rgba, linewidth=5))
+    ax.set(aspect="equal")
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format="PNG", bbox_inches="tight", pad_inches=0.0)
+    plt.close(fig)
+    buf.seek(0)
+    
+    chart = Image.open(buf).convert("RGBA")
+    side = max(chart.size)
+    square = Image.new("RGBA", (side, side), color=bg_color_rgb + (255,))
+    square.paste(chart, ((side - chart.width) // 2, (side - chart.height) // 2), chart)
+    return square.resize((size_px, size_px), Image.LANCZOS)
+
+def _use_matplotlib(renderer):
+    if renderer != "matplotlib": return False
+    try:
+        import matplotlib  # noqa: F401
+    except ImportError:
+        return False  # 没装就退回 Pillow
+    return True
+
+def create_donut_chart_image_static(parts_summary, bg_color_rgb, size_px=280, renderer="pil"):
+    """辅助函数：生成静态圆环图用于合成"""
+    from PIL import Image
+
+    if _use_matplotlib(renderer):
+        return _donut_matplotlib(parts_summary, bg_color_rgb, size_px)
+    chart = Image.new("RGBA", (size_px, size_px), bg_color_rgb + (255,))
+    draw_donut(chart, (0, 0), size_px, parts_summary, bg_color_rgb)
+    return chart
+
+def create_summary_image(week_str, total_days, parts_summary, summary_sentence, renderer="pil"):
+    """
+    生成静态图片 - [修改点]：圆环居中，数据列表移动到圆环下方
+    """
+    from PIL import Image, ImageDraw
+
+    width, height = 750, 1100 # 稍微加高一点以容纳垂直布局
+    app_bg_color = (255, 245, 247)
+    card_bg_color = (255, 251, 240)
+    title_color = (106, 57, 62)
+    text_color = (80, 80, 80)
+    accent_color = (255, 158, 177)
+    
+    img = Image.new('RGB', (width, height), color=app_bg_color)
+    draw = ImageDraw.Draw(img)
+
+    # 字体从进程级注册表取，只有第一张图会读盘
+    font_title = FONTS.font(70)
+    font_subtitle = FONTS.font(32)
+    font_body = FONTS.font(28)
+    font_chart_label = FONTS.font(36)
+    font_chart_val = FONTS.font(50)
+    font_quote = FONTS.font(30)
+    font_quotes_mark = FONTS.font(80)
+
+    margin = 50
+    # 绘制主卡片背景
+    draw.rounded_rectangle([margin, margin, width - margin, height - margin], radius=40, fill=card_bg_color, outline=(230, 201, 201), width=3)
+    
+    # 1. 标题区域 (顶部)
+    cursor_x = margin + 50
+    cursor_y = margin + 60
+    draw.text((cursor_x, cursor_y), "WEEKLY", fill=title_color, font=font_title)
+    draw.text((cursor_x, cursor_y + 80), "FITNESS LOG", fill=title_color, font=font_title)
+    # 装饰线
+    draw.line((cursor_x, cursor_y + 170, cursor_x + 300, cursor_y + 170), fill=title_color, width=4)
+
+    # 时间和天数
+    cursor_y += 200
+    draw.text((cursor_x, cursor_y), f"Time: {week_str}", fill=text_color, font=font_subtitle)
+    draw.text((cursor_x, cursor_y + 45), f"本周训练: {total_days} 天", fill=text_color, font=font_subtitle)
+
+    # 2. 图表区域 (居中)
+    chart_size = 360 # 稍微变大一点
+    
+    # 计算水平居中位置
+    chart_x = (width - chart_size) // 2 
+    chart_y = cursor_y + 100
+    if _use_matplotlib(renderer):
+        chart_img = _donut_matplotlib(parts_summary, card_bg_color, chart_size)
+        img.paste(chart_img, (chart_x, chart_y), chart_img)
+    else:
+        draw_donut(img, (chart_x, chart_y), chart_size, parts_summary, card_bg_color)
+
+    # 图表中心文字
+    total_sessions = sum(parts_summary.values()) if parts_summary else 0
+    if total_sessions > 0:
+        top_part, top_count = parts_summary.most_common(1)[0]
+        top_pct = (top_count / total_sessions) * 100
+        center_text_1, center_text_2 = str(top_part), f"{top_pct:.1f}%"
+    else:
+        center_text_1, center_text_2 = "休息", "100%"
+
+    cx, cy = chart_x + chart_size // 2, chart_y + chart_size // 2
+    bbox1 = FONTS.textbbox(center_text_1, 36)
+    bbox2 = FONTS.textbbox(center_text_2, 50)
+    total_h = (bbox1[3]-bbox1[1]) + (bbox2[3]-bbox2[1]) + 10
+    draw.text((cx - (bbox1[2]-bbox1[0])/2, cy - total_h/2), center_text_1, fill=title_color, font=font_chart_label)
+    draw.text((cx - (bbox2[2]-bbox2[0])/2, cy - total_h/2 + (bbox1[3]-bbox1[1]) + 10), center_text_2, fill=title_color, font=font_chart_val)
+
+    # 3. 数据列表区域 (居中，位于图表下方)
+    # 不再放在旁边，而是放在图表下方
+    list_y_start = chart_y + chart_size + 30
+    
+    # 标题 "训练重点"
+    title_w = FONTS.textlength("训练重点", 32)
+    draw.text(((width - title_w) // 2, list_y_start), "训练重点", fill=(60, 60, 60), font=font_subtitle)
+    
+    item_y = list_y_start + 50
+    items = parts_summary.most_common(4) if parts_summary else []
+    
+    if not items: 
+        text = "• 彻底放松"
+        w = FONTS.textlength(text, 28)
+        draw.text(((width - w)//2, item_y), text, fill=text_color, font=font_body)
+    
+    # 绘制居中的列表项 (垂直排列，更稳重)
+    for part, count in items:
+        item_text = f"{part}: {count}次"
+        # 简单计算一下宽度以居中
+        # 这里画一个小圆点 + 文字
+        full_text_w = 20 + FONTS.textlength(item_text, 28) # 20是圆点宽度和间距
+        start_x = (width - full_text_w) // 2
+        
+        draw.ellipse((start_x, item_y + 10, start_x + 10, item_y + 20), fill=accent_color)
+        draw.text((start_x + 20, item_y), item_text, fill=text_color, font=font_body)
+        item_y += 40
+
+    # 4. 底部总结框
+    box_height = 200
+    box_y = height - margin - box_height - 30 # 底部留白
+    box_x = margin + 40
+    box_w = width - 2*margin - 80
+    
+    draw.rounded_rectangle((box_x, box_y, box_x + box_w, box_y + box_height), radius=20, fill=(255, 255, 255), outline=(230, 201, 201), width=2)
+    draw.text((box_x + 20, box_y + 10), "“", fill=accent_color, font=font_quotes_mark)
+    draw.text((box_x + 30, box_y + 25), "一句话总结:", fill=title_color, font=font_subtitle)
+    
+    text_start_y = box_y + 80
+    for line in textwrap.wrap(summary_sentence, width=24)[:3]:
+        draw.text((box_x + 30, text_start_y), line, fill=text_color, font=font_quote)
+        text_start_y += 40
+        
+    # 右上角装饰
+    icon_x, icon_y = width - 150, 100
+    draw.line((icon_x, icon_y + 15, icon_x + 60, icon_y + 15), fill=(220, 180, 180), width=8)
+    draw.rounded_rectangle((icon_x - 10, icon_y, icon_x, icon_y + 30), radius=4, fill=accent_color)
+    draw.rounded_rectangle((icon_x + 60, icon_y, icon_x + 70, icon_y + 30), radius=4, fill=accent_color)
+
+    return img
+
+# ==================== PNG 缓存 ====================
+
+# 改了出图样式就把版本号 +1，让磁盘上的旧缓存自然失效
+RENDER_VERSION = 2
+
+def summary_cache_key(week_str, total_days, parts_summary, summary_sentence, renderer="pil"):
+    """周内容哈希；部位顺序会影响配色，所以按原顺序参与哈希；换了字体也要重画"""
+    payload = [RENDER_VERSION, renderer, FONTS.path, week_str, total_days, list((parts_summary or {}).items()), summary_sentence]
+    return hashlib.sha1(json.dumps(payload, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+class PngCache:
+    """
+    内存 LRU（最多 max_items 张）+ 可选的磁盘目录，存的是编码好的 PNG 字节。
+    磁盘目录最多 max_disk_bytes：超了就按最近使用时间（读到时会刷新 mtime）删旧的，删到上限的 80%
+    """
+
+    def __init__(self, max_items=64, cache_dir=None, max_disk_bytes=256 * 1024 * 1024):
+        self.max_items = max_items
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = 0  # 本进程估的目录大小；别的进程也在写，真要清理时会重新数一遍
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._disk_entries())
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.png")
+
+    def _disk_entries(self):
+        """[(路径, 字节数, mtime)]，只看 .png"""
+        out = []
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if not entry.name.endswith(".png"): continue
+                    try:
+                        info = entry.stat()
+                    except OSError:
+                        continue  # 别的进程刚删掉
+                    out.append((entry.path, info.st_size, info.st_mtime))
+        except OSError:
+            pass
+        return out
+
+    def get(self, key):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+        if not self.cache_dir: return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # 记下最近用过，清理时排在后面
+        except OSError:
+            return None
+        self._remember(key, data)
+        return data
+
+    def put(self, key, data):
+        self._remember(key, data)
+        if not self.cache_dir: return
+        # 每次写都是独立的临时文件，同一进程里两个会话同时画同一周也不会互相覆盖半截
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        except OSError:
+            return  # 磁盘缓存只是锦上添花，写不进去就算了
+        path = self._disk_path(key)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            # 覆盖同一个 key 时先减掉旧文件，不然重画几次同一周就会把估计值撑大、无谓地触发清理
+            with self._lock:
+                try:
+                    replaced = os.stat(path).st_size
+                except FileNotFoundError:
+                    replaced = 0
+                os.replace(tmp, path)
+                self._disk_bytes += len(data) - replaced
+                over = self._disk_bytes > self.max_disk_bytes
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            return
+        if over: self._prune_disk()
+
+    def _prune_disk(self):
+        entries = sorted(self._disk_entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        target = self.max_disk_bytes * 0.8
+        for path, size, _ in entries:
+            if total <= target: break
+            try:
+                os.unlink(path)
+                total -= size
+            except OSError:
+                pass
+        with self._lock:
+            self._disk_bytes = total
+
+    def _remember(self, key, data):
+        with self._lock:
+            self._items[key] = data
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+def render_summary_png(week_str, total_days, parts_summary, summary_sentence, cache=None, renderer="pil"):
+    """返回分享图的 PNG 字节；同一周内容没变就直接用缓存，不再重画和重新编码"""
+    key = summary_cache_key(week_str, total_days, parts_summary, summary_sentence, renderer)
+    data = cache.get(key) if cache else None
+    if data is None:
+        buf = io.BytesIO()
+        create_summary_image(week_str, total_days, parts_summary, summary_sentence, renderer).save(buf, format="PNG")
+        data = buf.getvalue()
+        if cache: cache.put(key, data)
+    return data
@@ -0,0 +1,334 @@
+"""
+记录存储：快照 + 追加日志
+
+- 快照 ``fitness_data.json``：``{"version": N, "records": [...]}``，只在压缩时整体重写，先写临时文件再原子替换；
+  以前的纯列表格式照样能读（当作版本 0）
+- 日志 ``fitness_data.json.journal``：一行一条 JSON，``upsert`` 写整条记录，``delete`` 写墓碑
+- 读取时先读快照再按顺序重放日志；数据版本 = 快照版本 + 日志条数，每次写入 +1
+- 所有读写都拿 ``fitness_data.json.lock`` 上的文件锁（读共享、写独占），多个进程同时写也不会互相覆盖；
+  日志写多了就在后台线程里合并回快照
+
+``JsonBackend`` 把上面这些包成按用户区分的存储后端；``get_backend("sqlite", ...)`` 换成 SQLite（见 storage_sqlite.py）
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+DATA_FILE = "fitness_data.json"
+SQLITE_FILE = "fitness_data.sqlite"
+DEFAULT_USER = "default"
+NO_RECORD = "-"  # record_etag(None)：调用方看到的是“这一天还没有记录”
+
+# 日志超过 max(COMPACT_MIN_BYTES, 快照大小 / 2) 时触发后台压缩，摊下来每次保存仍是 O(1)
+COMPACT_MIN_BYTES = 64 * 1024
+
+_lock = threading.Lock()
+_compacting = set()
+_generation = {}  # 本进程内每个数据文件的写入代数，每次写入 +1
+_held = threading.local()  # 当前线程已经拿着的文件锁：path -> 层数
+
+class ConflictError(Exception):
+    """写入时发现记录已被别人改过；``current`` 是现在存着的那条（已被删掉时为 None）"""
+
+    def __init__(self, current):
+        super().__init__("record changed since it was read")
+        self.current = current
+
+def journal_path(path=DATA_FILE):
+    return path + ".journal"
+
+def lock_path(path=DATA_FILE):
+    return path + ".lock"
+
+@contextmanager
+def file_lock(path=DATA_FILE, shared=False):
+    """
+    跨进程的文件锁（flock），同一线程里可重入；
+    已经拿着锁时再进来直接放行，所以外层拿了独占锁、里面再调 load/upsert 不会死锁
+    """
+    held = getattr(_held, "paths", None)
+    if held is None: held = _held.paths = {}
+    if path in held:
+        held[path] += 1
+        try:
+            yield
+        finally:
+            held[path] -= 1
+        return
+    if os.path.dirname(path): os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(lock_path(path), "a+b") as f:
+        if fcntl: fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        held[path] = 1
+        try:
+            yield
+        finally:
+            del held[path]
+            if fcntl: fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+def data_signature(path=DATA_FILE):
+    """(写入代数, 快照 mtime/size, 日志 mtime/size)：任何一项变了缓存就该失效"""
+    return _generation.get(path, 0), _stat(path), _stat(journal_path(path))
+
+def normalize_record(record):
+    if not isinstance(record, dict): return None
+    training = record.get("training", [])
+    if isinstance(training, str): training = [training]
+    return {
+        "id": str(record.get("id") or datetime.now().timestamp()),
+        "date": str(record.get("date") or ""),
+        "training": training or [],
+        "diet": str(record.get("diet") or ""),
+        "mood": str(record.get("mood") or ""),
+    }
+
+def record_etag(record):
+    """一条记录内容的短哈希，用来判断“我看到的”和“现在存着的”是不是同一版；没有记录是 NO_RECORD"""
+    rec = normalize_record(record)
+    if rec is None: return NO_RECORD
+    raw = json.dumps(rec, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()[:16]
+
+# ---------- 重放 ----------
+
+def _apply(by_date, id_to_date, entry):
+    """把一条日志应用到 {date: record} 上；同一条日志重复应用结果不变"""
+    op = entry.get("op") if isinstance(entry, dict) else None
+    if op == "upsert":
+        rec = normalize_record(entry.get("record"))
+        if not rec or not rec["date"]: return
+        old_date = id_to_date.pop(rec["id"], None)
+        if old_date is not None and old_date != rec["date"]:
+            by_date.pop(old_date, None)
+        old = by_date.pop(rec["date"], None)
+        if old: id_to_date.pop(old["id"], None)
+        by_date[rec["date"]] = rec
+        id_to_date[rec["id"]] = rec["date"]
+    elif op == "delete":
+        date = id_to_date.pop(str(entry.get("id") or ""), None) or entry.get("date")
+        old = by_date.pop(date, None) if date else None
+        if old: id_to_date.pop(old["id"], None)
+
+def _replay(records, lines):
+    """返回 (记录列表, 重放了几条日志)"""
+    by_date, id_to_date = {}, {}
+    for r in records:
+        _apply(by_date, id_to_date, {"op": "upsert", "record": r})
+    applied = 0
+    for line in lines:
+        line = line.strip()
+        if not line: continue
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue  # 崩溃时写了一半的行，直接跳过
+        _apply(by_date, id_to_date, entry)
+        applied += 1
+    return list(by_date.values()), applied
+
+def _read_snapshot(path):
+    """返回 (记录列表, 快照版本)"""
+    if not os.path.exists(path): return [], 0
+    with open(path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    if isinstance(raw, dict): return list(raw.get("records") or []), int(raw.get("version") or 0)
+    return (raw if isinstance(raw, list) else []), 0
+
+def _read_journal(path, limit=None):
+    jpath = journal_path(path)
+    if not os.path.exists(jpath): return []
+    with open(jpath, "rb") as f:
+        data = f.read() if limit is None else f.read(limit)
+    return data.decode("utf-8", errors="replace").splitlines()
+
+def load_versioned(path=DATA_FILE):
+    """返回 (记录列表, 数据版本)；文件坏了返回 ([], 0)"""
+    try:
+        with file_lock(path, shared=True):
+            (snapshot, version), lines = _read_snapshot(path), _read_journal(path)
+    except (OSError, ValueError):
+        return [], 0
+    records, applied = _replay(snapshot, lines)
+    return records, version + applied
+
+def load_data(path=DATA_FILE):
+    return load_versioned(path)[0]
+
+# ---------- 写入 ----------
+
+def _atomic_write(path, write):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp): os.remove(tmp)
+
+def _write_snapshot(path, records, version):
+    payload = json.dumps({"version": version, "records": records}, ensure_ascii=False, indent=4).encode("utf-8")
+    _atomic_write(path, lambda f: f.write(payload))
+
+def _bump_generation(path):
+    with _lock:
+        _generation[path] = _generation.get(path, 0) + 1
+
+def _append(path, *entries):
+    """一次写入若干条日志，只 fsync 一次"""
+    line = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in entries).encode("utf-8")
+    if not line: return
+    with file_lock(path):
+        with open(journal_path(path), "a+b") as f:
+            # 上次崩溃留下没换行的半行时先补一个换行，别把这条也弄坏
+            if f.seek(0, os.SEEK_END):
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n": line = b"\n" + line
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        _bump_generation(path)
+    _maybe_compact(path)
+
+def upsert_record(record, path=DATA_FILE):
+    """新增或覆盖一条记录（同一天只保留一条）"""
+    _append(path, {"op": "upsert", "record": record})
+
+def upsert_records(records, path=DATA_FILE):
+    """批量 upsert，整批一次写盘"""
+    _append(path, *({"op": "upsert", "record": r} for r in records))
+
+def delete_record(record_id, date=None, path=DATA_FILE):
+    _append(path, {"op": "delete", "id": str(record_id), "date": date})
+
+def save_data(data, path=DATA_FILE):
+    """整体写入一份快照并清空日志（导入/迁移用，日常保存走 upsert_record）；版本号接着往上涨"""
+    with file_lock(path):
+        version = load_versioned(path)[1]
+        _write_snapshot(path, list(data), version + 1)
+        if os.path.exists(journal_path(path)): os.remove(journal_path(path))
+        _bump_generation(path)
+
+# ---------- 压缩 ----------
+
+def compact(path=DATA_FILE):
+    """
+    把日志合并进快照；全程拿独占锁，免得两个进程同时压缩、或者压缩时别的进程追加的日志被截掉。
+    合并后版本号不变（快照版本 = 原快照版本 + 合并掉的日志条数）
+    """
+    with file_lock(path):
+        lines = _read_journal(path)
+        if not lines: return
+        # 快照读坏了就放弃，别拿日志覆盖掉可能还能抢救的数据
+        snapshot, version = _read_snapshot(path)
+        records, applied = _replay(snapshot, lines)
+        # 先换快照再删日志：中途崩溃只会让已合并的日志再重放一遍，结果不变（版本号多涨几下而已）
+        _write_snapshot(path, records, version + applied)
+        os.remove(journal_path(path))
+        _bump_generation(path)
+
+def _compact_in_background(path):
+    try:
+        compact(path)
+    except (OSError, ValueError):
+        pass
+    finally:
+        with _lock: _compacting.discard(path)
+
+def _maybe_compact(path):
+    try:
+        journal_size = os.path.getsize(journal_path(path))
+        snapshot_size = os.path.getsize(path) if os.path.exists(path) else 0
+    except OSError:
+        return
+    if journal_size < max(COMPACT_MIN_BYTES, snapshot_size // 2): return
+    with _lock:
+        if path in _compacting: return
+        _compacting.add(path)
+    threading.Thread(target=_compact_in_background, args=(path,), daemon=True).start()
+
+# ---------- 存储后端 ----------
+
+def safe_user(user):
+    """
+    用户名会拼进文件名：只留文字（含中文）、数字、下划线、横杠，空的就是 default。
+    去掉过字符或超长的名字后面加一段原名的哈希，不同的名字不会落到同一份数据上（也不会变成 default）
+    """
+    user = str(user or "")
+    if not user: return DEFAULT_USER
+    clean = re.sub(r"[^\w-]", "", user)
+    if clean == user and len(user) <= 64: return user
+    return f"{clean[:48]}-{hashlib.sha1(user.encode('utf-8')).hexdigest()[:10]}".lstrip("-")
+
+class JsonBackend:
+    """默认后端：每个用户一份快照 + 日志，default 用户就是原来的 fitness_data.json"""
+
+    name = "json"
+
+    def __init__(self, path=DATA_FILE):
+        self.path = path
+
+    def path_for(self, user=DEFAULT_USER):
+        user = safe_user(user)
+        if user == DEFAULT_USER: return self.path
+        root, ext = os.path.splitext(self.path)
+        return f"{root}.{user}{ext}"
+
+    def load(self, user=DEFAULT_USER):
+        return load_data(self.path_for(user))
+
+    def load_versioned(self, user=DEFAULT_USER):
+        return load_versioned(self.path_for(user))
+
+    def lock(self, user=DEFAULT_USER):
+        """这个用户的独占写锁：先检查再写的操作包在里面，别的进程插不进来"""
+        return file_lock(self.path_for(user))
+
+    def signature(self, user=DEFAULT_USER):
+        return data_signature(self.path_for(user))
+
+    def index_path(self, user=DEFAULT_USER):
+        """全文索引落盘的位置：数据文件旁边"""
+        return self.path_for(user) + ".search"
+
+    def upsert(self, user, record):
+        upsert_record(record, self.path_for(user))
+
+    def upsert_many(self, user, records):
+        upsert_records(records, self.path_for(user))
+
+    def delete(self, user, record_id, date=None):
+        delete_record(record_id, date, self.path_for(user))
+
+    def save_all(self, user, records):
+        save_data(records, self.path_for(user))
+
+def get_backend(kind="json", location=None):
+    """kind: json（默认）/ sqlite；location 是数据文件路径，不给就用默认文件名"""
+    if kind == "sqlite":
+        from storage_sqlite import SqliteBackend
+
+        return SqliteBackend(location or SQLITE_FILE)
+    return JsonBackend(location or DATA_FILE)
+
+def import_json(json_path, backend, user=DEFAULT_USER):
+    """把旧格式的 JSON（连同它的日志）导进另一个后端，同一天以导入的为准，返回导入条数"""
+    records = load_data(json_path)
+    backend.upsert_many(user, records)
+    return len(records)
@@ -0,0 +1,223 @@
+"""
+SQLite 存储后端（WAL 模式）：记录按 (user, date) 做主键，每个用户的数据分开存放
+（用户名来自 ?user= / FITNESS_USER，没有登录校验，只是分开存，不是访问控制）
+
+- upsert / 批量 upsert / 删除都在一个事务里完成，并给该用户的版本号 +1
+- 按日期查（某天、某段、某周、倒序分页、按训练类型筛、有哪些月份/周）直接走 (user, date) 主键索引，
+  StoreCache.view 靠这些让侧边栏、记录表单、历史分页、周报不用把整份历史载入内存；
+  日期按字符串比较，要求是 YYYY-MM-DD（网页、导入、接口写入的都是）
+- ``signature`` 只查一行版本号，其它进程写入后本进程的缓存也能感知
+- ``lock`` 开一个 BEGIN IMMEDIATE 事务，先检查再写的操作在里面做，别的进程的写入会排队等
+"""
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date as date_cls, timedelta
+
+from storage import DEFAULT_USER, normalize_record, safe_user
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    user     TEXT NOT NULL,
+    date     TEXT NOT NULL,
+    id       TEXT NOT NULL,
+    training TEXT NOT NULL,
+    diet     TEXT NOT NULL,
+    mood     TEXT NOT NULL,
+    PRIMARY KEY (user, date)
+) WITHOUT ROWID;
+CREATE UNIQUE INDEX IF NOT EXISTS records_user_id ON records (user, id);
+CREATE TABLE IF NOT EXISTS user_versions (
+    user    TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+_SELECT = "SELECT id, date, training, diet, mood FROM records"
+
+def _row_to_record(row):
+    record_id, date, training, diet, mood = row
+    return {"id": record_id, "date": date, "training": json.loads(training), "diet": diet, "mood": mood}
+
+class SqliteBackend:
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+
+    def _conn(self):
+        """每个线程一条连接；sqlite3 连接不能跨线程用"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _tx(self):
+        """写事务；已经在 ``lock`` 开的事务里就直接沿用，由外层提交"""
+        conn = self._conn()
+        if conn.in_transaction:
+            yield conn
+        else:
+            with conn:
+                yield conn
+
+    @staticmethod
+    def _bump(conn, user):
+        conn.execute("INSERT INTO user_versions (user, version) VALUES (?, 1) "
+                     "ON CONFLICT(user) DO UPDATE SET version = version + 1", (user,))
+
+    @staticmethod
+    def _upsert_one(conn, user, record):
+        rec = normalize_record(record)
+        if not rec or not rec["date"]: return False
+        # 同一个 id 挪到了别的日期：先删掉旧日期那条，保持 (user, id) 唯一
+        conn.execute("DELETE FROM records WHERE user = ? AND id = ? AND date <> ?", (user, rec["id"], rec["date"]))
+        conn.execute(
+            "INSERT INTO records (user, date, id, training, diet, mood) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(user, date) DO UPDATE SET id = excluded.id, training = excluded.training, "
+            "diet = excluded.diet, mood = excluded.mood",
+            (user, rec["date"], rec["id"], json.dumps(rec["training"], ensure_ascii=False), rec["diet"], rec["mood"]),
+        )
+        return True
+
+    # ---------- 读 ----------
+
+    def load(self, user=DEFAULT_USER):
+        rows = self._conn().execute(f"{_SELECT} WHERE user = ? ORDER BY date", (safe_user(user),)).fetchall()
+        return [_row_to_record(r) for r in rows]
+
+    def load_versioned(self, user=DEFAULT_USER):
+        """在同一个读事务里取记录和版本号，两者对得上"""
+        conn = self._conn()
+        nested = conn.in_transaction
+        if not nested: conn.execute("BEGIN")
+        try:
+            return self.load(user), self.signature(user)
+        finally:
+            if not nested: conn.commit()
+
+    # ---------- 按日期查：走 (user, date) 主键索引，不整份载入 ----------
+
+    @staticmethod
+    def _where(user, start=None, end=None, training=None):
+        sql, args = " WHERE user = ?", [safe_user(user)]
+        if start is not None:
+            sql += " AND date >= ?"
+            args.append(str(start))
+        if end is not None:
+            sql += " AND date <= ?"
+            args.append(str(end))
+        if training:
+            training = list(training)
+            sql += f" AND EXISTS (SELECT 1 FROM json_each(training) WHERE value IN ({', '.join('?' * len(training))}))"
+            args += training
+        return sql, args
+
+    def get(self, user, day):
+        row = self._conn().execute(f"{_SELECT} WHERE user = ? AND date = ?", (safe_user(user), str(day))).fetchone()
+        return _row_to_record(row) if row else None
+
+    def get_by_id(self, user, record_id):
+        row = self._conn().execute(f"{_SELECT} WHERE user = ? AND id = ?", (safe_user(user), str(record_id))).fetchone()
+        return _row_to_record(row) if row else None
+
+    def range(self, user, start, end):
+        """[start, end] 闭区间，按日期升序"""
+        where, args = self._where(user, start, end)
+        return [_row_to_record(r) for r in self._conn().execute(f"{_SELECT}{where} ORDER BY date", args)]
+
+    def newest_first(self, user, start=None, end=None, training=None, offset=0, limit=None):
+        """同 RecordStore.newest_first：按日期倒序分页，training 给了只要含其中任一项的"""
+        where, args = self._where(user, start, end, training)
+        rows = self._conn().execute(f"{_SELECT}{where} ORDER BY date DESC LIMIT ? OFFSET ?",
+                                    args + [-1 if limit is None else limit, offset])
+        return [_row_to_record(r) for r in rows]
+
+    def count(self, user, start=None, end=None, training=None):
+        where, args = self._where(user, start, end, training)
+        return self._conn().execute(f"SELECT count(*) FROM records{where}", args).fetchone()[0]
+
+    def months(self, user):
+        """有记录的月份 'YYYY-MM'，新到旧；每次跳到上个月里最晚的一天，一个月一次索引查找"""
+        out, bound, conn = [], "9999", self._conn()
+        while True:
+            day = conn.execute("SELECT max(date) FROM records WHERE user = ? AND date < ?", (safe_user(user), bound)).fetchone()[0]
+            if not day: return out
+            bound = day[:7]  # 'YYYY-MM' 比这个月任何一天都小
+            out.append(bound)
+
+    def week_starts(self, user):
+        """有记录的每一周的周一，从旧到新；每次跳到下一周里最早的一天"""
+        out, bound, conn = [], "", self._conn()
+        while True:
+            raw = conn.execute("SELECT min(date) FROM records WHERE user = ? AND date >= ?", (safe_user(user), bound)).fetchone()[0]
+            if not raw: return out
+            try:
+                day = date_cls.fromisoformat(raw)
+            except ValueError:  # 不是 YYYY-MM-DD 的老数据，跳过
+                bound = raw + "\0"
+                continue
+            monday = day - timedelta(days=day.weekday())
+            out.append(monday)
+            bound = (monday + timedelta(days=7)).isoformat()
+
+    def signature(self, user=DEFAULT_USER):
+        row = self._conn().execute("SELECT version FROM user_versions WHERE user = ?", (safe_user(user),)).fetchone()
+        return row[0] if row else 0
+
+    def index_path(self, user=DEFAULT_USER):
+        return f"{self.path}.{safe_user(user)}.search"
+
+    def users(self):
+        return [r[0] for r in self._conn().execute("SELECT DISTINCT user FROM records ORDER BY user")]
+
+    # ---------- 写 ----------
+
+    @contextmanager
+    def lock(self, user=DEFAULT_USER):
+        """同一线程里可重入；里面的 upsert/delete 和外层共用一个事务，出异常整体回滚"""
+        conn = self._conn()
+        if conn.in_transaction:
+            yield
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    def upsert(self, user, record):
+        self.upsert_many(user, [record])
+
+    def upsert_many(self, user, records):
+        user = safe_user(user)
+        with self._tx() as conn:
+            if sum(self._upsert_one(conn, user, r) for r in records):
+                self._bump(conn, user)
+
+    def delete(self, user, record_id, date=None):
+        user = safe_user(user)
+        with self._tx() as conn:
+            cur = conn.execute("DELETE FROM records WHERE user = ? AND id = ?", (user, str(record_id)))
+            if not cur.rowcount and date:
+                cur = conn.execute("DELETE FROM records WHERE user = ? AND date = ?", (user, date))
+            if cur.rowcount: self._bump(conn, user)
+
+    def save_all(self, user, records):
+        """整体替换这个用户的全部记录"""
+        user = safe_user(user)
+        with self._tx() as conn:
+            conn.execute("DELETE FROM records WHERE user = ?", (user,))
+            for r in records:
+                self._upsert_one(conn, user, r)
+            self._bump(conn, user)
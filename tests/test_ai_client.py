@@ -0,0 +1,39 @@
+import threading
+
+import pytest
+
+from ai_client import AIAdvisor, CircuitBreaker
+
+def _open(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+def test_probe_is_released_when_the_request_dies(monkeypatch):
+    advisor = AIAdvisor("sk-test", base_url="http://breaker.test/v1", failure_threshold=1, reset_timeout=0)
+    _open(advisor.breaker)
+
+    def interrupted(client):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(AIAdvisor, "client", property(lambda self: None))
+    with pytest.raises(KeyboardInterrupt):
+        advisor._call(interrupted)
+    assert advisor._call(lambda client: "ok") == "ok"
+    assert advisor.breaker.opened_at is None
+
+def test_abandoned_probe_expires():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0, probe_timeout=0.05)
+    _open(breaker)
+    assert breaker.allow()
+    assert not breaker.allow()
+    threading.Event().wait(0.06)
+    assert breaker.allow()
+
+def test_other_threads_cannot_release_the_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    _open(breaker)
+    assert breaker.allow()
+    t = threading.Thread(target=breaker.release_probe)
+    t.start()
+    t.join()
+    assert not breaker.allow()
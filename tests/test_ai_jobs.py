@@ -0,0 +1,24 @@
+import threading
+
+from ai_jobs import JobRunner
+
+class SlowStream:
+    """迭代到 release 被 set 才结束"""
+
+    def __init__(self, text):
+        self.text = text
+        self.release = threading.Event()
+
+    def __iter__(self):
+        self.release.wait(5)
+        yield self.text
+
+def test_same_key_is_shared_but_no_key_is_not():
+    runner = JobRunner(max_workers=4, per_user_limit=4)
+    first, again, fresh = SlowStream("a"), SlowStream("b"), SlowStream("c")
+    job = runner.submit("alice", "k", first)
+    assert runner.submit("bob", "k", again) is job
+    other = runner.submit("bob", None, fresh)
+    assert other is not job
+    for s in (first, again, fresh): s.release.set()
+    assert job.wait(5) and other.wait(5) and other.text == "c"
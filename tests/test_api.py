@@ -0,0 +1,109 @@
+import io
+import json
+from wsgiref.util import setup_testing_defaults
+
+import pytest
+
+from api import make_app
+from records import StoreCache
+from share_image import PngCache
+from storage import get_backend
+
+@pytest.fixture(params=["json", "sqlite"])
+def app(request, tmp_path):
+    backend = get_backend(request.param, str(tmp_path / f"fitness_data.{request.param}"))
+    return make_app(StoreCache(backend), token="", image_cache=PngCache(max_items=8))
+
+def call(app, method, path, body=None, **headers):
+    """在进程里直接调 WSGI 应用，返回 (状态码, 响应头, 响应体)；JSON 响应体解析成对象"""
+    env = {}
+    setup_testing_defaults(env)
+    path, _, query = path.partition("?")
+    raw = json.dumps(body).encode("utf-8") if body is not None else b""
+    env.update({"REQUEST_METHOD": method, "PATH_INFO": path, "QUERY_STRING": query, "CONTENT_LENGTH": str(len(raw)),
+                "wsgi.input": io.BytesIO(raw)})
+    env.update({"HTTP_" + k.upper(): v for k, v in headers.items()})
+    out = {}
+
+    def start_response(status, response_headers):
+        out["status"], out["headers"] = int(status.split()[0]), dict(response_headers)
+
+    data = b"".join(app(env, start_response))
+    if out["headers"].get("Content-Type", "").startswith("application/json"): data = json.loads(data)
+    return out["status"], out["headers"], data
+
+RECORD = {"training": ["臀腿"], "diet": "鸡胸", "mood": "开心"}
+
+def test_crud_with_etag(app):
+    status, headers, rec = call(app, "PUT", "/records/2026-10-12", RECORD, if_none_match="*")
+    assert status == 201 and rec["date"] == "2026-10-12"
+    etag = headers["ETag"]
+    assert call(app, "PUT", "/records/2026-10-12", RECORD, if_none_match="*")[0] == 412
+
+    status, headers, body = call(app, "GET", "/records/2026-10-12")
+    assert status == 200 and headers["ETag"] == etag and body["mood"] == "开心"
+    assert call(app, "GET", "/records/2026-10-12", if_none_match=etag)[0] == 304
+
+    status, headers, body = call(app, "PUT", "/records/2026-10-12", {**RECORD, "mood": "累"}, if_match=etag)
+    assert status == 200 and body["id"] == rec["id"] and headers["ETag"] != etag
+    assert call(app, "PUT", "/records/2026-10-12", RECORD, if_match=etag)[0] == 412
+    assert call(app, "DELETE", "/records/2026-10-12", if_match=etag)[0] == 412
+
+    status, _, listing = call(app, "GET", "/records?limit=10")
+    assert status == 200 and listing["total"] == 1
+    assert call(app, "DELETE", "/records/2026-10-12", if_match=headers["ETag"])[0] == 204
+    assert call(app, "GET", "/records/2026-10-12")[0] == 404
+    assert call(app, "DELETE", "/records/2026-10-12")[0] == 404
+
+def test_put_rejects_id_of_another_day(app):
+    _, _, other = call(app, "PUT", "/records/2026-10-11", RECORD)
+    status, _, body = call(app, "PUT", "/records/2026-10-12", {**RECORD, "id": other["id"]})
+    assert status == 400 and "2026-10-11" in body["error"]
+    assert call(app, "GET", "/records/2026-10-11")[0] == 200
+
+def test_batch_upsert_reports_bad_rows(app):
+    _, _, existing = call(app, "PUT", "/records/2026-10-10", RECORD)
+    rows = [{"date": "2026-10-13", "training": ["肩背"], "mood": "爽"}, {"date": "bad"}, 5,
+            {"date": "2026-10-14", "training": "臀腿"}, {"id": existing["id"], "date": "2026-10-15"},
+            {"id": "dup", "date": "2026-10-16"}, {"id": "dup", "date": "2026-10-17"}]
+    status, _, body = call(app, "POST", "/records", {"records": rows})
+    assert status == 200 and body["upserted"] == 3
+    assert [e["index"] for e in body["errors"]] == [1, 2, 4, 6]
+    assert call(app, "GET", "/records/2026-10-16")[0] == 200 and call(app, "GET", "/records/2026-10-17")[0] == 404
+    assert call(app, "GET", "/records/2026-10-10")[0] == 200
+    assert call(app, "POST", "/records", {"records": "nope"})[0] == 400
+
+def test_week_summary_and_image_304(app):
+    call(app, "POST", "/records", [{"date": "2026-10-12", **RECORD}, {"date": "2026-10-14", "training": ["肩背"]}])
+    status, headers, week = call(app, "GET", "/weeks/2026-10-15")
+    assert status == 200 and week["trained_days"] == 2 and week["start"] == "2026-10-12" and week["summary"]
+    assert call(app, "GET", "/weeks/2026-10-15", if_none_match=headers["ETag"])[0] == 304
+
+    status, headers, png = call(app, "GET", "/weeks/2026-10-15/image.png")
+    assert status == 200 and headers["Content-Type"] == "image/png" and png[:4] == b"\x89PNG"
+    assert call(app, "GET", "/weeks/2026-10-15/image.png", if_none_match=headers["ETag"])[0] == 304
+
+    call(app, "PUT", "/records/2026-10-13", {"training": ["有氧/滚泡沫轴"]})
+    assert call(app, "GET", "/weeks/2026-10-15/image.png", if_none_match=headers["ETag"])[0] == 200
+    assert call(app, "GET", "/weeks/2025-01-01")[0] == 404
+
+def test_errors(app):
+    assert call(app, "GET", "/nope")[0] == 404
+    assert call(app, "PATCH", "/records/2026-10-12")[0] == 405
+    assert call(app, "GET", "/records/not-a-date")[0] == 400
+    assert call(app, "GET", "/records?limit=x")[0] == 400
+
+def test_token(app):
+    guarded = make_app(app.store_cache, token="s3cret", image_cache=app.image_cache)
+    assert call(guarded, "GET", "/records")[0] == 401
+    assert call(guarded, "GET", "/records", authorization="Bearer wrong")[0] == 401
+    assert call(guarded, "GET", "/records", authorization="Bearer s3cret")[0] == 200
+
+def test_internal_error_is_not_echoed(app, monkeypatch):
+    monkeypatch.setattr(app.store_cache, "view", lambda user: 1 / 0)
+    status, _, body = call(app, "GET", "/records")
+    assert status == 500 and "ZeroDivision" not in body["error"]
+
+def test_users_are_separate(app):
+    call(app, "PUT", "/records/2026-10-12", RECORD)
+    assert call(app, "GET", "/records?user=小名")[2]["total"] == 0
@@ -0,0 +1,40 @@
+import os
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("streamlit_option_menu")
+import streamlit as st
+import streamlit_option_menu
+from streamlit.testing.v1 import AppTest
+
+from records import StoreCache
+from storage import get_backend
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app.py")
+
+@pytest.fixture(params=["json", "sqlite"])
+def backend(request, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("STORAGE_BACKEND", request.param)
+    monkeypatch.setenv("STORAGE_PATH", str(tmp_path / f"fitness_data.{request.param}"))
+    monkeypatch.setattr(streamlit_option_menu, "option_menu", lambda *a, **k: "今日记录")
+    st.cache_resource.clear()  # get_store_cache 是进程级缓存，换了存储位置要清掉
+    yield get_backend(request.param, os.environ["STORAGE_PATH"])
+    st.cache_resource.clear()
+
+def test_record_form_reports_a_conflict_instead_of_overwriting(backend):
+    today = datetime.today().strftime("%Y-%m-%d")
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.run()
+    # 页面打开之后，别的进程写了同一天
+    StoreCache(backend).upsert({"date": today, "training": ["肩背"], "diet": "别人写的", "mood": ""})
+    at.text_area[1].input("我写的")
+    at.button[0].click()
+    at.run()
+    assert not at.exception and any("被改过" in w.value for w in at.warning)
+    assert StoreCache(backend).get().get(today)["diet"] == "别人写的"
+
+    next(b for b in at.button if b.label == "用我的覆盖").click()
+    at.run()
+    assert StoreCache(backend).get().get(today)["mood"] == "我写的"
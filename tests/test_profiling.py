@@ -0,0 +1,56 @@
+import builtins
+import threading
+
+import pytest
+
+import profiling
+
+def test_timed_imports_restores_the_original_import():
+    original = builtins.__import__
+    with pytest.raises(RuntimeError):
+        with profiling.timed_imports():
+            assert builtins.__import__ is not original
+            raise RuntimeError("rerun")  # st.rerun / st.stop 也是靠异常跳出去的
+    assert builtins.__import__ is original
+    with profiling.timed_imports(enabled=False):
+        assert builtins.__import__ is original
+
+def test_overlapping_script_threads_leave_no_wrapper_behind():
+    original = builtins.__import__
+    inside, release = threading.Barrier(3), threading.Event()
+
+    def script():
+        with profiling.timed_imports():
+            inside.wait(5)
+            release.wait(5)
+
+    threads = [threading.Thread(target=script) for _ in range(2)]
+    for t in threads: t.start()
+    inside.wait(5)
+    assert builtins.__import__ is not original
+    release.set()
+    for t in threads: t.join(5)
+    assert builtins.__import__ is original
+
+def test_payload_is_not_counted_outside_a_verified_streamlit(monkeypatch):
+    # 不在 Streamlit 的脚本线程里：不碰任何东西
+    assert profiling.track_payload() is False
+    prof = profiling.start_profile(True)
+    assert prof.snapshot()["payload"] is None
+    prof.finish()
+    monkeypatch.setattr(profiling, "PAYLOAD_STREAMLIT_VERSIONS", set())
+    assert profiling.track_payload() is False
+
+def test_counting_wrapper_never_blocks_a_message():
+    sent = []
+
+    class BadMsg:
+        def ByteSize(self):
+            raise TypeError("not a protobuf")
+
+    prof = profiling.start_profile(True)
+    prof.payload = [0, 0]
+    counting = profiling._count_payload(sent.append)
+    counting(BadMsg())
+    assert len(sent) == 1 and prof.snapshot()["payload"] is None
+    prof.finish()
@@ -0,0 +1,41 @@
+from datetime import date, timedelta
+
+import ai_client
+import prompts
+from prompts import SECTION_TITLES, build_copy_prompt
+from records import RecordStore
+
+REF = date(2026, 10, 14)
+
+def _store():
+    start = REF - timedelta(days=130)
+    return RecordStore([{"id": str(i), "date": (start + timedelta(days=i)).isoformat(), "training": ["臀腿", "肩背"][i % 2:],
+                         "diet": "", "mood": f"第{i}天 今天状态不错 开心 重量涨了一点点"} for i in range(131)])
+
+def _digests(text):
+    lines, group = [], None
+    for line in text.splitlines():
+        if line in SECTION_TITLES.values(): group = line
+        elif line.startswith("- ") and group in (SECTION_TITLES["weeks"], SECTION_TITLES["months"]): lines.append(line)
+    return lines
+
+def test_prompt_uses_the_client_token_estimate():
+    assert prompts.estimate_tokens is ai_client.estimate_tokens
+
+def test_copy_prompt_stays_within_budget_and_drops_oldest_digests_first():
+    store = _store()
+    full = build_copy_prompt(store, REF, "系统提示", budget=100_000)
+    assert full["dropped"] == 0
+    all_digests = _digests(full["text"])
+    assert len(all_digests) == prompts.HISTORY_WEEKS + prompts.HISTORY_MONTHS
+    lines = full["text"].count("\n- ")
+    kept_counts = set()
+    for budget in range(full["tokens"] - 1, 0, -5):
+        prompt = build_copy_prompt(store, REF, "系统提示", budget=budget)
+        if prompt["dropped"] == lines: break  # 只剩固定的开头，预算再小也没得丢了
+        assert prompt["tokens"] <= budget
+        # 留下来的总是最新的那几条，丢的从最早的开始
+        kept = _digests(prompt["text"])
+        assert kept == all_digests[:len(kept)]
+        kept_counts.add(len(kept))
+    assert kept_counts == set(range(len(all_digests)))
@@ -0,0 +1,42 @@
+import io
+
+import pytest
+
+from record_io import import_records
+from storage import get_backend, load_data
+
+def _upload(data, name):
+    f = io.BytesIO(data)
+    f.name = name
+    return f
+
+@pytest.mark.parametrize("name, data, bad_line", [
+    ("history.csv", "date,training,diet,mood\n2026-10-01,臀腿,鸡胸,开心\n".encode() + b"2026-10-02,\xff\xfe,x,y\n"
+     + "2026-10-03,肩背,,爽\n".encode(), 3),
+    ("history.jsonl", b'{"date": "2026-10-01"}\n{"date": "2026-10-02", "mood": "\xc3"}\n{"date": "2026-10-03"}\n', 2),
+])
+def test_non_utf8_line_is_a_row_error(tmp_path, name, data, bad_line):
+    path = str(tmp_path / "fitness_data.json")
+    report = import_records(_upload(data, name), get_backend("json", path), batch_size=1)
+    assert report["imported"] == 2 and report["errors"] == 1 and report["error_samples"][0][0] == bad_line
+    assert [r["date"] for r in load_data(path)] == ["2026-10-01", "2026-10-03"]
+
+@pytest.fixture(params=["json", "sqlite"])
+def backend(request, tmp_path):
+    return get_backend(request.param, str(tmp_path / f"fitness_data.{request.param}"))
+
+def _by_date(backend):
+    return {r["date"]: r["id"] for r in backend.load()}
+
+def test_id_of_another_days_record_is_a_row_error(backend):
+    backend.upsert_many("default", [{"id": "keep", "date": "2026-09-01", "training": ["臀腿"]}])
+    report = import_records(_upload(b"id,date\nkeep,2026-09-05\nnew,2026-09-06\n", "history.csv"), backend)
+    assert report["imported"] == 1 and report["errors"] == 1 and report["error_samples"][0][0] == 2
+    assert _by_date(backend) == {"2026-09-01": "keep", "2026-09-06": "new"}
+
+def test_same_id_on_two_dates_in_one_file_keeps_the_first(backend):
+    data = b'{"id": "a", "date": "2026-09-01"}\n{"id": "a", "date": "2026-09-02"}\n{"id": "a", "date": "2026-09-01", "mood": "x"}\n'
+    report = import_records(_upload(data, "history.jsonl"), backend, batch_size=1)
+    assert (report["imported"], report["duplicates"], report["errors"]) == (1, 1, 1)
+    assert report["error_samples"][0][0] == 2
+    assert _by_date(backend) == {"2026-09-01": "a"} and backend.load()[0]["mood"] == "x"
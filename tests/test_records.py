@@ -0,0 +1,201 @@
+import threading
+from datetime import date, timedelta
+
+from records import RecordStore
+from trends import store_trends
+
+def _store(days=30):
+    start = date(2026, 9, 1)
+    return RecordStore([{"id": str(i), "date": (start + timedelta(days=i)).isoformat(), "training": ["臀腿"], "diet": "",
+                         "mood": ""} for i in range(days)])
+
+def test_trends_cache_keeps_one_entry_across_days():
+    store = _store()
+    first = store_trends(store, date(2026, 10, 1))
+    assert store_trends(store, date(2026, 10, 1)) is first
+    for d in range(2, 6):
+        store_trends(store, date(2026, 10, d))
+    assert list(store._derived) == ["trends"]
+
+def test_derived_builds_outside_the_lock_and_skips_stale_results():
+    store = _store()
+    building, release = threading.Event(), threading.Event()
+
+    def slow_build(records):
+        building.set()
+        release.wait(5)
+        return len(records)
+
+    result = []
+    t = threading.Thread(target=lambda: result.append(store.derived("n", slow_build)))
+    t.start()
+    assert building.wait(5)
+    # build 还没结束，写入不会被它挡住
+    store.upsert({"id": "new", "date": "2026-12-01", "training": [], "diet": "", "mood": ""})
+    release.set()
+    t.join()
+    assert result == [30]
+    assert store.derived("n", len) == 31
+
+WORDS = ["鸡胸", "牛肉饭", "重量涨了", "好累", "开心", "酸奶", "beef", "Rice", "燕麦", "有点困"]
+
+def _naive_search(records, query):
+    terms = query.lower().split()
+    scored = []
+    for r in records:
+        diet, mood = r["diet"].lower(), r["mood"].lower()
+        counts = [diet.count(t) + mood.count(t) for t in terms]
+        if all(counts): scored.append((sum(counts), r["date"], r))
+    scored.sort(key=lambda x: (x[0], x[1]), reverse=True)
+    return [r for _, _, r in scored]
+
+def test_search_matches_a_substring_scan_after_writes():
+    import random
+
+    rng = random.Random(7)
+    text = lambda: " ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 3)))
+    start = date(2026, 1, 1)
+    store = RecordStore([{"id": str(i), "date": (start + timedelta(days=i)).isoformat(), "training": [], "diet": text(), "mood": text()}
+                         for i in range(200)])
+    queries = ["鸡胸", "重量", "beef rice", "累", "牛肉饭 开心", "酸", "涨了 困", "不存在"]
+    for q in queries: store.search(q)  # 先把索引建出来，下面的增删走增量维护
+    for i in range(150):
+        day = (start + timedelta(days=rng.randint(0, 260))).isoformat()
+        if rng.random() < 0.3: store.delete(day)
+        else: store.upsert({"id": f"n{i}", "date": day, "training": [], "diet": text(), "mood": text()})
+    for q in queries:
+        expected = _naive_search(store.records(), q)
+        total, rows = store.search(q)
+        assert total == len(expected) and rows == expected, q
+        assert store.search(q, "2026-03-01", "2026-06-30", offset=2, limit=5)[1] == \
+            [r for r in expected if "2026-03-01" <= r["date"] <= "2026-06-30"][2:7]
+
+def test_text_index_builds_outside_the_lock(monkeypatch):
+    import records
+
+    store = _store()
+    store.upsert({"id": "x", "date": "2026-08-01", "training": [], "diet": "牛肉饭", "mood": ""})
+    writer_done = threading.Event()
+
+    class SlowIndex(records.TextIndex):
+        def add(self, day, *texts):
+            if not writer_done.is_set():
+                # 建索引的期间另一个线程来写：锁没被占着才写得进去
+                t = threading.Thread(target=lambda: (store.upsert({"id": "y", "date": "2026-08-02", "training": [], "diet": "牛肉饭",
+                                                                    "mood": ""}), writer_done.set()))
+                t.start()
+                t.join(5)
+                assert writer_done.is_set()
+            super().add(day, *texts)
+
+    monkeypatch.setattr(records, "TextIndex", SlowIndex)
+    # 建的期间被写过的那份作废重建，写进去的那条也能搜到
+    assert [r["date"] for r in store.search("牛肉饭")[1]] == ["2026-08-02", "2026-08-01"]
+
+def test_text_index_save_uses_a_unique_temp_file(tmp_path):
+    from text_index import TextIndex
+
+    path = str(tmp_path / "data.search")
+    (tmp_path / "data.search.tmp").write_bytes(b"someone else's temp file")
+    index = TextIndex()
+    index.add(1, "鸡胸")
+    index.save(path, 42)
+    assert TextIndex.load(path, 42).candidates("鸡胸") == {1}
+    assert (tmp_path / "data.search.tmp").read_bytes() == b"someone else's temp file"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["data.search", "data.search.tmp"]
+
+# ---------- 和最朴素的实现对拍：{日期: 记录} 一张表，每次查询全表扫 ----------
+
+TRAININGS = [["臀腿"], ["肩背", "有氧/滚泡沫轴"], ["休息日"], ["生理期调整", "臀腿"], [], ["臀腿", "臀腿"], ["瑜伽"],
+             ["有氧/滚泡沫轴", "肩背"], ["休息日", "臀腿"]]
+MOODS = ["开心", "有点累", "爽 但是酸", "", "困死了 emo", "轻松 不错", "一般"]
+BASE = date(2026, 1, 1)
+
+class NaiveStore:
+    def __init__(self):
+        self.by_date = {}
+
+    def upsert(self, rec):
+        for day, old in list(self.by_date.items()):
+            if old["id"] == rec["id"]: del self.by_date[day]
+        self.by_date[rec["date"]] = rec
+
+    def delete_by_id(self, record_id):
+        for day, old in list(self.by_date.items()):
+            if old["id"] == record_id: del self.by_date[day]
+
+    def rows(self, start=None, end=None, training=None):
+        return [r for d, r in sorted(self.by_date.items())
+                if (start is None or d >= str(start)) and (end is None or d <= str(end))
+                and (not training or set(training) & set(r["training"]))]
+
+def _random_history(seed, ops=600):
+    """同一串随机增删同时做到 RecordStore 和 NaiveStore 上，每做一段产出一次"""
+    import random
+
+    rng = random.Random(seed)
+    store, naive = RecordStore(), NaiveStore()
+    for i in range(ops):
+        roll = rng.random()
+        if roll < 0.75:
+            rec = {"id": f"id{rng.randint(0, 150)}", "date": (BASE + timedelta(days=rng.randint(0, 120))).isoformat(),
+                   "training": list(rng.choice(TRAININGS)), "diet": "", "mood": rng.choice(MOODS)}
+            store.upsert(rec)
+            naive.upsert(rec)
+        elif roll < 0.9:
+            day = (BASE + timedelta(days=rng.randint(0, 120))).isoformat()
+            gone = naive.by_date.get(day)
+            store.delete(day)
+            if gone: naive.delete_by_id(gone["id"])
+        else:
+            record_id = f"id{rng.randint(0, 150)}"
+            store.delete_by_id(record_id)
+            naive.delete_by_id(record_id)
+        if i % 100 == 99: yield store, naive
+
+def test_date_index_matches_a_full_scan():
+    for store, naive in _random_history(1):
+        rows = naive.rows()
+        assert store.records() == rows and len(store) == len(rows)
+        assert store.dates() == [date.fromisoformat(r["date"]) for r in rows]
+        assert store.months() == sorted({r["date"][:7] for r in rows}, reverse=True)
+        for r in rows: assert store.get_by_id(r["id"]) == r
+        for offset in range(0, 125, 9):
+            day = BASE + timedelta(days=offset)
+            assert store.get(day) == naive.by_date.get(day.isoformat())
+            assert store.range(day, day + timedelta(days=10)) == naive.rows(day, day + timedelta(days=10))
+            monday = day - timedelta(days=day.weekday())
+            assert store.week(day) == naive.rows(monday, monday + timedelta(days=6))
+
+def test_week_stats_match_recomputing_the_week():
+    from collections import Counter
+
+    from records import TRAINING_OPTIONS, is_training_day, mood_score, training_parts
+
+    for store, naive in _random_history(2):
+        mondays = {date.fromisoformat(r["date"]) - timedelta(days=date.fromisoformat(r["date"]).weekday()) for r in naive.rows()}
+        assert store.week_starts() == sorted(mondays)
+        for monday in [BASE - timedelta(days=BASE.weekday()) + timedelta(weeks=w) for w in range(-1, 20)]:
+            rows = naive.rows(monday, monday + timedelta(days=6))
+            stats = store.week_stats(monday + timedelta(days=3))
+            parts = Counter(p for r in rows for p in training_parts(r))
+            expected = {"start": monday, "end": monday + timedelta(days=6), "records": len(rows),
+                        "trained_days": sum(map(is_training_day, rows)), "part_counts": parts,
+                        "mood_score": mood_score("".join(r["mood"] for r in rows))}
+            assert stats == expected, monday
+            # 顺序也是定的（总结句挑前两名、分享图配色都看顺序）：选项顺序，选项外的排后面
+            rank = lambda p: (TRAINING_OPTIONS.index(p) if p in TRAINING_OPTIONS else len(TRAINING_OPTIONS), p)
+            assert list(stats["part_counts"]) == sorted(parts, key=rank)
+
+def test_pagination_matches_a_sorted_filtered_scan():
+    filters = [(None, None, None), ("2026-02-01", "2026-03-31", None), (None, "2026-02-15", ["臀腿"]),
+               ("2026-01-10", None, ["休息日", "瑜伽"]), (None, None, ["有氧/滚泡沫轴"]), ("2026-03-01", "2026-02-01", None)]
+    for store, naive in _random_history(3):
+        for start, end, training in filters:
+            rows = naive.rows(start, end, training)[::-1]
+            assert store.count(start, end, training) == len(rows)
+            assert store.newest_first(start, end, training) == rows
+            for offset in (0, 1, 7, len(rows) - 1, len(rows) + 3):
+                for limit in (1, 10):
+                    assert store.newest_first(start, end, training, offset=max(offset, 0), limit=limit) == \
+                        rows[max(offset, 0):max(offset, 0) + limit], (start, end, training, offset, limit)
@@ -0,0 +1,32 @@
+import os
+import threading
+
+from share_image import PngCache
+
+def test_disk_tier_is_capped_oldest_first(tmp_path):
+    cache = PngCache(max_items=2, cache_dir=str(tmp_path), max_disk_bytes=1000)
+    for i in range(10):
+        cache.put(f"k{i}", bytes(200))
+        os.utime(tmp_path / f"k{i}.png", (i, i))  # 写入顺序就是新旧顺序
+    files = sorted(p.name for p in tmp_path.iterdir())
+    assert sum(p.stat().st_size for p in tmp_path.iterdir()) <= 1000
+    assert "k9.png" in files and "k0.png" not in files
+    assert PngCache(cache_dir=str(tmp_path)).get("k9") == bytes(200)
+
+def test_concurrent_puts_of_one_key_do_not_collide(tmp_path):
+    cache = PngCache(cache_dir=str(tmp_path))
+    payloads = [bytes([i]) * 50000 for i in range(8)]
+    threads = [threading.Thread(target=cache.put, args=("same", p)) for p in payloads]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert (tmp_path / "same.png").read_bytes() in payloads
+    assert [p.name for p in tmp_path.iterdir()] == ["same.png"]
+
+def test_overwriting_a_key_does_not_grow_the_disk_estimate(tmp_path):
+    cache = PngCache(cache_dir=str(tmp_path), max_disk_bytes=1000)
+    cache.put("other", bytes(300))
+    os.utime(tmp_path / "other.png", (0, 0))
+    for size in (400, 500, 450, 600):  # 同一周重画几次：实际只占 300 + 600，不该触发清理
+        cache.put("week", bytes(size))
+    assert cache._disk_bytes == 900
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["other.png", "week.png"]
@@ -0,0 +1,157 @@
+import os
+
+import pytest
+
+from records import StoreCache
+from storage import DEFAULT_USER, get_backend, safe_user
+
+@pytest.fixture(params=["json", "sqlite"])
+def backend(request, tmp_path):
+    return get_backend(request.param, str(tmp_path / f"fitness_data.{request.param}"))
+
+def test_safe_user_keeps_cjk_names_apart():
+    assert safe_user("小名") == "小名"
+    assert len({safe_user(u) for u in ["小名", "张三", "a.b", "ab", "!!!", DEFAULT_USER]}) == 6
+    assert DEFAULT_USER not in {safe_user("小名"), safe_user("!!!"), safe_user("../x")}
+    assert safe_user(safe_user("a.b")) == safe_user("a.b")
+
+def test_cjk_users_get_separate_stores(backend):
+    cache = StoreCache(backend)
+    cache.upsert({"date": "2026-10-12", "training": ["臀腿"], "diet": "", "mood": "小名的"}, "小名")
+    cache.upsert({"date": "2026-10-12", "training": ["肩背"], "diet": "", "mood": "张三的"}, "张三")
+    assert cache.get("小名").get("2026-10-12")["mood"] == "小名的"
+    assert cache.get("张三").get("2026-10-12")["mood"] == "张三的"
+    assert len(cache.get(DEFAULT_USER)) == 0
+    cache.invalidate()
+    assert StoreCache(backend).get("小名").get("2026-10-12")["mood"] == "小名的"
+
+def test_sqlite_view_queries_the_index_and_matches_record_store(tmp_path):
+    from datetime import date, timedelta
+
+    from records import BackendView, RecordStore
+
+    options = [["臀腿"], ["肩背", "有氧/滚泡沫轴"], ["休息日"], ["生理期调整", "臀腿"], []]
+    records = [{"id": f"r{i}", "date": (date(2025, 12, 20) + timedelta(days=i * 3)).isoformat(), "training": options[i % 5],
+                "diet": "", "mood": ["开心", "有点累", "爽 但是酸", ""][i % 4]} for i in range(40)]
+    backend = get_backend("sqlite", str(tmp_path / "fitness_data.sqlite"))
+    backend.upsert_many("小名", records)
+    cache = StoreCache(backend)
+    view, store = cache.view("小名"), RecordStore(records)
+    assert isinstance(view, BackendView) and cache.stats()["misses"] == 0
+    assert len(view) == len(store) and bool(view) and view.months() == store.months() and view.week_starts() == store.week_starts()
+    for monday in store.week_starts():
+        assert view.week_stats(monday) == store.week_stats(monday) and view.week(monday) == store.week(monday)
+    for types in ([], ["臀腿"], ["休息日", "肩背"]):
+        assert view.count("2026-01-01", "2026-02-28", types) == store.count("2026-01-01", "2026-02-28", types)
+        for offset in (0, 3, 30):
+            assert view.newest_first(None, "2026-03-01", types, offset, 4) == store.newest_first(None, "2026-03-01", types, offset, 4)
+    assert view.get("2025-12-23") == store.get("2025-12-23") and view.get_by_id("r5") == store.get_by_id("r5")
+
+    # 写入只改盘，不会为了检查冲突把整份历史载入
+    cache.upsert({"id": "r1", "date": "2025-12-23", "training": ["肩背"], "diet": "", "mood": ""}, "小名")
+    assert cache.view("小名").get("2025-12-23")["training"] == ["肩背"] and cache.stats()["misses"] == 0
+    # 载入过之后内存里那份是最新的，view 直接用它
+    loaded = cache.get("小名")
+    assert cache.view("小名") is loaded
+
+def _rec(mood, day="2026-10-12", **extra):
+    return {"date": day, "training": ["臀腿"], "diet": "", "mood": mood, **extra}
+
+def test_upsert_with_expected_etag(backend):
+    from storage import NO_RECORD, ConflictError, record_etag
+
+    cache, other = StoreCache(backend), StoreCache(backend)  # other 相当于另一个进程
+    first = cache.upsert(_rec("a", id="r1"), expected=NO_RECORD)
+    with pytest.raises(ConflictError) as e:
+        other.upsert(_rec("b", id="r2"), expected=NO_RECORD)  # 以为还没有，其实已经有了
+    assert e.value.current == first
+
+    seen = record_etag(first)
+    other.upsert(_rec("b", id="r1"), expected=seen)
+    with pytest.raises(ConflictError) as e:
+        cache.upsert(_rec("c", id="r1"), expected=seen)  # 手里那版已经过期
+    assert e.value.current["mood"] == "b"
+    assert cache.get().get("2026-10-12")["mood"] == "b"
+
+    cache.upsert(_rec("d", id="r1"))  # expected=None：不检查，直接覆盖
+    assert other.get().get("2026-10-12")["mood"] == "d"
+    assert cache.stats()["conflicts"] == 1 and other.stats()["conflicts"] == 1
+
+def test_delete_with_stale_etag(backend):
+    from storage import ConflictError, record_etag
+
+    cache, other = StoreCache(backend), StoreCache(backend)
+    seen = record_etag(cache.upsert(_rec("a", id="r1")))
+    other.upsert(_rec("b", id="r1"))
+    with pytest.raises(ConflictError) as e:
+        cache.delete("r1", expected=seen)
+    assert e.value.current["mood"] == "b" and cache.get().get("2026-10-12") is not None
+    assert cache.delete("r1", expected=record_etag(e.value.current))["mood"] == "b"
+    assert other.get().get("2026-10-12") is None and cache.delete("r1") is None
+
+def _by_date(records):
+    return {r["date"]: (r["id"], r["mood"]) for r in records}
+
+def test_journal_replay_tombstones_and_truncated_tail(tmp_path):
+    from storage import compact, delete_record, journal_path, load_versioned, upsert_record, upsert_records
+
+    path = str(tmp_path / "fitness_data.json")
+    upsert_records([_rec("a", "2026-10-01", id="1"), _rec("b", "2026-10-02", id="2"), _rec("c", "2026-10-03", id="3")], path)
+    upsert_record(_rec("b2", "2026-10-02", id="2"), path)
+    delete_record("3", "2026-10-03", path)                  # 墓碑
+    upsert_record(_rec("moved", "2026-10-05", id="1"), path)  # 同一个 id 换了日期
+    expected = {"2026-10-02": ("2", "b2"), "2026-10-05": ("1", "moved")}
+    records, version = load_versioned(path)
+    assert _by_date(records) == expected and version == 6
+
+    # 进程在追加最后一行的半路被杀：截在最后一行里的任何位置，读回来都是前面那些完整的日志
+    with open(journal_path(path), "rb") as f:
+        journal = f.read()
+    upsert_record(_rec("lost", "2026-10-06", id="4"), path)
+    with open(journal_path(path), "rb") as f:
+        last = f.read()[len(journal):]
+    for cut in range(1, len(last) - 1):
+        with open(journal_path(path), "wb") as f:
+            f.write(journal + last[:cut])
+        assert _by_date(load_versioned(path)[0]) == expected
+    # 半行后面接着写，新写的那条不会被粘坏
+    upsert_record(_rec("after", "2026-10-07", id="5"), path)
+    assert _by_date(load_versioned(path)[0]) == {**expected, "2026-10-07": ("5", "after")}
+
+    # 压缩：日志并进快照，记录和版本号都不变
+    before = load_versioned(path)
+    compact(path)
+    assert not os.path.exists(journal_path(path))
+    assert load_versioned(path) == before
+    upsert_record(_rec("more", "2026-10-08", id="6"), path)
+    assert load_versioned(path)[1] == before[1] + 1
+
+def test_crash_between_snapshot_and_journal_removal_replays_idempotently(tmp_path):
+    from storage import _read_snapshot, _write_snapshot, compact, journal_path, load_versioned, upsert_record
+
+    path = str(tmp_path / "fitness_data.json")
+    for i in range(5):
+        upsert_record(_rec(f"m{i}", f"2026-10-0{i + 1}", id=str(i)), path)
+    upsert_record(_rec("x", "2026-10-01", id="0"), path)
+    records, _ = load_versioned(path)
+    # compact 换完快照、还没删日志就崩了：日志会在新快照上再重放一遍
+    _write_snapshot(path, records, _read_snapshot(path)[1] + 6)
+    assert os.path.exists(journal_path(path))
+    assert _by_date(load_versioned(path)[0]) == _by_date(records)
+    compact(path)
+    assert _by_date(load_versioned(path)[0]) == _by_date(records)
+
+def test_legacy_list_file_is_read_and_upgraded(tmp_path):
+    import json
+
+    from storage import compact, load_versioned, upsert_record
+
+    path = str(tmp_path / "fitness_data.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([_rec("old", "2026-01-01", id="1")], f)
+    assert load_versioned(path) == ([{"id": "1", "date": "2026-01-01", "training": ["臀腿"], "diet": "", "mood": "old"}], 0)
+    upsert_record(_rec("new", "2026-01-02", id="2"), path)
+    compact(path)
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    assert raw["version"] == 1 and _by_date(raw["records"]) == {"2026-01-01": ("1", "old"), "2026-01-02": ("2", "new")}
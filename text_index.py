@@ -0,0 +1,129 @@
+"""
+饮食/心情的全文检索：按字二元组（bigram）建倒排索引，不用分词库
+
+- 文本按连续的文字片段（\\w+，中文、字母、数字）切开，每段取相邻两字；只有一个字的片段保留单字；英文转小写
+- 倒排表是 token -> 有序日期序号的 array('i')；一条记录一天一条，所以日期序号就是文档号
+- 查多字词：各 bigram 的倒排表求交集，再回原文确认真的连着出现（bigram 都在不代表词在）
+- 查单字：另有 字 -> 含这个字的 token 表，取并集
+- 增删记录时增量维护；可以 pickle 到数据文件旁边，下次载入数据没变就直接读回来
+"""
+import os
+import pickle
+import re
+import tempfile
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+
+INDEX_FORMAT = 1
+_RUN = re.compile(r"\w+")
+
+@lru_cache(maxsize=65536)
+def tokens(text):
+    """文本 -> bigram（和单字片段）集合；同样的文本（饮食/心情大量重复）只切一次"""
+    out = set()
+    for run in _RUN.findall(text.lower()):
+        if len(run) == 1: out.add(run)
+        else: out.update(run[i:i + 2] for i in range(len(run) - 1))
+    return frozenset(out)
+
+def query_terms(query):
+    """搜索框的内容按空白/标点切成几个词（小写），全部都要命中"""
+    return _RUN.findall(query.lower())
+
+def fingerprint(items):
+    """(日期序号, 饮食, 心情) 序列的校验和，判断落盘的索引还对不对得上数据"""
+    crc = 0
+    for day, diet, mood in items:
+        crc = zlib.crc32(f"{day}\0{diet}\0{mood}\n".encode("utf-8"), crc)
+    return crc
+
+class TextIndex:
+    """
+    bigram 倒排索引；文档号是日期序号。不自带锁，由持有它的 RecordStore 在自己的锁里调用
+
+    ``candidates`` 只保证不漏（可能多），确认要调用方拿原文 ``term in text`` 再判一次
+    """
+
+    def __init__(self):
+        self._postings = {}  # token -> array('i') 有序日期序号
+        self._by_char = {}   # 字 -> {含这个字的 token}
+
+    def __len__(self):
+        return len(self._postings)
+
+    def _new_token(self, tok):
+        arr = self._postings[tok] = array("i")
+        for ch in set(tok): self._by_char.setdefault(ch, set()).add(tok)
+        return arr
+
+    def add(self, day, *texts):
+        """加一条记录；day 比已有的都大时（按日期顺序建索引）是 O(token 数) 的追加"""
+        for tok in frozenset().union(*map(tokens, texts)):
+            arr = self._postings.get(tok)
+            if arr is None: arr = self._new_token(tok)
+            if not arr or arr[-1] < day: arr.append(day)
+            else:
+                i = bisect_left(arr, day)
+                if arr[i] != day: arr.insert(i, day)
+
+    def remove(self, day, *texts):
+        for tok in frozenset().union(*map(tokens, texts)):
+            arr = self._postings.get(tok)
+            if arr is None: continue
+            i = bisect_left(arr, day)
+            if i < len(arr) and arr[i] == day: del arr[i]
+            if not arr:
+                del self._postings[tok]
+                for ch in set(tok):
+                    owners = self._by_char.get(ch)
+                    owners.discard(tok)
+                    if not owners: del self._by_char[ch]
+
+    def _slice(self, tok, lo, hi):
+        arr = self._postings.get(tok)
+        if arr is None: return ()
+        return arr[bisect_left(arr, lo) if lo is not None else 0:bisect_right(arr, hi) if hi is not None else len(arr)]
+
+    def candidates(self, term, lo=None, hi=None):
+        """可能包含 term 的日期序号集合，可以限定在 [lo, hi] 里"""
+        term = term.lower()
+        toks = tokens(term)
+        if not toks: return set()
+        if len(term) == 1:
+            out = set()
+            for tok in self._by_char.get(term, ()):
+                out.update(self._slice(tok, lo, hi))
+            return out
+        slices = sorted((self._slice(tok, lo, hi) for tok in toks), key=len)
+        out = set(slices[0])
+        for arr in slices[1:]:
+            if not out: break
+            out.intersection_update(arr)
+        return out
+
+    def save(self, path, fp):
+        """先写同目录下的唯一临时文件再原子替换：几个进程同时落盘也不会写进同一个临时文件"""
+        fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(path) or ".")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump({"format": INDEX_FORMAT, "fingerprint": fp, "postings": self._postings}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp): os.remove(tmp)
+
+    @classmethod
+    def load(cls, path, fp):
+        """读回落盘的索引；文件不在、格式旧了、和数据对不上都返回 None"""
+        try:
+            with open(path, "rb") as f:
+                raw = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+            return None
+        if not isinstance(raw, dict) or raw.get("format") != INDEX_FORMAT or raw.get("fingerprint") != fp: return None
+        index = cls()
+        index._postings = raw["postings"]
+        for tok in index._postings:
+            for ch in set(tok): index._by_char.setdefault(ch, set()).add(tok)
+        return index
@@ -0,0 +1,84 @@
+"""
+趋势分析：整段历史一次性建成 DataFrame（training 列表 explode 成一行一个部位），
+周/月训练频率、部位占比、连续训练天数、休息日占比都在上面 groupby / resample 出来，不再逐条循环
+
+结果挂在 RecordStore 的派生缓存上（``store.derived``），写入时自动失效
+"""
+from records import REST_DAY
+
+MAX_CHART_POINTS = 120  # 图上最多画多少个点，历史太长就按月/季度合并
+
+def records_frame(records):
+    """一行一个 (日期, 部位)；没填训练内容的记录部位为空。返回按日期排好的 DataFrame"""
+    import pandas as pd
+
+    df = pd.DataFrame([(r["date"], r["training"] or [None]) for r in records], columns=["date", "part"])
+    df["date"] = pd.to_datetime(df["date"], format="%Y-%m-%d", errors="coerce")
+    df = df.dropna(subset=["date"]).explode("part", ignore_index=True)
+    # 和 records.is_training_day 一致：只要有一项不是“休息日”就算练了
+    df["trained"] = df["part"].notna() & (df["part"] != REST_DAY)
+    return df.sort_values("date", kind="stable", ignore_index=True)
+
+def _streaks(daily):
+    """daily: 按天连续的 bool Series（练了没）。返回 (最长连续, 截至最后一天的当前连续)"""
+    runs = daily.astype(int).groupby((~daily).cumsum()).cumsum()
+    return int(runs.max() or 0), int(runs.iloc[-1])
+
+def _bucket(days, freq):
+    """按 freq 汇总每天的表：训练天数、记录天数、总天数、休息日占比"""
+    import pandas as pd
+
+    out = days.resample(freq, label="left", closed="left").agg(["sum", "count"])
+    frame = pd.DataFrame({"trained_days": out[("trained", "sum")], "recorded_days": out[("recorded", "sum")],
+                          "days": out[("trained", "count")]})
+    frame["rest_ratio"] = 1 - frame["trained_days"] / frame["days"]
+    return frame
+
+def compute_trends(records, today=None):
+    """
+    整段历史的统计，返回 dict（没有记录时返回 None）：
+    days（每天练了没/记了没）、weekly / monthly（训练天数、记录天数、休息日占比）、parts_weekly（周 x 部位 次数）、
+    longest_streak / current_streak / rest_ratio / avg_week_days
+    """
+    import pandas as pd
+
+    df = records_frame(records)
+    if df.empty: return None
+    end = df["date"].iloc[-1]
+    if today is not None: end = max(end, pd.Timestamp(today))
+    calendar = pd.date_range(df["date"].iloc[0], end, freq="D")
+    # 每天一行：练了没 / 记了没；没记录的天算休息
+    trained = df.groupby("date")["trained"].any().reindex(calendar, fill_value=False)
+    days = pd.DataFrame({"trained": trained, "recorded": calendar.isin(df["date"])}, index=calendar)
+
+    parts = df[df["trained"]]
+    parts_weekly = (parts.groupby([pd.Grouper(key="date", freq="W-MON", label="left", closed="left"), "part"]).size()
+                    .unstack(fill_value=0))
+    longest, current = _streaks(trained)
+    weekly = _bucket(days, "W-MON")
+    return {
+        "days": days,
+        "weekly": weekly,
+        "monthly": _bucket(days, "MS"),
+        "parts_weekly": parts_weekly,
+        "longest_streak": longest,
+        "current_streak": current,
+        "rest_ratio": float(1 - trained.mean()),
+        "avg_week_days": float(weekly["trained_days"].mean()),
+    }
+
+def store_trends(store, today=None):
+    """带缓存的 compute_trends：同一份 store 没被写过、还是同一天就直接复用；只留一份，隔天不会越攒越多"""
+    return store.derived("trends", lambda records: compute_trends(records, today), tag=today)
+
+def chart_tables(trends, max_points=MAX_CHART_POINTS):
+    """
+    画图用的（训练频率表, 部位次数表, 粒度名）：按周的点超过 max_points 就改按月，再多就按季度，
+    图上的点数不随历史长度无限增长
+    """
+    for freq, grain in (("W-MON", "周"), ("MS", "月"), ("QS", "季度")):
+        frequency = trends["weekly"] if freq == "W-MON" else _bucket(trends["days"], freq)
+        if len(frequency) <= max_points: break
+    parts = trends["parts_weekly"]
+    if freq != "W-MON": parts = parts.resample(freq).sum()
+    return frequency, parts, grain
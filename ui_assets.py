@@ -0,0 +1,64 @@
+"""
+页面上的静态资源：样式表、一键复制组件、生成周报页的 HTML 片段
+
+- 样式写在 frontend/theme/theme.css，每次重跑只发一个 <link>，浏览器按带内容哈希的 URL 缓存。
+  文件借自定义组件的文件路由（/component/...）提供：那里按扩展名给 Content-Type；
+  .streamlit 的静态文件服务会把 .css 当 text/plain 发，还带 nosniff，浏览器不认。
+  Streamlit 重跑时没再画的元素会被移除，所以“每个会话只注入一次”做不到，能省的是每次重跑发出去的字节
+- 一键复制是 frontend/copy_button 下的自定义组件：iframe 只加载一次，之后重跑只传 text / label 两个参数，
+  不再像 components.html 那样每次把整段 HTML 重新发一遍、重建 iframe
+- 标题卡片、训练重点用预编译的模板，按输入缓存拼好的 HTML；训练重点合成一段 markdown 发出去
+"""
+import hashlib
+import os
+from functools import lru_cache
+from html import escape
+from string import Template
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+FRONTEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend")
+THEME_CSS = os.path.join(FRONTEND, "theme", "theme.css")
+
+# 只用来注册 frontend/theme 这个目录、让服务器提供里面的文件，不会被当成组件画出来
+_theme_files = components.declare_component("theme", path=os.path.dirname(THEME_CSS))
+
+@lru_cache(maxsize=1)
+def _theme_link():
+    """<link> 标签；URL 带内容哈希，改了 theme.css 重启后浏览器会重新取。文件不在时是空串"""
+    try:
+        with open(THEME_CSS, "rb") as f:
+            digest = hashlib.sha1(f.read()).hexdigest()[:10]
+    except OSError:
+        return ""
+    return f'<link rel="stylesheet" href="component/{_theme_files.name}/theme.css?v={digest}">'
+
+def inject_theme():
+    """每次重跑都要调（见模块说明）"""
+    link = _theme_link()
+    if link: st.markdown(link, unsafe_allow_html=True)
+
+# ---------- 一键复制 ----------
+
+_copy_button = components.declare_component("copy_button", path=os.path.join(FRONTEND, "copy_button"))
+
+def render_copy_button(text, label="📋 一键复制", key=None):
+    _copy_button(text=text, label=label, key=key, default=None)
+
+# ---------- 生成周报页的片段 ----------
+
+_WEEK_HEADER = Template("""<div class="bento-card"><div class="weekly-head">
+<div><p class="weekly-title">WEEKLY LOG</p><div class="weekly-range">📅 $week</div></div>
+<div style="text-align:right;"><div class="weekly-days">练了 $days 天</div></div>
+</div></div>""")
+_FOCUS_ITEM = Template('<div class="focus-item"><span class="stat-badge">🥑</span> $part: <b>$count次</b></div>')
+
+@lru_cache(maxsize=256)
+def week_header(week_str, training_days):
+    return _WEEK_HEADER.substitute(week=escape(week_str), days=training_days)
+
+@lru_cache(maxsize=256)
+def focus_badges(items):
+    """items 是 ((部位, 次数), ...)，要可哈希"""
+    return "\n".join(_FOCUS_ITEM.substitute(part=escape(part), count=count) for part, count in items)